@@ -1,12 +1,18 @@
 from __future__ import annotations
 from typing import Any, Dict
+from hospital_ai import metrics
 from .models import AuditEvent
 
+_EVENTS = metrics.counter("audit_events_total", "Audit events written, by action.", ["action"])
+_WRITE_SECONDS = metrics.histogram("audit_log_event_seconds", "Time to write one audit event.")
+
 def log_event(*, user, action: str, obj, details: Dict[str, Any] | None = None):
-    AuditEvent.objects.create(
-        user=user if getattr(user, "is_authenticated", False) else None,
-        action=action,
-        object_type=obj.__class__.__name__,
-        object_id=str(getattr(obj, "id", "")),
-        details=details or {},
-    )
+    with _WRITE_SECONDS.time():
+        AuditEvent.objects.create(
+            user=user if getattr(user, "is_authenticated", False) else None,
+            action=action,
+            object_type=obj.__class__.__name__,
+            object_id=str(getattr(obj, "id", "")),
+            details=details or {},
+        )
+    _EVENTS.labels(action=action).inc()
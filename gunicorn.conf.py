@@ -0,0 +1,41 @@
+# gunicorn.conf.py (picked up automatically when gunicorn runs from the repo root)
+#
+# ML_PRELOAD_MODEL=1 loads the Django app AND the risk model in the master
+# before forking, so workers share the model pages copy-on-write instead of
+# each loading their own copy. Combine with ML_MODEL_MMAP=1 for the SHAP
+# background / exported tree arrays. Check with:
+#   python manage.py memory_report <master pid>
+import gc
+import glob
+import os
+
+preload_app = os.environ.get("ML_PRELOAD_MODEL", "0") == "1"
+
+
+def on_starting(server):
+    # Per-process metric files are only meaningful for this run
+    directory = os.environ.get("METRICS_MULTIPROC_DIR")
+    if directory:
+        for path in glob.glob(os.path.join(directory, "*.db")):
+            os.remove(path)
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before workers spawn
+    if not preload_app:
+        return
+
+    from risk.warmup import warmup
+    warmup()
+
+    # Keep the GC from touching (and un-sharing) everything loaded so far
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # hospital_ai/wsgi.py skips this in the preloading master (threads die at fork)
+    if not preload_app:
+        return
+
+    from risk.apps import start_web_threads
+    start_web_threads()
@@ -0,0 +1,540 @@
+# hospital_ai/metrics.py
+"""
+Small in-project metrics registry with a Prometheus text endpoint (/metrics).
+
+    PREDICT_SECONDS = metrics.histogram("risk_predict_seconds", "...", ["engine"])
+    PREDICT_SECONDS.labels(engine="pipeline").observe(0.004)
+    with PREDICT_SECONDS.labels(engine="pipeline").time(): ...
+
+    LOADS = metrics.counter("risk_model_loads_total", "...", ["event"])
+    QUEUED = metrics.gauge("risk_jobs_queued", "...")
+    QUEUED.set_function(lambda: RiskJob.objects.filter(...).count())
+
+Values live in a per-process store:
+  - in memory (default): /metrics shows the worker that answered the scrape;
+  - settings.METRICS_MULTIPROC_DIR: every process appends to its own
+    memory-mapped file <dir>/<pid>.db and /metrics (in any worker) adds all
+    files up. Counters/histograms of exited workers keep counting; gauges
+    only count live processes (sum / max / min, per gauge). Empty the
+    directory when the service restarts (gunicorn.conf.py does).
+
+Metric objects are get-or-create by name, so defining them at module level
+in several modules (or re-importing) is fine.
+"""
+import functools
+import glob
+import ipaddress
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+# -------------------------------------------------------------------
+# Value stores
+# -------------------------------------------------------------------
+
+class _LocalStore:
+    def __init__(self):
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, key: str, amount: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set(self, key: str, value: float):
+        with self._lock:
+            self._values[key] = float(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+
+class _MmapStore:
+    """
+    {key: float64} appended to a memory-mapped file, written by ONE process.
+
+    Layout: uint32 used bytes, 4 pad bytes, then entries of
+    uint32 key length, utf-8 key, padding to 8 bytes, float64 value.
+    `used` is written after the entry, so readers never see half an entry.
+    """
+    _INITIAL = 1 << 16
+
+    def __init__(self, path: str):
+        self.pid = os.getpid()
+        self.path = path
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._capacity = max(os.fstat(self._fd).st_size, self._INITIAL)
+        os.ftruncate(self._fd, self._capacity)
+        self._map = mmap.mmap(self._fd, self._capacity)
+        self._positions = {}
+        used = struct.unpack_from("I", self._map, 0)[0]
+        if used == 0:
+            struct.pack_into("I", self._map, 0, 8)
+        else:
+            for key, _, pos in _read_entries(self._map, used):
+                self._positions[key] = pos
+
+    def _position(self, key: str) -> int:
+        pos = self._positions.get(key)
+        if pos is not None:
+            return pos
+
+        raw = key.encode("utf-8")
+        pad = (8 - (4 + len(raw)) % 8) % 8
+        head = struct.pack(f"I{len(raw)}s{pad}x", len(raw), raw)
+        used = struct.unpack_from("I", self._map, 0)[0]
+        end = used + len(head) + 8
+        if end > self._capacity:
+            while end > self._capacity:
+                self._capacity *= 2
+            self._map.close()
+            os.ftruncate(self._fd, self._capacity)
+            self._map = mmap.mmap(self._fd, self._capacity)
+
+        self._map[used:used + len(head)] = head
+        pos = used + len(head)
+        struct.pack_into("d", self._map, pos, 0.0)
+        struct.pack_into("I", self._map, 0, end)
+        self._positions[key] = pos
+        return pos
+
+    def inc(self, key: str, amount: float):
+        with self._lock:
+            pos = self._position(key)
+            struct.pack_into("d", self._map, pos, struct.unpack_from("d", self._map, pos)[0] + amount)
+
+    def set(self, key: str, value: float):
+        with self._lock:
+            struct.pack_into("d", self._map, self._position(key), float(value))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {k: struct.unpack_from("d", self._map, p)[0] for k, p in self._positions.items()}
+
+
+def _read_entries(buf, used: int):
+    pos = 8
+    while pos < used:
+        n = struct.unpack_from("I", buf, pos)[0]
+        key = bytes(buf[pos + 4:pos + 4 + n]).decode("utf-8")
+        pos += 4 + n + (8 - (4 + n) % 8) % 8
+        yield key, struct.unpack_from("d", buf, pos)[0], pos
+        pos += 8
+
+
+def _read_file(path: str) -> dict:
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < 8:
+        return {}
+    used = min(struct.unpack_from("I", data, 0)[0], len(data))
+    return {key: value for key, value, _ in _read_entries(data, used)}
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def _multiproc_dir():
+    return getattr(settings, "METRICS_MULTIPROC_DIR", None) or None
+
+
+def _get_store():
+    global _store
+    store = _store
+    # New process (e.g. a gunicorn worker forked from a preloaded master)
+    # gets its own store/file
+    if store is None or store.pid != os.getpid():
+        with _store_lock:
+            if _store is None or _store.pid != os.getpid():
+                directory = _multiproc_dir()
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                    _store = _MmapStore(os.path.join(directory, f"{os.getpid()}.db"))
+                else:
+                    _store = _LocalStore()
+            store = _store
+    return store
+
+
+def _key(name: str, labels: dict) -> str:
+    return json.dumps([name, sorted(labels.items())], separators=(",", ":"))
+
+
+# -------------------------------------------------------------------
+# Metrics
+# -------------------------------------------------------------------
+
+_registry = {}          # name -> metric
+_registry_lock = threading.Lock()
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        values = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(
+                    values, self._child(dict(zip(self.labelnames, values)))
+                )
+        return child
+
+    def _unlabelled(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}; use .labels()")
+        return self.labels()
+
+
+class _CounterChild:
+    def __init__(self, metric, labels):
+        self._key = _key(metric.name, labels)
+
+    def inc(self, amount: float = 1.0):
+        _get_store().inc(self._key, amount)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self, labels):
+        return _CounterChild(self, labels)
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self, metric, labels):
+        self._key = _key(metric.name, labels)
+
+    def set(self, value: float):
+        _get_store().set(self._key, value)
+
+    def inc(self, amount: float = 1.0):
+        _get_store().inc(self._key, amount)
+
+    def dec(self, amount: float = 1.0):
+        _get_store().inc(self._key, -amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode="sum"):
+        super().__init__(name, documentation, labelnames)
+        if multiprocess_mode not in ("sum", "max", "min"):
+            raise ValueError("multiprocess_mode must be 'sum', 'max' or 'min'")
+        self.multiprocess_mode = multiprocess_mode
+        self.function = None
+
+    def _child(self, labels):
+        return _GaugeChild(self, labels)
+
+    def set(self, value: float):
+        self._unlabelled().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._unlabelled().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._unlabelled().dec(amount)
+
+    def set_function(self, fn):
+        """Value computed by fn() at scrape time, in the scraping process."""
+        self.function = fn
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class _HistogramChild:
+    def __init__(self, metric, labels):
+        self._bounds = metric.buckets
+        # buckets stored NON-cumulative; exposition adds them up
+        self._bucket_keys = [
+            _key(metric.name + "_bucket", {**labels, "le": _fmt(b)}) for b in metric.buckets
+        ] + [_key(metric.name + "_bucket", {**labels, "le": "+Inf"})]
+        self._sum_key = _key(metric.name + "_sum", labels)
+        self._count_key = _key(metric.name + "_count", labels)
+
+    def observe(self, value: float):
+        store = _get_store()
+        store.inc(self._bucket_keys[bisect_left(self._bounds, value)], 1.0)
+        store.inc(self._sum_key, value)
+        store.inc(self._count_key, 1.0)
+
+    def time(self):
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def _child(self, labels):
+        return _HistogramChild(self, labels)
+
+    def observe(self, value: float):
+        self._unlabelled().observe(value)
+
+    def time(self):
+        return self._unlabelled().time()
+
+
+def _get_or_create(cls, name, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as a {metric.kind}")
+        return metric
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    return _get_or_create(Counter, name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames=(), multiprocess_mode: str = "sum") -> Gauge:
+    return _get_or_create(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+
+# -------------------------------------------------------------------
+# Collection + Prometheus text format
+# -------------------------------------------------------------------
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _metric_of(sample_name: str):
+    metric = _registry.get(sample_name)
+    if metric is not None:
+        return metric
+    for suffix in ("_bucket", "_sum", "_count"):
+        if sample_name.endswith(suffix):
+            metric = _registry.get(sample_name[:-len(suffix)])
+            if metric is not None and metric.kind == "histogram":
+                return metric
+    return None
+
+
+def collect() -> dict:
+    """{sample key: value} for this process, or every process in multiprocess mode."""
+    directory = _multiproc_dir()
+    if not directory:
+        return _get_store().snapshot()
+
+    _get_store()        # make sure this process has its file
+    totals = {}
+    for path in glob.glob(os.path.join(directory, "*.db")):
+        try:
+            pid = int(os.path.basename(path)[:-3])
+            values = _read_file(path)
+        except (OSError, ValueError):
+            continue
+        alive = None
+        for key, value in values.items():
+            metric = _metric_of(json.loads(key)[0])
+            if metric is None:
+                continue
+            if metric.kind == "gauge":
+                if alive is None:
+                    alive = _pid_alive(pid)
+                if not alive:
+                    continue
+                if key in totals and metric.multiprocess_mode != "sum":
+                    pick = max if metric.multiprocess_mode == "max" else min
+                    totals[key] = pick(totals[key], value)
+                    continue
+            totals[key] = totals.get(key, 0.0) + value
+    return totals
+
+
+def _fmt(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+def generate_latest() -> str:
+    samples = {}
+    for key, value in collect().items():
+        sample_name, labels = json.loads(key)
+        metric = _metric_of(sample_name)
+        if metric is not None:
+            labels = tuple(tuple(pair) for pair in labels)
+            samples.setdefault(metric.name, []).append((sample_name, labels, value))
+
+    lines = []
+    for name in sorted(_registry):
+        metric = _registry[name]
+        rows = samples.get(name, [])
+        if metric.kind == "gauge" and metric.function is not None:
+            try:
+                rows = [(name, (), float(metric.function()))]
+            except Exception:
+                rows = []
+        if not rows:
+            continue
+
+        lines.append(f"# HELP {name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+
+        rows = sorted(rows, key=lambda r: (r[1], r[0]))
+        if metric.kind == "histogram":
+            rows = _cumulative_buckets(metric, rows)
+        for sample_name, labels, value in rows:
+            lines.append(f"{sample_name}{_labels_text(labels)} {_fmt(value)}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _cumulative_buckets(metric, rows):
+    """Per label set: _bucket rows in `le` order (cumulative), then _count and _sum."""
+    bounds = [_fmt(b) for b in metric.buckets] + ["+Inf"]
+
+    series = {}
+    for sample_name, labels, value in rows:
+        if sample_name.endswith("_bucket"):
+            le = dict(labels)["le"]
+            labels = tuple(pair for pair in labels if pair[0] != "le")
+            series.setdefault(labels, {})[le] = value
+        else:
+            series.setdefault(labels, {})[sample_name] = value
+
+    out = []
+    for labels, values in series.items():
+        running = 0.0
+        for le in bounds:
+            running += values.get(le, 0.0)
+            out.append((metric.name + "_bucket", (*labels, ("le", le)), running))
+        for suffix in ("_count", "_sum"):
+            out.append((metric.name + suffix, labels, values.get(metric.name + suffix, 0.0)))
+    return out
+
+
+# -------------------------------------------------------------------
+# Request metrics + /metrics view
+# -------------------------------------------------------------------
+
+REQUESTS = counter("http_requests_total", "HTTP requests by view and status.", ["view", "status"])
+REQUEST_SECONDS = histogram("http_request_duration_seconds", "Request latency by view.", ["view"])
+
+
+def _observe_stream(content, t0, seconds, name, status):
+    try:
+        yield from content
+    except Exception:
+        status = 500    # body cut off mid-stream
+        raise
+    finally:
+        seconds.observe(time.perf_counter() - t0)
+        REQUESTS.labels(view=name, status=status).inc()
+
+
+def track_request(name: str):
+    """
+    View decorator: http_requests_total + http_request_duration_seconds.
+    For a StreamingHttpResponse both are recorded when the body has been
+    sent (the work happens while it streams), not when the view returns.
+    """
+    def decorator(view):
+        seconds = REQUEST_SECONDS.labels(view=name)
+
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            t0 = time.perf_counter()
+            status = 500
+            streaming = False
+            try:
+                response = view(request, *args, **kwargs)
+                status = response.status_code
+                if response.streaming and not response.is_async:
+                    response.streaming_content = _observe_stream(
+                        response.streaming_content, t0, seconds, name, status
+                    )
+                    streaming = True
+                return response
+            finally:
+                if not streaming:
+                    seconds.observe(time.perf_counter() - t0)
+                    REQUESTS.labels(view=name, status=status).inc()
+        return wrapped
+    return decorator
+
+
+def _client_allowed(request) -> bool:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    try:
+        addr = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(addr in ipaddress.ip_network(net) for net in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    """Prometheus text format; staff users or METRICS_ALLOWED_NETWORKS only."""
+    if not _client_allowed(request):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(generate_latest(), content_type="text/plain; version=0.0.4; charset=utf-8")
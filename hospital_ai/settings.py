@@ -1,4 +1,5 @@
 from pathlib import Path
+import json
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -103,6 +104,118 @@ ML_MODEL_PATH = os.environ.get(
 )
 ML_MODEL_VERSION = os.environ.get("ML_MODEL_VERSION", "2025-12-31-xgb-180d")
 
+# Model registry: model_version -> artifact path. ML_MODEL_VERSION/ML_MODEL_PATH
+# is always included; list older versions here (or as JSON in the env var) so
+# old assessments are explained with the model that produced them.
+ML_MODEL_REGISTRY = json.loads(os.environ.get("ML_MODEL_REGISTRY", "{}"))
+ML_MODEL_CACHE_SIZE = int(os.environ.get("ML_MODEL_CACHE_SIZE", "2"))        # loaded versions
+ML_MODEL_CACHE_MAX_MB = int(os.environ.get("ML_MODEL_CACHE_MAX_MB", "0"))    # 0 = no byte limit
+# How often a loaded artifact is stat()-ed for hot reload
+ML_MODEL_RELOAD_CHECK_SECONDS = float(os.environ.get("ML_MODEL_RELOAD_CHECK_SECONDS", "5"))
+
+# "pipeline" = sklearn Pipeline.predict_proba
+# "compiled" = pure-NumPy tree evaluator (risk/tree_engine.py); falls back to
+#              the pipeline if the bundle can't be compiled
+ML_INFERENCE_ENGINE = os.environ.get("ML_INFERENCE_ENGINE", "pipeline")
+# Above this many rows XGBoost's own (multithreaded) predictor is faster
+ML_COMPILED_MAX_ROWS = int(os.environ.get("ML_COMPILED_MAX_ROWS", "64"))
+
+# SHAP algorithm for explanations (risk/services.py, see README for the
+# latency/agreement trade-off): "interventional" (default, uses the bundle's
+# background), "tree_path_dependent" or "pred_contribs" (XGBoost native)
+ML_SHAP_ALGORITHM = os.environ.get("ML_SHAP_ALGORITHM", "interventional")
+
+# Latency budget for explanations on the detail page (0 = always wait).
+# Past it the page shows the stored or an approximate explanation, and the
+# exact one finishes on ML_EXPLAIN_BACKGROUND_WORKERS threads (at most
+# ML_EXPLAIN_MAX_PENDING queued).
+ML_SHAP_BUDGET_MS = float(os.environ.get("ML_SHAP_BUDGET_MS", "0"))
+ML_EXPLAIN_BACKGROUND_WORKERS = int(os.environ.get("ML_EXPLAIN_BACKGROUND_WORKERS", "1"))
+ML_EXPLAIN_MAX_PENDING = int(os.environ.get("ML_EXPLAIN_MAX_PENDING", "32"))
+
+# What-if endpoint (POST /risk/assessments/<id>/what-if/): grid points per
+# feature when only min/max are given, and total points per request
+ML_WHATIF_DEFAULT_POINTS = int(os.environ.get("ML_WHATIF_DEFAULT_POINTS", "50"))
+ML_WHATIF_MAX_POINTS = int(os.environ.get("ML_WHATIF_MAX_POINTS", "20000"))
+
+# Memory-map numpy arrays from the (uncompressed) joblib and from the
+# exported tree arrays (manage.py export_model_arrays), so gunicorn workers
+# share those pages instead of each holding a private copy.
+ML_MODEL_MMAP = os.environ.get("ML_MODEL_MMAP", "0") == "1"
+# Load + warm the model in the gunicorn master before fork (gunicorn.conf.py)
+ML_PRELOAD_MODEL = os.environ.get("ML_PRELOAD_MODEL", "0") == "1"
+
+# Load model + build SHAP explainer when the web worker boots (instead of on
+# the first request; not in manage.py commands). /healthz/ready returns 503
+# until this has finished; a failure is retried with backoff (risk/warmup.py).
+ML_WARMUP_ON_BOOT = os.environ.get("ML_WARMUP_ON_BOOT", "0") == "1"
+
+# Memoized probability + SHAP vectors per feature-vector fingerprint (risk/cache.py).
+# MAX_SIZE=0 disables it; BACKEND = a CACHES alias shares entries across workers.
+ML_PREDICTION_CACHE = {
+    "MAX_SIZE": int(os.environ.get("ML_PREDICTION_CACHE_SIZE", "2048")),
+    "TTL": float(os.environ.get("ML_PREDICTION_CACHE_TTL", "0")),
+    "BACKEND": os.environ.get("ML_PREDICTION_CACHE_BACKEND") or None,
+}
+
+
+# Per-stage timings of the risk views (risk/timing.py) for this share of
+# requests (0 = off): JSON lines on the "risk.timing" logger + /risk/stats/.
+# ML_TIMING_SERVER_TIMING also sends them as a Server-Timing response header.
+ML_TIMING_SAMPLE_RATE = float(os.environ.get("ML_TIMING_SAMPLE_RATE", "0"))
+ML_TIMING_SERVER_TIMING = os.environ.get("ML_TIMING_SERVER_TIMING", "0") == "1"
+
+# Shadow model (risk/shadow.py): every generated assessment is also scored by
+# this artifact on a background thread and compared (ShadowResult /
+# ShadowAgreement, see /risk/stats/). Unset = off. The thread uses at most
+# ML_SHADOW_CPU_BUDGET of one core; beyond ML_SHADOW_QUEUE_SIZE waiting
+# requests new ones are dropped.
+ML_SHADOW_MODEL_PATH = os.environ.get("ML_SHADOW_MODEL_PATH") or None
+ML_SHADOW_MODEL_VERSION = os.environ.get("ML_SHADOW_MODEL_VERSION", "shadow")
+ML_SHADOW_CPU_BUDGET = float(os.environ.get("ML_SHADOW_CPU_BUDGET", "0.25"))
+ML_SHADOW_QUEUE_SIZE = int(os.environ.get("ML_SHADOW_QUEUE_SIZE", "100"))
+
+# Streaming feature drift vs the model's reference distribution (risk/drift.py),
+# updated on every new ObservationSet; dashboard at /risk/drift/ (staff only).
+# PSI >= WARN is shown as moderate, >= ALERT as major drift.
+RISK_DRIFT_MONITOR = os.environ.get("RISK_DRIFT_MONITOR", "1") == "1"
+RISK_DRIFT_PSI_WARN = float(os.environ.get("RISK_DRIFT_PSI_WARN", "0.1"))
+RISK_DRIFT_PSI_ALERT = float(os.environ.get("RISK_DRIFT_PSI_ALERT", "0.25"))
+
+# Prometheus text metrics at /metrics (hospital_ai/metrics.py), for staff users
+# or clients in METRICS_ALLOWED_NETWORKS (comma separated, loopback by default;
+# empty = staff only). Behind a proxy REMOTE_ADDR is the proxy's address, so
+# only add private ranges (e.g. 10.0.0.0/8) when nothing proxies the public
+# internet into them. With several gunicorn workers set
+# METRICS_MULTIPROC_DIR to a writable directory so every worker's numbers
+# are added up (emptied by gunicorn.conf.py on start).
+METRICS_MULTIPROC_DIR = os.environ.get("METRICS_MULTIPROC_DIR") or None
+METRICS_ALLOWED_NETWORKS = [
+    net.strip()
+    for net in os.environ.get("METRICS_ALLOWED_NETWORKS", "127.0.0.1/32,::1/128").split(",")
+    if net.strip()
+]
+
+# Async "generate risk": the POST only queues a RiskJob (risk/jobs.py) and the
+# page polls until the assessment exists.
+#   RISK_JOBS_RUNNER = "thread"  -> thread pool inside each web worker
+#                      "command" -> separate `python manage.py risk_worker`
+RISK_JOBS_ASYNC = os.environ.get("RISK_JOBS_ASYNC", "0") == "1"
+RISK_JOBS_RUNNER = os.environ.get("RISK_JOBS_RUNNER", "thread")
+RISK_JOBS_WORKERS = int(os.environ.get("RISK_JOBS_WORKERS", "2"))           # concurrency
+RISK_JOBS_MAX_QUEUED = int(os.environ.get("RISK_JOBS_MAX_QUEUED", "100"))   # 0 = unbounded
+RISK_JOBS_MAX_ATTEMPTS = int(os.environ.get("RISK_JOBS_MAX_ATTEMPTS", "3"))
+RISK_JOBS_STALE_SECONDS = int(os.environ.get("RISK_JOBS_STALE_SECONDS", "300"))
+# "thread" runner: how often each web worker requeues stale / orphaned jobs
+RISK_JOBS_SWEEP_SECONDS = int(os.environ.get("RISK_JOBS_SWEEP_SECONDS", "30"))
+
+# Bulk feature engineering (/engineer-features/bulk/, observations/bulk.py):
+# payloads go to a pool of FEATURE_BULK_WORKERS processes per web worker
+# (0 = in the request thread), at most FEATURE_BULK_MAX_IN_FLIGHT at a time.
+# A single payload larger than FEATURE_BULK_MAX_ITEM_BYTES is rejected.
+FEATURE_BULK_WORKERS = int(os.environ.get("FEATURE_BULK_WORKERS", "2"))
+FEATURE_BULK_MAX_IN_FLIGHT = int(os.environ.get("FEATURE_BULK_MAX_IN_FLIGHT", "8"))
+FEATURE_BULK_MAX_ITEM_BYTES = int(os.environ.get("FEATURE_BULK_MAX_ITEM_BYTES", str(16 * 1024 * 1024)))
 
 # Risk bands (edit as your hospital policy requires)
 RISK_BAND_THRESHOLDS = {
@@ -1,8 +1,13 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from hospital_ai.metrics import metrics_view
+from risk import views as risk_views
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("healthz/ready", risk_views.readiness, name="healthz_ready"),
+    path("metrics", metrics_view, name="metrics"),
     path("accounts/", include("accounts.urls")),
     path("", include(("patients.urls", "patients"), namespace="patients")),
     path("", include(("observations.urls", "observations"), namespace="observations")),
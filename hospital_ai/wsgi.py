@@ -3,3 +3,12 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "hospital_ai.settings")
 application = get_wsgi_application()
+
+# Web-worker threads (risk job sweeper, ...). With ML_PRELOAD_MODEL this module
+# is loaded in the gunicorn master, whose threads don't survive the fork:
+# gunicorn.conf.py starts them in each worker instead.
+from django.conf import settings  # noqa: E402
+
+if not settings.ML_PRELOAD_MODEL:
+    from risk.apps import start_web_threads  # noqa: E402
+    start_web_threads()
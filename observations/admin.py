@@ -1,8 +1,14 @@
 from django.contrib import admin
-from .models import ObservationSet
+from .models import EncounterSignalStats, ObservationSet
 
 @admin.register(ObservationSet)
 class ObservationSetAdmin(admin.ModelAdmin):
     list_display = ("id","encounter","recorded_at","recorded_by")
     list_filter = ("recorded_at",)
     search_fields = ("encounter__patient__mrn","encounter__patient__full_name")
+
+
+@admin.register(EncounterSignalStats)
+class EncounterSignalStatsAdmin(admin.ModelAdmin):
+    list_display = ("encounter","signal","count","mean","min","max","updated_at")
+    list_filter = ("signal",)
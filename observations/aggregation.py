@@ -0,0 +1,219 @@
+# observations/aggregation.py
+"""
+Incremental per-encounter feature aggregation.
+
+    add_measurements(encounter, [{"timestamp": ..., "heart_rate": 88, ...}, ...])
+    encounter_features(encounter)   # -> {FEATURE_COLUMNS: value}
+
+Instead of re-running engineer_features() on the whole raw list for every
+upload, each accepted value (same window / float / validation rules as
+feature_engineering.extract_values) updates one EncounterSignalStats row:
+count, Welford mean + M2, min, max. That's O(1) per value, and it's in the DB,
+so any worker carries on where another stopped. Reading the features is one
+query over at most 19 rows.
+
+The result equals calculate_statistics() on the same values in arrival order,
+rounding included. Min/max/count are exact. Mean/std carry a few ulps of
+float error (and np.mean's pairwise sum has its own), which only matters
+when the value sits right at a rounding boundary (x.x5). In that case, or
+after a NaN/inf, the signal is recomputed from its stored values
+(EncounterSignalValue).
+
+The window starts at Encounter.admitted_at at the time a value is added;
+naive timestamps are taken in the current time zone.
+
+Uploads are idempotent: a signal keeps each (timestamp, value) once, so a
+retried POST (or a re-exported batch) only adds what's new. Two different
+values at one timestamp are both kept, as in the raw list.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .feature_engineering import (
+    FEATURE_STATS,
+    PARAM_MAPPING,
+    _parse_iso_dt,
+    calculate_statistics,
+    validate_measurement_value,
+)
+from .models import FEATURE_COLUMNS, EncounterSignalStats, EncounterSignalValue
+
+_EPS = np.finfo(float).eps
+
+
+def _aware(dt):
+    return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+
+def _accepted_values(encounter, measurements) -> Dict[str, List[tuple]]:
+    """{signal: [(value, timestamp), ...]} in measurement order; raises on bad timestamps."""
+    window_start = encounter.admitted_at
+    window_end = window_start + timedelta(hours=48)
+    accepted: Dict[str, List[tuple]] = {}
+
+    for m in measurements:
+        timestamp = _aware(_parse_iso_dt(m["timestamp"]))
+        if not window_start <= timestamp <= window_end:
+            continue
+        for param, raw in m.items():
+            if param not in PARAM_MAPPING or raw is None:
+                continue
+            try:
+                value = float(raw)
+            except (TypeError, ValueError):
+                continue
+            if validate_measurement_value(param, value):
+                accepted.setdefault(param, []).append((value, timestamp))
+    return accepted
+
+
+def _welford_add(row: EncounterSignalStats, value: float):
+    row.count += 1
+    if not np.isfinite(value):
+        # the stats are read from the stored values from now on
+        row.nonfinite = True
+        return
+    delta = value - row.mean
+    row.mean += delta / row.count
+    row.m2 += delta * (value - row.mean)
+    row.min = value if row.min is None else min(row.min, value)
+    row.max = value if row.max is None else max(row.max, value)
+
+
+def add_measurements(encounter, measurements) -> Tuple[int, int]:
+    """
+    Adds raw measurements ({"timestamp": ISO, <signal>: value, ...}) to the
+    encounter's running statistics. Returns (values added, duplicates skipped),
+    a duplicate being a signal value already stored with the same timestamp.
+    Nothing is written if any measurement has a missing/invalid timestamp.
+    """
+    accepted = _accepted_values(encounter, measurements)
+    if not accepted:
+        return 0, 0
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                return _apply(encounter, accepted)
+        except IntegrityError:
+            # Another worker created the same signal row / values first; retry
+            # (its rows are visible now and are skipped as duplicates)
+            if attempt:
+                raise
+
+
+def _apply(encounter, accepted):
+    rows = {
+        r.signal: r
+        for r in EncounterSignalStats.objects.select_for_update().filter(
+            encounter=encounter, signal__in=list(accepted)
+        )
+    }
+    raw = []
+    added = duplicates = 0
+    for signal, values in accepted.items():
+        row = rows.get(signal)
+        if row is None:
+            row = EncounterSignalStats.objects.create(encounter=encounter, signal=signal)
+            seen = set()
+        else:
+            # the row lock serializes uploads for this signal, so this is exact
+            timestamps = [t for _, t in values]
+            seen = set(
+                row.values.filter(measured_at__range=(min(timestamps), max(timestamps)))
+                .values_list("measured_at", "value")
+            )
+        n = 0
+        for value, timestamp in values:
+            key = (timestamp, None if np.isnan(value) else value)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            _welford_add(row, value)
+            raw.append(EncounterSignalValue(
+                stats=row, value=None if np.isnan(value) else value, measured_at=timestamp
+            ))
+            n += 1
+        if n:
+            row.save(update_fields=["count", "mean", "m2", "min", "max", "nonfinite", "updated_at"])
+        added += n
+    EncounterSignalValue.objects.bulk_create(raw, batch_size=1000)
+    return added, duplicates
+
+
+# -------------------------------------------------------------------
+# Reading
+# -------------------------------------------------------------------
+
+def _round(x: float) -> float:
+    return float(np.round(x, 1))
+
+
+def _near_boundary(x: float, err: float) -> bool:
+    """True if rounding x to 1 decimal could flip within +-err."""
+    y = x * 10.0
+    return abs(y - np.floor(y) - 0.5) <= 10.0 * err + 4 * _EPS * max(abs(y), 1.0)
+
+
+def _stats_from_values(row: EncounterSignalStats) -> Dict[str, Any]:
+    values = [np.nan if v is None else v for v in row.values.order_by("id").values_list("value", flat=True)]
+    return calculate_statistics(values)
+
+
+def row_statistics(row: EncounterSignalStats) -> Dict[str, Any]:
+    """calculate_statistics()-equal min/max/mean/std for one signal."""
+    n = row.count
+    if n == 0:
+        return {"min": None, "max": None, "mean": None, "std": None}
+    if row.nonfinite:
+        return _stats_from_values(row)
+    if n == 1:
+        # mean == the value exactly, on both sides
+        return {"min": _round(row.min), "max": _round(row.max), "mean": _round(row.mean), "std": 0.0}
+
+    # Float error bounds for both Welford and NumPy's summation (generous)
+    scale = max(abs(row.min), abs(row.max))
+    err_mean = 4 * n * _EPS * scale
+    if _near_boundary(row.mean, err_mean):
+        return _stats_from_values(row)
+
+    std = float(np.sqrt(max(row.m2, 0.0) / (n - 1)))
+    err_std = 16 * n * _EPS * (std + scale)
+    if _near_boundary(std, err_std):
+        return _stats_from_values(row)
+
+    return {
+        "min": _round(row.min),
+        "max": _round(row.max),
+        "mean": _round(row.mean),
+        "std": _round(std),
+    }
+
+
+def encounter_statistics(encounter) -> Dict[str, Dict[str, Any]]:
+    """{signal: {"min", "max", "mean", "std"}} for every signal seen so far."""
+    return {
+        row.signal: row_statistics(row)
+        for row in EncounterSignalStats.objects.filter(encounter=encounter)
+    }
+
+
+def encounter_features(encounter, age=None, age_adj_comorbidity_score=None) -> Dict[str, Any]:
+    """The 51 FEATURE_COLUMNS from the running statistics (None = no data)."""
+    features: Dict[str, Any] = {c: None for c in FEATURE_COLUMNS}
+    features["age"] = age
+    features["age_adj_comorbidity_score"] = age_adj_comorbidity_score
+
+    for signal, stats in encounter_statistics(encounter).items():
+        prefix = PARAM_MAPPING[signal]
+        for stat_name in FEATURE_STATS[prefix]:
+            if stats[stat_name] is not None:
+                features[f"{prefix}_{stat_name}"] = stats[stat_name]
+    return features
@@ -0,0 +1,372 @@
+# observations/bulk.py
+"""
+Bulk feature engineering (POST /engineer-features/bulk/).
+
+    stream_engineered(iter_ndjson(request), workers=2, max_in_flight=8)
+      -> NDJSON lines {"index": i, "status": "ok"|"error", ...}, as they finish
+
+The request body is read incrementally (NDJSON line by line, or a JSON array
+item by item) and at most max_in_flight payloads are in the process pool at
+any time, so memory doesn't grow with the size of the batch. A bad item gives
+an error line for that index; the rest of the batch carries on.
+
+Pool workers are started with "spawn" (same reason as risk/scoring_pool.py),
+so this module must be importable BEFORE Django is set up: no model imports.
+"""
+from __future__ import annotations
+
+import codecs
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .feature_engineering import EXPECTED_FEATURES, engineer_features
+
+CHUNK_SIZE = 64 * 1024
+MAX_ITEM_BYTES = 16 * 1024 * 1024   # one patient payload
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class InvalidItem(Exception):
+    """One item of the body couldn't be parsed (yielded instead of the item)."""
+
+
+# -------------------------------------------------------------------
+# One payload (shared with engineer_features_api)
+# -------------------------------------------------------------------
+
+def engineer_item(data: Any) -> Tuple[int, Dict[str, Any]]:
+    """
+    (http status, response dict) for one payload:
+      1) Raw ICU JSON (has admission_time + current_time + measurements) -> runs engineer_features()
+      2) Already-engineered feature JSON -> echoes back (and reports missing keys)
+    """
+    if not isinstance(data, dict):
+        return 400, {"status": "error", "message": "JSON must be an object (dict)"}
+
+    # Detect "raw ICU JSON" format (your notebook format)
+    is_raw = (
+        "admission_time" in data
+        and "current_time" in data
+        and isinstance(data.get("measurements"), list)
+    )
+
+    expected = EXPECTED_FEATURES
+
+    if is_raw:
+        result = engineer_features(data)
+
+        if not result.get("success"):
+            return 400, {
+                "status": "error",
+                "message": result.get("error", "Feature engineering failed"),
+                "details": result.get("details"),
+            }
+
+        # ✅ Always normalize + compute missing/unknown here
+        features = result.get("features", {}) or {}
+
+        missing = [k for k in expected if features.get(k) in (None, "")]
+        unknown = [k for k in features.keys() if k not in expected]
+
+        return 200, {
+            "status": "ok",
+            "features": {k: features.get(k) for k in expected},  # return only expected keys
+            "missing_features": missing if missing else None,
+            "imputed_features": result.get("imputed_features") or None,
+            "unknown_keys": unknown if unknown else None,
+            "validation_message": result.get("validation_message"),
+        }
+
+    # Otherwise treat as already-feature JSON and just check missing keys
+    features = data
+
+    missing = [k for k in expected if features.get(k) in (None, "")]
+    unknown = [k for k in features.keys() if k not in expected]
+
+    return 200, {
+        "status": "ok",
+        "features": {k: features.get(k) for k in expected},  # only return expected keys
+        "missing_features": missing if missing else None,
+        "unknown_keys": unknown if unknown else None,
+        "validation_message": "Feature JSON loaded.",
+    }
+
+
+# -------------------------------------------------------------------
+# Reading the body
+# -------------------------------------------------------------------
+
+class _Prefixed:
+    """stream with `head` (already read) put back in front."""
+
+    def __init__(self, head: bytes, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self.head:
+            head, self.head = self.head, b""
+            return head
+        return self.stream.read(size)
+
+
+def iter_items(stream, content_type: str = "", max_item_bytes: int = MAX_ITEM_BYTES) -> Iterator[Any]:
+    """
+    Payloads of the body: NDJSON if the Content-Type says so or the body
+    doesn't start with "[", otherwise the items of the JSON array.
+    """
+    if content_type in NDJSON_CONTENT_TYPES:
+        return iter_ndjson(stream, max_item_bytes)
+    head = stream.read(CHUNK_SIZE)
+    stream = _Prefixed(head, stream)
+    if head.lstrip()[:1] == b"[":
+        return iter_json_array(stream, max_item_bytes)
+    return iter_ndjson(stream, max_item_bytes)
+
+
+def _chunks(stream, size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _too_large(max_item_bytes: int) -> InvalidItem:
+    return InvalidItem(f"Item larger than {max_item_bytes} bytes")
+
+
+def iter_ndjson(stream, max_item_bytes: int = MAX_ITEM_BYTES) -> Iterator[Any]:
+    """
+    One parsed object (or InvalidItem) per non-empty line. A line over
+    max_item_bytes is skipped (one InvalidItem) without being buffered.
+    """
+    pending = []      # pieces of the current line
+    size = 0
+    skipping = False  # inside a line that was too long
+    for chunk in _chunks(stream):
+        *done, rest = chunk.split(b"\n")
+        for piece in done:
+            if skipping:
+                skipping = False
+                continue
+            line = b"".join(pending) + piece if pending else piece
+            pending, size = [], 0
+            if line.strip():
+                yield _parse_line(line, max_item_bytes)
+        if rest and not skipping:
+            pending.append(rest)
+            size += len(rest)
+            if size > max_item_bytes:
+                yield _too_large(max_item_bytes)
+                pending, size = [], 0
+                skipping = True
+    line = b"".join(pending)
+    if line.strip():
+        yield _parse_line(line, max_item_bytes)
+
+
+def _parse_line(line: bytes, max_item_bytes: int = MAX_ITEM_BYTES) -> Any:
+    if len(line) > max_item_bytes:
+        return _too_large(max_item_bytes)
+    try:
+        return json.loads(line.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as e:
+        return InvalidItem(f"Invalid JSON line: {e}")
+
+
+def _ran_out(e: json.JSONDecodeError, buf: str) -> bool:
+    """True if the decoder failed because the item is cut off at the end of buf."""
+    # pos is where the failing token starts: a cut literal ("tru") or \uXXXX
+    # escape sits a few characters before the end; a cut string reports its start
+    return e.pos >= len(buf) - 6 or e.msg.startswith("Unterminated string")
+
+
+def iter_json_array(stream, max_item_bytes: int = MAX_ITEM_BYTES) -> Iterator[Any]:
+    """
+    Items of a top-level JSON array without loading the whole array. A syntax
+    error, or an item over max_item_bytes, can't be recovered from: it ends
+    the batch with one InvalidItem.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def more() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        # at least double what's buffered, so retrying a long item stays linear
+        chunk = stream.read(max(CHUNK_SIZE, len(buf) - pos))
+        if chunk:
+            buf = buf[pos:] + text.decode(chunk)
+        else:
+            eof = True
+            buf = buf[pos:] + text.decode(b"", final=True)
+        pos = 0
+        return True
+
+    def skip_ws() -> bool:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buf):
+                return True
+            if not more():
+                return False
+
+    try:
+        if not skip_ws() or buf[pos] != "[":
+            yield InvalidItem("Expected a JSON array or NDJSON")
+            return
+        pos += 1
+        first = True
+        while True:
+            if not skip_ws():
+                yield InvalidItem("Unexpected end of JSON array")
+                return
+            if buf[pos] == "]":
+                pos += 1
+                if skip_ws():
+                    yield InvalidItem(f"Extra data after the JSON array: {buf[pos]!r}")
+                return
+            if not first:
+                if buf[pos] != ",":
+                    yield InvalidItem(f"Expected ',' or ']' in JSON array, got {buf[pos]!r}")
+                    return
+                pos += 1
+                if not skip_ws():
+                    yield InvalidItem("Unexpected end of JSON array")
+                    return
+            # An item may be cut by the end of the buffer: read more and retry
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError as e:
+                    if eof or not _ran_out(e, buf):
+                        yield InvalidItem(f"Invalid JSON array item: {e}")
+                        return
+                    item = end = None
+                # A number at the end of the buffer may continue ("12" | ".5", "1" | "e3")
+                cut = end is None or (
+                    isinstance(item, (int, float))
+                    and len(buf) - end <= 2
+                    and not buf[end:].strip("0123456789+-.eE")
+                )
+                if not cut or eof:
+                    break
+                if len(buf) - pos > max_item_bytes:
+                    yield _too_large(max_item_bytes)
+                    return
+                more()
+            pos = end
+            first = False
+            yield item
+    except UnicodeDecodeError as e:
+        yield InvalidItem(f"Invalid JSON payload: {e}")
+
+
+# -------------------------------------------------------------------
+# Process pool
+# -------------------------------------------------------------------
+
+_state = {"pid": None, "pool": None, "workers": 0}
+_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    # One pool per web worker process, created on first use (not in the
+    # gunicorn master, whose forked children would inherit a dead pool)
+    if _state["pid"] != os.getpid() or _state["workers"] != workers or _state["pool"] is None:
+        with _lock:
+            if _state["pid"] != os.getpid() or _state["workers"] != workers or _state["pool"] is None:
+                if _state["pid"] == os.getpid() and _state["pool"] is not None:
+                    _state["pool"].shutdown(wait=False, cancel_futures=True)
+                _state["pool"] = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                _state["pid"] = os.getpid()
+                _state["workers"] = workers
+    return _state["pool"]
+
+
+def _reset_pool(pool):
+    with _lock:
+        if _state["pool"] is pool:
+            _state["pool"] = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _line(index: int, payload: Dict[str, Any]) -> str:
+    return json.dumps({"index": index, **payload}, cls=DjangoJSONEncoder) + "\n"
+
+
+def _error(message: str, details=None) -> Dict[str, Any]:
+    return {"status": "error", "message": message, "details": details}
+
+
+def stream_engineered(items, workers: int = 2, max_in_flight: int = 8) -> Iterator[str]:
+    """
+    NDJSON lines for items (payloads or InvalidItem), in completion order;
+    "index" is the item's position in the body. workers=0 runs in-process.
+    """
+    if workers <= 0:
+        for index, item in enumerate(items):
+            if isinstance(item, InvalidItem):
+                yield _line(index, _error(str(item)))
+            else:
+                yield _line(index, engineer_item(item)[1])
+        return
+
+    pool = _get_pool(workers)
+    max_in_flight = max(1, max_in_flight)
+    pending = {}
+
+    def drain(block: bool):
+        nonlocal pool
+        done, _ = wait(list(pending), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            index, submitted_to = pending.pop(future)
+            try:
+                payload = future.result()[1]
+            except BrokenProcessPool:
+                # a worker died (OOM kill, ...): fail what was in it, start a new pool
+                _reset_pool(submitted_to)
+                pool = _get_pool(workers)
+                payload = _error("Feature engineering worker crashed")
+            except Exception as e:
+                payload = _error(str(e), "Error during feature engineering")
+            yield _line(index, payload)
+
+    try:
+        for index, item in enumerate(items):
+            if isinstance(item, InvalidItem):
+                yield _line(index, _error(str(item)))
+                continue
+            while len(pending) >= max_in_flight:
+                yield from drain(block=True)
+            try:
+                future = pool.submit(engineer_item, item)
+            except BrokenProcessPool:
+                _reset_pool(pool)
+                pool = _get_pool(workers)
+                future = pool.submit(engineer_item, item)
+            pending[future] = (index, pool)
+            yield from drain(block=False)
+        while pending:
+            yield from drain(block=True)
+    finally:
+        # client went away: don't leave its queued items to the pool
+        for future in pending:
+            future.cancel()
@@ -19,29 +19,113 @@ def _parse_iso_dt(value: str) -> datetime:
     return datetime.fromisoformat(value)
 
 
+# Accepted (exclusive) clinical ranges per signal; signals not listed are not checked
+VALIDATION_RANGES = {
+    "heart_rate": (0, 350),
+    "respiratory_rate": (0, 300),
+    "temperature": (26, 45),
+    "anion_gap": (5, 50),
+    "systolic_bp": (0, 375),
+    "diastolic_bp": (0, 375),
+    "mean_bp": (0, 300),
+}
+
+# Map JSON parameter names to feature prefixes
+PARAM_MAPPING = {
+    "gcs": "GCS",
+    "lactate": "Lactate",
+    "bun": "BUN",
+    "bilirubin": "Bilirubin",
+    "albumin": "Albumin",
+    "alk_phos": "AlkPhos",
+    "pt": "PT",
+    "inr": "INR",
+    "phosphate": "Phosphate",
+    "pao2": "PaO2",
+    "aptt": "aPTT",
+    "anion_gap": "AG",
+    "systolic_bp": "SYSBP",
+    "diastolic_bp": "DIASBP",
+    "mean_bp": "MEANBP",
+    "respiratory_rate": "RR",
+    "temperature": "TEMP",
+    "heart_rate": "HR",
+    "rdw": "RDW",
+}
+
+# Statistics kept per feature prefix, in the order they are added to the features
+FEATURE_STATS = {
+    "GCS": ("max", "mean"),
+    "Lactate": ("min", "max", "mean"),
+    "BUN": ("min", "max", "mean"),
+    "Bilirubin": ("max", "mean"),
+    "Albumin": ("min", "max", "mean"),
+    "AlkPhos": ("min", "max", "mean"),
+    "PT": ("mean", "min"),
+    "INR": ("mean", "min"),
+    "Phosphate": ("mean", "max"),
+    "PaO2": ("mean", "max"),
+    "aPTT": ("mean", "min"),
+    "AG": ("min", "max", "mean", "std"),
+    "SYSBP": ("min", "mean", "std"),
+    "DIASBP": ("min", "mean"),
+    "MEANBP": ("min", "mean"),
+    "RR": ("min", "max", "mean"),
+    "TEMP": ("min", "std"),
+    "HR": ("mean", "max", "std"),
+    "RDW": ("max", "mean", "min", "std"),
+}
+
+
+# Expected 51 features (as in your notebook; same order as observations.models.FEATURE_COLUMNS)
+EXPECTED_FEATURES = [
+    "GCS_max", "GCS_mean",
+    "Lactate_min", "Lactate_max", "Lactate_mean",
+    "BUN_min", "BUN_mean", "BUN_max",
+    "Bilirubin_max", "Bilirubin_mean",
+    "Albumin_mean", "Albumin_min", "Albumin_max",
+    "AlkPhos_mean", "AlkPhos_max", "AlkPhos_min",
+    "PT_mean", "PT_min",
+    "INR_mean", "INR_min",
+    "Phosphate_mean", "Phosphate_max",
+    "PaO2_mean", "PaO2_max",
+    "aPTT_mean", "aPTT_min",
+    "AG_mean", "AG_max", "AG_min", "AG_std",
+    "SYSBP_min", "SYSBP_mean", "SYSBP_std",
+    "DIASBP_min", "DIASBP_mean",
+    "age",
+    "RR_mean", "RR_max", "RR_min",
+    "TEMP_std", "TEMP_min",
+    "HR_mean", "HR_max", "HR_std",
+    "RDW_max", "RDW_mean", "RDW_min", "RDW_std",
+    "age_adj_comorbidity_score",
+    "MEANBP_min", "MEANBP_mean",
+]
+
+
 def validate_measurement_value(param: str, value: float) -> bool:
     """
     Validate if a measurement value is within acceptable clinical ranges.
 
     NOTE: This is copied from your notebook logic.
     """
-    validation_ranges = {
-        "heart_rate": (0, 350),
-        "respiratory_rate": (0, 300),
-        "temperature": (26, 45),
-        "anion_gap": (5, 50),
-        "systolic_bp": (0, 375),
-        "diastolic_bp": (0, 375),
-        "mean_bp": (0, 300),
-    }
-
-    if param not in validation_ranges:
+    if param not in VALIDATION_RANGES:
         return True  # No validation rule, accept the value
 
-    min_val, max_val = validation_ranges[param]
+    min_val, max_val = VALIDATION_RANGES[param]
     return min_val < value < max_val
 
 
+def comorbidity_score_error(score: Any) -> Optional[str]:
+    """
+    Why score isn't a valid age_adj_comorbidity_score, or None if it is.
+    Must be a number between -19 and 89 (your notebook rule); used as int.
+    """
+    if not isinstance(score, (int, float)) or not -19 <= score <= 89:
+        return f"Score must be between -19 and 89, got: {score}"
+    return None
+
+
 def validate_48h_coverage(
     measurements: List[Dict[str, Any]],
     admission_time: datetime,
@@ -137,7 +221,7 @@ def extract_values(
 
 
 def calculate_statistics(values):
-    if not values:
+    if values is None or len(values) == 0:
         return {"min": None, "max": None, "mean": None, "std": None}
 
     arr = np.array(values, dtype=float)
@@ -153,10 +237,123 @@ def calculate_statistics(values):
     }
 
 
+# -------------------------------------------------------------------
+# ✅ Columnar engine: one pass over the measurements
+# -------------------------------------------------------------------
+
+class SignalColumns:
+    """
+    Measurements of the 48h window pivoted into one float array per signal
+    (PARAM_MAPPING keys), built by a single pass that parses every timestamp
+    once. Gives the same results as validate_48h_coverage() +
+    extract_values() + calculate_statistics() per parameter.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Any] = {p: [] for p in PARAM_MAPPING}
+        self.errors: Dict[str, Exception] = {}   # first unexpected float() error per signal
+        self.timestamps: List[datetime] = []
+        self.n_vitals = 0
+        self.n_labs = 0
+
+    @classmethod
+    def from_measurements(cls, measurements, admission_time: datetime) -> "SignalColumns":
+        # Raises exactly where validate_48h_coverage() would (bad/missing timestamp,
+        # naive vs aware comparison), in the same measurement order
+        cols = cls()
+        window_end = admission_time + timedelta(hours=48)
+        values = cols.values
+        errors = cols.errors
+
+        for m in measurements:
+            timestamp = _parse_iso_dt(m["timestamp"])
+            if not admission_time <= timestamp <= window_end:
+                continue
+
+            cols.timestamps.append(timestamp)
+            if "heart_rate" in m or "systolic_bp" in m:
+                cols.n_vitals += 1
+            if "gcs" in m or "lactate" in m or "bun" in m:
+                cols.n_labs += 1
+
+            for param, raw in m.items():
+                column = values.get(param)
+                if column is None or raw is None or param in errors:
+                    continue
+                try:
+                    column.append(float(raw))
+                except (TypeError, ValueError):
+                    continue
+                except Exception as e:
+                    # extract_values() would raise this, but only once it gets to
+                    # this signal -- i.e. after the coverage / score checks
+                    errors[param] = e
+
+        # validate_measurement_value() as masks
+        for param, column in values.items():
+            arr = np.array(column, dtype=float)
+            if param in VALIDATION_RANGES and arr.size:
+                min_val, max_val = VALIDATION_RANGES[param]
+                arr = arr[(min_val < arr) & (arr < max_val)]
+            values[param] = arr
+        return cols
+
+    def statistics(self, param: str) -> Dict[str, Optional[float]]:
+        if param in self.errors:
+            raise self.errors[param]
+        return calculate_statistics(self.values[param])
+
+
+def _columnar_coverage(
+    measurements,
+    admission_time: datetime,
+    current_time: datetime,
+) -> Tuple[bool, str, Optional[SignalColumns]]:
+    """validate_48h_coverage() on top of SignalColumns (same checks, same messages)."""
+    if not measurements:
+        return False, "No measurements provided", None
+
+    hours_since_admission = (current_time - admission_time).total_seconds() / 3600
+    if hours_since_admission < 48:
+        return (
+            False,
+            f"Insufficient time since admission: {hours_since_admission:.1f} hours (need ≥48 hours)",
+            None,
+        )
+
+    cols = SignalColumns.from_measurements(measurements, admission_time)
+    if not cols.timestamps:
+        return False, "No measurements within the 48-hour window after admission", None
+
+    coverage_hours = (max(cols.timestamps) - min(cols.timestamps)).total_seconds() / 3600
+
+    if cols.n_vitals < 6:
+        return (
+            False,
+            f"Insufficient vital sign measurements: {cols.n_vitals} (need ≥6)",
+            None,
+        )
+    if cols.n_labs < 2:
+        return (
+            False,
+            f"Insufficient lab measurements: {cols.n_labs} (need ≥2)",
+            None,
+        )
+
+    return (
+        True,
+        f"Valid: {hours_since_admission:.1f}h since admission, "
+        f"{coverage_hours:.1f}h measurement coverage, "
+        f"{len(cols.timestamps)} measurements in 48h window",
+        cols,
+    )
+
+
 def engineer_features(
     patient_data: Dict[str, Any],
     training_df: Any = None,
     use_median_imputation: bool = True,
+    columnar: bool = True,
 ) -> Dict[str, Any]:
     """
     Convert raw ICU measurements JSON into model features.
@@ -173,6 +370,9 @@ def engineer_features(
       - age_adj_comorbidity_score
       - measurements: [{timestamp: ISO, ...signals...}, ...]
 
+    columnar=False runs the original per-parameter extraction (one pass over
+    the measurements per signal); the result is identical, it's just slower.
+
     Returns dict:
       {
         "success": bool,
@@ -206,7 +406,11 @@ def engineer_features(
             }
 
         # Validate 48-hour coverage
-        is_valid, message = validate_48h_coverage(measurements, admission_time, current_time)
+        if columnar:
+            is_valid, message, columns = _columnar_coverage(measurements, admission_time, current_time)
+        else:
+            is_valid, message = validate_48h_coverage(measurements, admission_time, current_time)
+            columns = None
         if not is_valid:
             return {
                 "success": False,
@@ -214,29 +418,6 @@ def engineer_features(
                 "details": message,
             }
 
-        # Map JSON parameter names to feature prefixes
-        param_mapping = {
-            "gcs": "GCS",
-            "lactate": "Lactate",
-            "bun": "BUN",
-            "bilirubin": "Bilirubin",
-            "albumin": "Albumin",
-            "alk_phos": "AlkPhos",
-            "pt": "PT",
-            "inr": "INR",
-            "phosphate": "Phosphate",
-            "pao2": "PaO2",
-            "aptt": "aPTT",
-            "anion_gap": "AG",
-            "systolic_bp": "SYSBP",
-            "diastolic_bp": "DIASBP",
-            "mean_bp": "MEANBP",
-            "respiratory_rate": "RR",
-            "temperature": "TEMP",
-            "heart_rate": "HR",
-            "rdw": "RDW",
-        }
-
         features: Dict[str, Optional[float]] = {}
 
         # Static features
@@ -245,156 +426,32 @@ def engineer_features(
         # Validate age_adj_comorbidity_score
         comorbidity_score = patient_data.get("age_adj_comorbidity_score")
         if comorbidity_score is not None:
-            # Must be integer between -19 and 89 (your notebook rule)
-            if (
-                not isinstance(comorbidity_score, (int, float))
-                or comorbidity_score < -19
-                or comorbidity_score > 89
-            ):
+            error = comorbidity_score_error(comorbidity_score)
+            if error:
                 return {
                     "success": False,
                     "error": "Invalid age_adj_comorbidity_score",
-                    "details": f"Score must be between -19 and 89, got: {comorbidity_score}",
+                    "details": error,
                 }
             features["age_adj_comorbidity_score"] = int(comorbidity_score)
         else:
             features["age_adj_comorbidity_score"] = None
 
         # Calculate statistics for each parameter
-        for json_param, feature_prefix in param_mapping.items():
-            values = extract_values(measurements, json_param, admission_time)
-            stats = calculate_statistics(values)
+        for json_param, feature_prefix in PARAM_MAPPING.items():
+            if columns is not None:
+                stats = columns.statistics(json_param)
+            else:
+                values = extract_values(measurements, json_param, admission_time)
+                stats = calculate_statistics(values)
 
             # Create feature names based on what statistics are needed for each parameter
-            if feature_prefix == "GCS":
-                # GCS: max, mean only
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-
-            elif feature_prefix in ["Lactate", "BUN", "Albumin", "AlkPhos"]:
-                # These need min, max, mean
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-
-            elif feature_prefix == "Bilirubin":
-                # Bilirubin: max, mean only
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-
-            elif feature_prefix in ["PT", "INR", "aPTT"]:
-                # These need mean, min only
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-
-            elif feature_prefix in ["Phosphate", "PaO2"]:
-                # These need mean, max only
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-
-            elif feature_prefix == "RDW":
-                # RDW needs max, mean, min, std
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["std"] is not None:
-                    features[f"{feature_prefix}_std"] = stats["std"]
-
-            elif feature_prefix == "AG":
-                # Anion gap needs all statistics
-                for stat_name, stat_value in stats.items():
-                    if stat_value is not None:
-                        features[f"{feature_prefix}_{stat_name}"] = stat_value
-
-            elif feature_prefix == "SYSBP":
-                # SYSBP needs min, mean, std
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-                if stats["std"] is not None:
-                    features[f"{feature_prefix}_std"] = stats["std"]
-
-            elif feature_prefix == "DIASBP":
-                # DIASBP needs min, mean only
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-
-            elif feature_prefix == "HR":
-                # Heart rate needs mean, max, std only
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-                if stats["std"] is not None:
-                    features[f"{feature_prefix}_std"] = stats["std"]
-
-            elif feature_prefix == "RR":
-                # Respiratory rate: min, max, mean
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["max"] is not None:
-                    features[f"{feature_prefix}_max"] = stats["max"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-
-            elif feature_prefix == "TEMP":
-                # Temperature: min, std
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["std"] is not None:
-                    features[f"{feature_prefix}_std"] = stats["std"]
-
-            elif feature_prefix == "MEANBP":
-                # Mean BP: min, mean
-                if stats["min"] is not None:
-                    features[f"{feature_prefix}_min"] = stats["min"]
-                if stats["mean"] is not None:
-                    features[f"{feature_prefix}_mean"] = stats["mean"]
-
-        # Expected 51 features (as in your notebook)
-        expected_features = [
-            "GCS_max", "GCS_mean",
-            "Lactate_min", "Lactate_max", "Lactate_mean",
-            "BUN_min", "BUN_mean", "BUN_max",
-            "Bilirubin_max", "Bilirubin_mean",
-            "Albumin_mean", "Albumin_min", "Albumin_max",
-            "AlkPhos_mean", "AlkPhos_max", "AlkPhos_min",
-            "PT_mean", "PT_min",
-            "INR_mean", "INR_min",
-            "Phosphate_mean", "Phosphate_max",
-            "PaO2_mean", "PaO2_max",
-            "aPTT_mean", "aPTT_min",
-            "AG_mean", "AG_max", "AG_min", "AG_std",
-            "SYSBP_min", "SYSBP_mean", "SYSBP_std",
-            "DIASBP_min", "DIASBP_mean",
-            "age",
-            "RR_mean", "RR_max", "RR_min",
-            "TEMP_std", "TEMP_min",
-            "HR_mean", "HR_max", "HR_std",
-            "RDW_max", "RDW_mean", "RDW_min", "RDW_std",
-            "age_adj_comorbidity_score",
-            "MEANBP_min", "MEANBP_mean",
-        ]
+            for stat_name in FEATURE_STATS[feature_prefix]:
+                if stats[stat_name] is not None:
+                    features[f"{feature_prefix}_{stat_name}"] = stats[stat_name]
 
         missing_features = [
-            f for f in expected_features if f not in features or features[f] is None
+            f for f in EXPECTED_FEATURES if f not in features or features[f] is None
         ]
 
         # Apply median imputation if requested and training_df is provided
@@ -422,7 +479,7 @@ def engineer_features(
 
         # Update missing features list after imputation
         still_missing = [
-            f for f in expected_features if f not in features or features[f] is None
+            f for f in EXPECTED_FEATURES if f not in features or features[f] is None
         ]
 
         return {
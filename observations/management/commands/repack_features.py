@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from observations.models import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, ObservationSet, pack_feature_values
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite ObservationSet.features_packed for rows that are missing it or were "
+        "packed with another FEATURE_COLUMNS schema (or for all rows with --all)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Repack every row, e.g. after feature columns were written with raw SQL.",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows read/written per chunk.")
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        qs = ObservationSet.objects.all()
+        if not options["all"]:
+            qs = qs.filter(~Q(features_schema=FEATURE_SCHEMA_VERSION) | Q(features_schema__isnull=True))
+
+        t0 = time.perf_counter()
+        done = 0
+        last_pk = 0
+        while True:
+            # keyset pagination: never iterate a cursor over the table being written
+            rows = list(qs.filter(pk__gt=last_pk).order_by("pk").values_list("pk", *FEATURE_COLUMNS)[:chunk_size])
+            if not rows:
+                break
+            ObservationSet.objects.bulk_update(
+                [
+                    ObservationSet(pk=pk, features_packed=pack_feature_values(values),
+                                   features_schema=FEATURE_SCHEMA_VERSION)
+                    for pk, *values in rows
+                ],
+                ["features_packed", "features_schema"],
+                batch_size=500,
+            )
+            done += len(rows)
+            last_pk = rows[-1][0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Repacked {done} observation sets in {time.perf_counter() - t0:.2f}s "
+            f"(schema {FEATURE_SCHEMA_VERSION})"
+        ))
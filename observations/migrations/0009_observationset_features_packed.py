@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:48
+
+from django.db import migrations, models
+
+from observations.models import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, pack_feature_values
+
+
+def backfill_packed(apps, schema_editor):
+    ObservationSet = apps.get_model("observations", "ObservationSet")
+    last_pk = 0
+    while True:
+        rows = list(
+            ObservationSet.objects.filter(pk__gt=last_pk).order_by("pk")
+            .values_list("pk", *FEATURE_COLUMNS)[:2000]
+        )
+        if not rows:
+            break
+        ObservationSet.objects.bulk_update(
+            [ObservationSet(pk=pk, features_packed=pack_feature_values(values),
+                            features_schema=FEATURE_SCHEMA_VERSION) for pk, *values in rows],
+            ["features_packed", "features_schema"],
+            batch_size=500,
+        )
+        last_pk = rows[-1][0]
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('observations', '0008_rename_ag_max_observationset_ag_max'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='observationset',
+            name='features_packed',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='observationset',
+            name='features_schema',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_packed, migrations.RunPython.noop),
+    ]
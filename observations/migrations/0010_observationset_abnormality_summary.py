@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('observations', '0009_observationset_features_packed'),
+        ('patients', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='observationset',
+            name='abnormal_count',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='observationset',
+            name='extreme_count',
+            field=models.PositiveSmallIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='observationset',
+            name='max_severity',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='observationset',
+            name='top_driver',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='observationset',
+            index=models.Index(fields=['encounter', '-recorded_at'], name='obs_encounter_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='observationset',
+            index=models.Index(fields=['-extreme_count', '-max_severity'], name='obs_abnormality_idx'),
+        ),
+    ]
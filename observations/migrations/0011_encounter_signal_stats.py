@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('observations', '0010_observationset_abnormality_summary'),
+        ('patients', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EncounterSignalStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('signal', models.CharField(max_length=32)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0.0)),
+                ('m2', models.FloatField(default=0.0)),
+                ('min', models.FloatField(null=True)),
+                ('max', models.FloatField(null=True)),
+                ('nonfinite', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('encounter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='signal_stats', to='patients.encounter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EncounterSignalValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField(null=True)),
+                ('measured_at', models.DateTimeField()),
+                ('stats', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='values', to='observations.encountersignalstats')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='encountersignalstats',
+            constraint=models.UniqueConstraint(fields=('encounter', 'signal'), name='uniq_encounter_signal_stats'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-17 00:25
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+from observations.aggregation import _welford_add
+
+
+def drop_duplicate_values(apps, schema_editor):
+    """
+    Keeps the first of each repeated (signal, timestamp, value) and recomputes
+    the running statistics of the signals that had duplicates (retried uploads).
+    """
+    EncounterSignalStats = apps.get_model("observations", "EncounterSignalStats")
+    EncounterSignalValue = apps.get_model("observations", "EncounterSignalValue")
+
+    dupes = (
+        EncounterSignalValue.objects.values("stats_id", "measured_at", "value")
+        .annotate(n=Count("id"), keep=Min("id"))
+        .filter(n__gt=1)
+    )
+    affected = set()
+    for d in dupes.iterator():
+        EncounterSignalValue.objects.filter(
+            stats_id=d["stats_id"], measured_at=d["measured_at"], value=d["value"]
+        ).exclude(id=d["keep"]).delete()
+        affected.add(d["stats_id"])
+
+    for row in EncounterSignalStats.objects.filter(id__in=affected):
+        row.count, row.mean, row.m2, row.min, row.max, row.nonfinite = 0, 0.0, 0.0, None, None, False
+        for value in EncounterSignalValue.objects.filter(stats=row).order_by("id").values_list("value", flat=True):
+            _welford_add(row, float("nan") if value is None else value)
+        row.save(update_fields=["count", "mean", "m2", "min", "max", "nonfinite"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('observations', '0011_encounter_signal_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_values, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='encountersignalvalue',
+            constraint=models.UniqueConstraint(fields=('stats', 'measured_at', 'value'), name='uniq_signal_value'),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import zlib
+
+import numpy as np
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
@@ -58,6 +61,41 @@ FEATURE_COLUMNS = [
     "MEANBP_mean",
 ]
 
+# ✅ Packed copy of the features (ObservationSet.features_packed):
+# little-endian float64 in FEATURE_COLUMNS order, NULL stored as NaN (the NaN
+# IS the missing mask). The schema id changes whenever FEATURE_COLUMNS does,
+# so blobs written with an older column list are never misread.
+FEATURE_DTYPE = np.dtype("<f8")
+FEATURE_ROW_BYTES = FEATURE_DTYPE.itemsize * len(FEATURE_COLUMNS)
+FEATURE_SCHEMA_VERSION = zlib.crc32(",".join(FEATURE_COLUMNS).encode()) & 0x7FFFFFFF
+
+
+# Columns computed from the features on save
+DERIVED_FIELDS = (
+    "features_packed", "features_schema",
+    "abnormal_count", "extreme_count", "max_severity", "top_driver",
+)
+
+
+def pack_feature_values(values) -> bytes:
+    """FEATURE_COLUMNS-ordered values (None = missing) -> packed blob."""
+    return np.array(
+        [np.nan if v is None else v for v in values], dtype=FEATURE_DTYPE
+    ).tobytes()
+
+
+class ObservationSetQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # update() (and bulk_update(), which goes through it) skips save(): if it
+        # changes feature columns, drop the derived copies of the old values so
+        # readers fall back to the columns until repack_features /
+        # backfill_abnormality recompute them
+        if not set(kwargs).isdisjoint(FEATURE_COLUMNS):
+            for name in DERIVED_FIELDS:
+                field = self.model._meta.get_field(name)
+                kwargs.setdefault(name, None if field.null else field.get_default())
+        return super().update(**kwargs)
+
 
 class ObservationSet(models.Model):
     """A structured snapshot of vitals/labs used for ML prediction."""
@@ -149,9 +187,84 @@ class ObservationSet(models.Model):
     MEANBP_min = models.FloatField(null=True, blank=True)
     MEANBP_mean = models.FloatField(null=True, blank=True)
 
+    # ---- Packed copy of the features above, kept in sync by save() ----
+    features_packed = models.BinaryField(null=True, editable=False)
+    features_schema = models.PositiveIntegerField(null=True, editable=False)
+
+    # ---- Clinical driver summary (risk/driver_logic.py), set on save by a
+    # pre_save receiver in risk/signals.py; NULL = not computed yet ----
+    abnormal_count = models.PositiveSmallIntegerField(null=True, editable=False)
+    extreme_count = models.PositiveSmallIntegerField(null=True, editable=False)   # TOO HIGH / TOO LOW
+    max_severity = models.FloatField(null=True, editable=False)
+    top_driver = models.CharField(max_length=64, blank=True, default="", editable=False)
+
+    objects = ObservationSetQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["encounter", "-recorded_at"], name="obs_encounter_recent_idx"),
+            models.Index(fields=["-extreme_count", "-max_severity"], name="obs_abnormality_idx"),
+        ]
+
     def __str__(self):
         return f"ObservationSet #{self.id} for Encounter #{self.encounter_id}"
 
     @staticmethod
     def feature_columns():
         return FEATURE_COLUMNS
+
+    def pack_features(self):
+        """Refreshes features_packed / features_schema from the feature fields."""
+        self.features_packed = pack_feature_values(getattr(self, c) for c in FEATURE_COLUMNS)
+        self.features_schema = FEATURE_SCHEMA_VERSION
+
+    def save(self, *args, **kwargs):
+        # bulk_create() bypasses this (rows without a blob are read from the
+        # columns); QuerySet.update() clears the blob, see ObservationSetQuerySet
+        self.pack_features()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and set(update_fields) & set(FEATURE_COLUMNS):
+            kwargs["update_fields"] = {*update_fields, *DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class EncounterSignalStats(models.Model):
+    """
+    Running 48h-window statistics of one raw signal (feature_engineering
+    PARAM_MAPPING key, e.g. "heart_rate") for one encounter, updated per
+    measurement by observations/aggregation.py (Welford mean / M2, min, max).
+    """
+    encounter = models.ForeignKey(Encounter, on_delete=models.CASCADE, related_name="signal_stats")
+    signal = models.CharField(max_length=32)
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0.0)
+    m2 = models.FloatField(default=0.0)
+    min = models.FloatField(null=True)
+    max = models.FloatField(null=True)
+    nonfinite = models.BooleanField(default=False)      # NaN/inf seen -> read from the values
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["encounter", "signal"], name="uniq_encounter_signal_stats"),
+        ]
+
+    def __str__(self):
+        return f"{self.signal} for Encounter #{self.encounter_id} (n={self.count})"
+
+
+class EncounterSignalValue(models.Model):
+    """
+    Accepted values behind EncounterSignalStats, in arrival order (id).
+    A (timestamp, value) pair is stored once per signal: a re-sent measurement
+    is a duplicate, a different value at the same timestamp is not.
+    """
+    stats = models.ForeignKey(EncounterSignalStats, on_delete=models.CASCADE, related_name="values")
+    value = models.FloatField(null=True)          # NULL = NaN (SQLite can't store NaN)
+    measured_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # NULL (NaN) values aren't covered here; add_measurements checks them
+            models.UniqueConstraint(fields=["stats", "measured_at", "value"], name="uniq_signal_value"),
+        ]
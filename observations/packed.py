@@ -0,0 +1,81 @@
+# observations/packed.py
+"""
+Bulk numeric loading from ObservationSet.features_packed.
+
+    ids, X = load_feature_matrix(ObservationSet.objects.filter(...))
+
+reads only (id, features_schema, features_packed) and turns the blobs into
+one contiguous (n, 51) float64 matrix with a single join + np.frombuffer,
+instead of 51-tuples -> Python floats -> np.array.
+
+Rows whose blob is missing or was written under another FEATURE_COLUMNS
+schema are read from the feature columns instead: rows from bulk_create(),
+rows whose features were changed via QuerySet.update() / bulk_update() (the
+ObservationSet queryset clears the blob then), and rows packed before the
+column list changed. The result then equals values_list(*FEATURE_COLUMNS)
+with NULL -> NaN.
+
+Feature columns written with raw SQL aren't seen: run
+`manage.py repack_features --all` after such writes.
+"""
+import numpy as np
+
+from .models import (
+    FEATURE_COLUMNS,
+    FEATURE_DTYPE,
+    FEATURE_ROW_BYTES,
+    FEATURE_SCHEMA_VERSION,
+    ObservationSet,
+)
+
+_INDEX = {c: i for i, c in enumerate(FEATURE_COLUMNS)}
+
+
+def covers(columns) -> bool:
+    """True if every column can be served from the packed blob."""
+    return all(c in _INDEX for c in columns)
+
+
+def _is_fresh(schema, blob) -> bool:
+    return schema == FEATURE_SCHEMA_VERSION and blob is not None and len(blob) == FEATURE_ROW_BYTES
+
+
+def feature_matrix(rows, columns=None) -> np.ndarray:
+    """
+    rows: sequence of (pk, features_schema, features_packed)
+    Returns (n, len(columns)) float64, columns default FEATURE_COLUMNS;
+    columns that aren't features stay NaN.
+    """
+    n = len(rows)
+    if all(_is_fresh(schema, blob) for _, schema, blob in rows):
+        # bytearray -> the array is writable without another copy
+        buf = bytearray().join(blob for _, _, blob in rows)
+        X = np.frombuffer(buf, dtype=FEATURE_DTYPE).reshape(n, len(FEATURE_COLUMNS))
+    else:
+        X = np.full((n, len(FEATURE_COLUMNS)), np.nan, dtype=FEATURE_DTYPE)
+        stale = {}
+        for i, (pk, schema, blob) in enumerate(rows):
+            if _is_fresh(schema, blob):
+                X[i] = np.frombuffer(blob, dtype=FEATURE_DTYPE)
+            else:
+                stale[pk] = i
+        if stale:
+            values = ObservationSet.objects.filter(pk__in=list(stale)).values_list("pk", *FEATURE_COLUMNS)
+            for pk, *vals in values:
+                X[stale[pk]] = np.array(vals, dtype=float)
+
+    if columns is None or list(columns) == FEATURE_COLUMNS:
+        return X
+
+    out = np.full((n, len(columns)), np.nan, dtype=FEATURE_DTYPE)
+    pairs = [(i, _INDEX[c]) for i, c in enumerate(columns) if c in _INDEX]
+    if pairs:
+        dst, src = zip(*pairs)
+        out[:, list(dst)] = X[:, list(src)]
+    return out
+
+
+def load_feature_matrix(queryset, columns=None):
+    """QuerySet of ObservationSet -> (ids, (n, len(columns)) ndarray)."""
+    rows = list(queryset.values_list("pk", "features_schema", "features_packed"))
+    return [r[0] for r in rows], feature_matrix(rows, columns)
@@ -0,0 +1,71 @@
+import json
+from datetime import timedelta
+
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from patients.models import Encounter, Patient
+
+from .aggregation import add_measurements, encounter_statistics
+from .feature_engineering import calculate_statistics
+from .models import EncounterSignalValue
+
+
+class AddMeasurementsTests(TestCase):
+    def setUp(self):
+        patient = Patient.objects.create(mrn="T-1", full_name="Test Patient")
+        self.admitted = timezone.now() - timedelta(hours=12)
+        self.enc = Encounter.objects.create(patient=patient, admitted_at=self.admitted)
+
+    def at(self, hours):
+        return (self.admitted + timedelta(hours=hours)).isoformat()
+
+    def test_retry_is_not_counted_twice(self):
+        batch = [{"timestamp": self.at(1), "lactate": 1.5}, {"timestamp": self.at(2), "lactate": 2.5}]
+        self.assertEqual(add_measurements(self.enc, batch), (2, 0))
+        self.assertEqual(add_measurements(self.enc, batch), (0, 2))
+        self.assertEqual(encounter_statistics(self.enc)["lactate"], calculate_statistics([1.5, 2.5]))
+
+    def test_distinct_values_at_one_timestamp_are_kept(self):
+        batch = [{"timestamp": self.at(1), "lactate": 1.2}, {"timestamp": self.at(1), "lactate": 3.4}]
+        self.assertEqual(add_measurements(self.enc, batch), (2, 0))
+        self.assertEqual(add_measurements(self.enc, [{"timestamp": self.at(1), "lactate": 5.0}]), (1, 0))
+        self.assertEqual(
+            encounter_statistics(self.enc)["lactate"], calculate_statistics([1.2, 3.4, 5.0])
+        )
+
+
+class EncounterMeasurementsApiTests(TestCase):
+    def setUp(self):
+        patient = Patient.objects.create(mrn="T-2", full_name="Test Patient")
+        self.admitted = timezone.now() - timedelta(hours=12)
+        self.enc = Encounter.objects.create(patient=patient, admitted_at=self.admitted)
+        user = User.objects.create_user("nurse", password="x")
+        user.user_permissions.add(Permission.objects.get(codename="add_observationset"))
+        self.client.force_login(user)
+        self.url = reverse("observations:encounter_measurements_api", args=[self.enc.id])
+
+    def post(self, **payload):
+        payload.setdefault("measurements", [
+            {"timestamp": (self.admitted + timedelta(hours=1)).isoformat(), "lactate": 1.5},
+        ])
+        return self.client.post(self.url, data=json.dumps(payload), content_type="application/json")
+
+    def test_invalid_static_fields_store_nothing(self):
+        for field, value in [
+            ("age_adj_comorbidity_score", 120),
+            ("age_adj_comorbidity_score", "abc"),
+            ("age", "nan"),
+            ("age", "inf"),
+        ]:
+            response = self.post(**{field: value})
+            self.assertEqual(response.status_code, 400, (field, value))
+        self.assertFalse(EncounterSignalValue.objects.exists())
+
+    def test_comorbidity_score_is_an_int(self):
+        response = self.post(age=70, age_adj_comorbidity_score="4.0")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["features"]["age_adj_comorbidity_score"], 4)
+        self.assertEqual(response.json()["accepted_values"], 1)
@@ -10,4 +10,9 @@ urlpatterns = [
 
     # 🔹 NEW: API endpoint for JSON upload → feature extraction
     path("engineer-features/", views.engineer_features_api, name="engineer_features_api"),
+    path("engineer-features/bulk/", views.engineer_features_bulk_api, name="engineer_features_bulk_api"),
+
+    # 🔹 Incremental per-encounter aggregation (POST new measurements, GET features)
+    path("encounters/<int:encounter_id>/measurements/", views.encounter_measurements_api,
+         name="encounter_measurements_api"),
 ]
@@ -2,20 +2,25 @@
 
 import json
 
+import numpy as np
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, permission_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_http_methods, require_POST
 
 from audit.utils import log_event
+from hospital_ai.metrics import track_request
 from patients.models import Encounter
 
+from . import bulk
 from .forms import ObservationSetForm
 from .models import ObservationSet
 
 # ✅ import your feature engineering function
-from .feature_engineering import engineer_features
+from .aggregation import add_measurements, encounter_features
+from .feature_engineering import comorbidity_score_error
 
 
 @login_required
@@ -60,6 +65,7 @@ def obs_detail(request, obs_id: int):
 @login_required
 @permission_required("observations.add_observationset", raise_exception=True)
 @require_POST
+@track_request("observations.engineer_features_api")
 def engineer_features_api(request):
     """
     POST JSON -> returns {"status":"ok","features":{...}, "missing_features":[...]} etc.
@@ -67,6 +73,8 @@ def engineer_features_api(request):
     Accepts either:
       1) Raw ICU JSON (has admission_time + current_time + measurements) -> runs engineer_features()
       2) Already-engineered feature JSON -> echoes back (and reports missing keys)
+
+    Many patients at once: engineer_features_bulk_api.
     """
     try:
         data = json.loads(request.body.decode("utf-8"))
@@ -80,63 +88,129 @@ def engineer_features_api(request):
     if isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict):
         data = data[0]
 
-    if not isinstance(data, dict):
-        return JsonResponse(
-            {"status": "error", "message": "JSON must be an object (dict)"},
-            status=400,
-        )
+    status, payload = bulk.engineer_item(data)
+    return JsonResponse(payload, status=status)
+
+
+# ✅ Bulk: many patients per request, results streamed back as NDJSON
+@login_required
+@permission_required("observations.add_observationset", raise_exception=True)
+@require_POST
+@track_request("observations.engineer_features_bulk_api")
+def engineer_features_bulk_api(request):
+    """
+    POST a JSON array or NDJSON (one payload per line, Content-Type
+    application/x-ndjson) of raw ICU JSON / feature JSON payloads.
 
-    # Detect "raw ICU JSON" format (your notebook format)
-    is_raw = (
-        "admission_time" in data
-        and "current_time" in data
-        and isinstance(data.get("measurements"), list)
+    Streams back one NDJSON line per payload as soon as it's done (not in
+    input order): {"index": i, ...same fields as engineer_features_api...}.
+    A payload that fails gives {"index": i, "status": "error", "message": ...}
+    and doesn't stop the others. See observations/bulk.py.
+    """
+    items = bulk.iter_items(request, request.content_type, settings.FEATURE_BULK_MAX_ITEM_BYTES)
+    lines = bulk.stream_engineered(
+        items,
+        workers=settings.FEATURE_BULK_WORKERS,
+        max_in_flight=settings.FEATURE_BULK_MAX_IN_FLIGHT,
     )
+    response = StreamingHttpResponse(lines, content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"  # nginx: pass lines through as they come
+    return response
 
-    expected = list(ObservationSet.feature_columns())
 
-    if is_raw:
-        result = engineer_features(data)
+def _static_features(raw):
+    """
+    age / age_adj_comorbidity_score from the request (strings or numbers),
+    checked like engineer_features(); raises ValueError.
+    """
+    try:
+        age, score = (
+            None if raw[k] in (None, "") else float(raw[k])
+            for k in ("age", "age_adj_comorbidity_score")
+        )
+    except (TypeError, ValueError):
+        raise ValueError("age / age_adj_comorbidity_score must be numbers")
+    if age is not None and not np.isfinite(age):
+        raise ValueError(f"age must be a finite number, got: {age}")
+    if score is not None:
+        error = comorbidity_score_error(score)
+        if error:
+            raise ValueError(f"Invalid age_adj_comorbidity_score: {error}")
+        score = int(score)
+    return {"age": age, "age_adj_comorbidity_score": score}
+
+
+# ✅ Incremental 48h aggregation: post new measurements as they arrive
+@login_required
+@permission_required("observations.add_observationset", raise_exception=True)
+@require_http_methods(["GET", "POST"])
+@track_request("observations.encounter_measurements_api")
+def encounter_measurements_api(request, encounter_id: int):
+    """
+    POST {"measurements": [{timestamp, ...signals...}, ...], "age": ..,
+          "age_adj_comorbidity_score": ..}  (or just the list)
+      -> adds them to the encounter's running statistics (observations/aggregation.py)
+    GET -> current features only (?age=..&age_adj_comorbidity_score=..)
+
+    Returns {"status":"ok","accepted_values":n,"duplicate_values":n,"features":{...51...},
+             "missing_features":[...]}
+    Re-sending the same measurements is safe: a value already stored for that
+    signal and timestamp is counted as a duplicate and not added again.
+    age / age_adj_comorbidity_score are checked (as in engineer_features)
+    before anything is stored.
+    """
+    enc = get_object_or_404(Encounter, id=encounter_id)
+    static = {
+        "age": request.GET.get("age"),
+        "age_adj_comorbidity_score": request.GET.get("age_adj_comorbidity_score"),
+    }
+    accepted = duplicates = 0
+    data = None
 
-        if not result.get("success"):
+    if request.method == "POST":
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid JSON payload"}, status=400)
+
+        if isinstance(data, dict):
+            static.update({k: data.get(k, static[k]) for k in static})
+            data = data.get("measurements")
+        if not isinstance(data, list):
             return JsonResponse(
-                {
-                    "status": "error",
-                    "message": result.get("error", "Feature engineering failed"),
-                    "details": result.get("details"),
-                },
+                {"status": "error", "message": "measurements must be a list"},
                 status=400,
             )
 
-        # ✅ Always normalize + compute missing/unknown here
-        features = result.get("features", {}) or {}
-
-        missing = [k for k in expected if features.get(k) in (None, "")]
-        unknown = [k for k in features.keys() if k not in expected]
-
-        return JsonResponse(
-            {
-                "status": "ok",
-                "features": {k: features.get(k) for k in expected},  # return only expected keys
-                "missing_features": missing if missing else None,
-                "imputed_features": result.get("imputed_features") or None,
-                "unknown_keys": unknown if unknown else None,
-                "validation_message": result.get("validation_message"),
-            }
+    # before anything is stored
+    try:
+        static = _static_features(static)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    if data is not None:
+        try:
+            accepted, duplicates = add_measurements(enc, data)
+        except (KeyError, TypeError, ValueError) as e:
+            # bad/missing timestamp etc.; nothing was stored
+            message = f"Missing {e}" if isinstance(e, KeyError) else str(e)
+            return JsonResponse({"status": "error", "message": message}, status=400)
+
+        log_event(
+            user=request.user,
+            action="MEASUREMENTS_ADDED",
+            obj=enc,
+            details={"received": len(data), "accepted": accepted, "duplicates": duplicates},
         )
 
-    # Otherwise treat as already-feature JSON and just check missing keys
-    features = data
-
-    missing = [k for k in expected if features.get(k) in (None, "")]
-    unknown = [k for k in features.keys() if k not in expected]
-
+    features = encounter_features(enc, **static)
+    missing = [k for k, v in features.items() if v is None]
     return JsonResponse(
         {
             "status": "ok",
-            "features": {k: features.get(k) for k in expected},  # only return expected keys
+            "accepted_values": accepted,
+            "duplicate_values": duplicates,
+            "features": features,
             "missing_features": missing if missing else None,
-            "unknown_keys": unknown if unknown else None,
-            "validation_message": "Feature JSON loaded.",
         }
     )
@@ -11,9 +11,33 @@ from observations.models import ObservationSet
 from risk.models import RiskAssessment
 
 
+def _latest_abnormality(queryset, obs_filter: str):
+    """
+    Annotates latest_extreme / latest_abnormal / latest_severity from the
+    newest ObservationSet (summary columns filled on save).
+    """
+    # same "latest" as risk.generate (newest by id), so the ward list sorts on
+    # the observation set that gets scored
+    latest_obs = ObservationSet.objects.filter(**{obs_filter: OuterRef("pk")}).order_by("-id")
+    return queryset.annotate(
+        latest_extreme=Subquery(latest_obs.values("extreme_count")[:1]),
+        latest_abnormal=Subquery(latest_obs.values("abnormal_count")[:1]),
+        latest_severity=Subquery(latest_obs.values("max_severity")[:1]),
+    )
+
+
+# ?order=abnormal: most TOO HIGH / TOO LOW values first, then worst severity
+_ABNORMAL_ORDER = [
+    F("latest_extreme").desc(nulls_last=True),
+    F("latest_abnormal").desc(nulls_last=True),
+    F("latest_severity").desc(nulls_last=True),
+]
+
+
 @login_required
 def patient_list(request):
     q = request.GET.get("q", "").strip()
+    order = request.GET.get("order", "")
 
     # Latest risk per patient (across all encounters)
     latest_risk_sq = RiskAssessment.objects.filter(
@@ -29,9 +53,14 @@ def patient_list(request):
         Patient.objects.all()
         .annotate(latest_risk_180d=Subquery(latest_risk_sq))
         .annotate(latest_risk_band=Subquery(latest_band_sq))
-        # Sort by risk DESC (nulls last), then by name
-        .order_by(F("latest_risk_180d").desc(nulls_last=True), "full_name")
     )
+    patients = _latest_abnormality(patients, "encounter__patient")
+
+    if order == "abnormal":
+        patients = patients.order_by(*_ABNORMAL_ORDER, "full_name")
+    else:
+        # Sort by risk DESC (nulls last), then by name
+        patients = patients.order_by(F("latest_risk_180d").desc(nulls_last=True), "full_name")
 
     if q:
         patients = patients.filter(
@@ -42,6 +71,7 @@ def patient_list(request):
     return render(request, "patients/patient_list.html", {
         "patients": patients,
         "q": q,
+        "order": order,
     })
 
 
@@ -62,8 +92,17 @@ def patient_create(request):
 @login_required
 def patient_detail(request, patient_id: int):
     patient = get_object_or_404(Patient, id=patient_id)
-    encounters = patient.encounters.order_by("-admitted_at")
-    return render(request, "patients/patient_detail.html", {"patient": patient, "encounters": encounters})
+    order = request.GET.get("order", "")
+    encounters = _latest_abnormality(patient.encounters.all(), "encounter")
+    if order == "abnormal":
+        encounters = encounters.order_by(*_ABNORMAL_ORDER, "-admitted_at")
+    else:
+        encounters = encounters.order_by("-admitted_at")
+    return render(request, "patients/patient_detail.html", {
+        "patient": patient,
+        "encounters": encounters,
+        "order": order,
+    })
 
 
 @login_required
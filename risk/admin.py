@@ -1,7 +1,31 @@
 from django.contrib import admin
-from .models import RiskAssessment
+from .models import FeatureDrift, RiskAssessment, RiskJob, ShadowAgreement, ShadowResult
 
 @admin.register(RiskAssessment)
 class RiskAssessmentAdmin(admin.ModelAdmin):
     list_display = ("id","encounter","risk_180d","risk_band","model_version","created_at","created_by")
     list_filter = ("risk_band","model_version")
+
+
+@admin.register(RiskJob)
+class RiskJobAdmin(admin.ModelAdmin):
+    list_display = ("id","encounter","status","attempts","assessment","created_at","finished_at")
+    list_filter = ("status",)
+
+
+@admin.register(FeatureDrift)
+class FeatureDriftAdmin(admin.ModelAdmin):
+    list_display = ("feature","unit","model_version","count","missing","psi","ks","updated_at")
+    list_filter = ("model_version","unit")
+    search_fields = ("feature",)
+
+
+@admin.register(ShadowResult)
+class ShadowResultAdmin(admin.ModelAdmin):
+    list_display = ("assessment","production_version","shadow_version","production_proba","shadow_proba","production_band","shadow_band","created_at")
+    list_filter = ("shadow_version","production_band","shadow_band")
+
+
+@admin.register(ShadowAgreement)
+class ShadowAgreementAdmin(admin.ModelAdmin):
+    list_display = ("production_version","shadow_version","count","band_flips","flips_up","flips_down","max_abs_delta","updated_at")
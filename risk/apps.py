@@ -1,5 +1,26 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 class RiskConfig(AppConfig):
     default_auto_field='django.db.models.BigAutoField'
     name='risk'
+
+    def ready(self):
+        from . import signals  # noqa: F401 (abnormality summary, drift monitor)
+
+
+def start_web_threads():
+    """
+    Background threads that belong in a web worker only (not in migrate,
+    risk_worker, rescore, ...). Called by hospital_ai/wsgi.py, or by
+    gunicorn.conf.py's post_fork when the app is preloaded in the master.
+    """
+    # With ML_PRELOAD_MODEL the master has already warmed up before fork
+    # (gunicorn.conf.py); this only does work in the worker if that failed.
+    if settings.ML_WARMUP_ON_BOOT or settings.ML_PRELOAD_MODEL:
+        from .warmup import start_warmup
+        start_warmup()
+
+    if settings.RISK_JOBS_ASYNC and settings.RISK_JOBS_RUNNER == "thread":
+        from .jobs import start_sweeper
+        start_sweeper()
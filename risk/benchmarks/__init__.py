@@ -0,0 +1,7 @@
+"""
+Hot-path benchmarks (manage.py benchmark_hotpath).
+
+synthetic  -- offline model bundle + ObservationSets (no real model/DB needed)
+stages     -- per-stage timing (p50/p95/p99) and memory
+compare    -- diff a run against a stored baseline JSON
+"""
@@ -0,0 +1,38 @@
+# risk/benchmarks/compare.py
+"""Diff a benchmark run against a stored baseline (both JSON from benchmark_hotpath)."""
+import json
+
+
+def _key(result) -> tuple:
+    return result["stage"], tuple(sorted(result["params"].items()))
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(current: dict, baseline: dict, threshold: float = 1.2, metric: str = "p50_ms") -> list:
+    """
+    One row per stage/params present in both runs:
+      {"stage", "params", "baseline", "current", "ratio", "status"}
+    status: "regression" if current/baseline > threshold,
+            "improvement" if < 1/threshold, else "ok".
+    """
+    base = {_key(r): r for r in baseline.get("results", [])}
+    rows = []
+    for r in current.get("results", []):
+        b = base.get(_key(r))
+        if b is None or not b.get(metric):
+            continue
+        ratio = r[metric] / b[metric]
+        status = "regression" if ratio > threshold else "improvement" if ratio < 1 / threshold else "ok"
+        rows.append({
+            "stage": r["stage"],
+            "params": r["params"],
+            "baseline": b[metric],
+            "current": r[metric],
+            "ratio": ratio,
+            "status": status,
+        })
+    return rows
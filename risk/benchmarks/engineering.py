@@ -0,0 +1,65 @@
+# risk/benchmarks/engineering.py
+"""
+observations.feature_engineering.engineer_features on synthetic raw ICU JSON:
+columnar engine (default) versus the per-parameter extraction (columnar=False).
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from observations.feature_engineering import PARAM_MAPPING, engineer_features
+from .stages import time_stage
+
+# Rough (low, high) per signal; a few values fall outside the validation ranges
+_SIGNAL_RANGES = {
+    "gcs": (3, 15), "lactate": (0.3, 8), "bun": (3, 90), "bilirubin": (0.1, 6),
+    "albumin": (1.5, 5), "alk_phos": (30, 400), "pt": (9, 30), "inr": (0.8, 4),
+    "phosphate": (1, 8), "pao2": (40, 400), "aptt": (20, 90), "anion_gap": (3, 30),
+    "systolic_bp": (60, 200), "diastolic_bp": (30, 120), "mean_bp": (40, 140),
+    "respiratory_rate": (6, 45), "temperature": (34, 41), "heart_rate": (40, 170), "rdw": (11, 22),
+}
+_VITALS = ["heart_rate", "systolic_bp", "diastolic_bp", "mean_bp", "respiratory_rate", "temperature"]
+
+
+def synthetic_patient(n_measurements: int, seed: int = 0) -> dict:
+    """One patient with n measurements spread over the first 48h (vitals mostly, some labs)."""
+    rng = np.random.default_rng(seed)
+    admission = datetime(2025, 1, 7, 8, 0)
+    minutes = np.sort(rng.uniform(0, 48 * 60, size=n_measurements))
+
+    measurements = []
+    for i, minute in enumerate(minutes):
+        m = {"timestamp": (admission + timedelta(minutes=float(minute))).isoformat()}
+        signals = _VITALS if rng.random() < 0.8 else list(PARAM_MAPPING)
+        for s in rng.choice(signals, size=min(len(signals), 4), replace=False):
+            lo, hi = _SIGNAL_RANGES[s]
+            m[str(s)] = round(float(rng.uniform(lo, hi)), 1)
+        measurements.append(m)
+
+    return {
+        "patient_id": f"BENCH-{n_measurements}",
+        "admission_time": admission.isoformat(),
+        "current_time": (admission + timedelta(hours=52)).isoformat(),
+        "age": 71,
+        "age_adj_comorbidity_score": 5,
+        "measurements": measurements,
+    }
+
+
+def run_engineering(sizes, repeat: int = 3, log=print) -> list:
+    results = []
+    for n in sizes:
+        patient = synthetic_patient(n)
+        columnar = engineer_features(patient)
+        rowwise = engineer_features(patient, columnar=False)
+        if repr(columnar) != repr(rowwise):
+            raise AssertionError(f"columnar result differs from per-parameter result for {n} measurements")
+
+        row = {"measurements": n}
+        for name, kwargs in (("rowwise", {"columnar": False}), ("columnar", {})):
+            row[name] = time_stage(lambda: engineer_features(patient, **kwargs), repeat, n)
+        row["speedup_p50"] = row["rowwise"]["p50_ms"] / max(row["columnar"]["p50_ms"], 1e-9)
+        log(f"{n:>7} measurements  rowwise p50 {row['rowwise']['p50_ms']:9.1f} ms  "
+            f"columnar p50 {row['columnar']['p50_ms']:9.1f} ms  ({row['speedup_p50']:.1f}x)")
+        results.append(row)
+    return results
@@ -0,0 +1,69 @@
+# risk/benchmarks/loading.py
+"""
+Bulk feature loading: values_list(*FEATURE_COLUMNS) -> np.array versus the
+packed blobs (observations.packed.load_feature_matrix).
+
+The rows are inserted inside a transaction that is rolled back afterwards,
+so it can run against any database without leaving anything behind.
+"""
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from observations.models import FEATURE_COLUMNS, ObservationSet
+from observations.packed import load_feature_matrix
+from patients.models import Encounter, Patient
+from .stages import time_stage
+from .synthetic import _synthetic_frame
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _insert(n: int, seed: int = 0):
+    patient = Patient.objects.create(mrn=f"BENCH-{timezone.now().timestamp()}", full_name="Benchmark")
+    encounter = Encounter.objects.create(patient=patient, unit="BENCH")
+
+    frame = _synthetic_frame(FEATURE_COLUMNS, n, np.random.default_rng(seed))
+    objs = []
+    for values in frame.itertuples(index=False):
+        obs = ObservationSet(
+            encounter=encounter,
+            **{c: (None if np.isnan(v) else float(v)) for c, v in zip(FEATURE_COLUMNS, values)},
+        )
+        obs.pack_features()         # bulk_create skips save()
+        objs.append(obs)
+    ObservationSet.objects.bulk_create(objs, batch_size=2000)
+    return ObservationSet.objects.filter(encounter=encounter)
+
+
+def _values_list(qs) -> np.ndarray:
+    return np.array(list(qs.values_list(*FEATURE_COLUMNS)), dtype=float)
+
+
+def _packed(qs) -> np.ndarray:
+    return load_feature_matrix(qs)[1]
+
+
+def run_loading(rows: int, repeat: int = 3, log=print) -> dict:
+    results = {}
+    try:
+        with transaction.atomic():
+            log(f"Inserting {rows} synthetic observation sets (rolled back afterwards)")
+            qs = _insert(rows)
+
+            a, b = _values_list(qs), _packed(qs)
+            if a.shape != b.shape or not np.array_equal(a, b, equal_nan=True):
+                raise AssertionError("packed matrix differs from values_list")
+
+            for name, fn in (("values_list", _values_list), ("packed", _packed)):
+                results[name] = time_stage(lambda: fn(qs), repeat, rows)
+                log(f"  {name:12s} p50 {results[name]['p50_ms']:9.1f} ms  "
+                    f"peak alloc {results[name]['peak_alloc_kb'] / 1024:7.1f} MB")
+            raise _Rollback
+    except _Rollback:
+        pass
+
+    results["speedup_p50"] = results["values_list"]["p50_ms"] / max(results["packed"]["p50_ms"], 1e-9)
+    return results
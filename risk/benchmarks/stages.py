@@ -0,0 +1,156 @@
+# risk/benchmarks/stages.py
+"""
+Per-stage timings of the scoring/explanation hot path.
+
+Every stage is run `repeat` times after a warmup call; results are
+percentiles in ms plus the peak Python/NumPy allocation of one call
+(tracemalloc, measured in a separate pass so it doesn't skew timings).
+"""
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from risk.driver_logic import build_clinical_drivers, build_clinical_drivers_batch
+from risk.registry import LoadedModel
+from risk.services import (
+    _build_X_batch,
+    _get_preprocessor,
+    _get_tree_explainer,
+    _shap_matrix,
+)
+from .synthetic import synthetic_observations
+
+
+def summarize(samples_s, rows: int = 1) -> dict:
+    ms = np.asarray(samples_s, dtype=float) * 1000.0
+    return {
+        "n": int(ms.size),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "p50_ms_per_row": float(np.percentile(ms, 50)) / max(rows, 1),
+    }
+
+
+def peak_alloc_kb(fn) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024.0
+
+
+def time_stage(fn, repeat: int, rows: int = 1, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {**summarize(samples, rows), "peak_alloc_kb": peak_alloc_kb(fn)}
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def environment() -> dict:
+    import shap
+    import sklearn
+    import xgboost
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "shap": shap.__version__,
+    }
+
+
+def run_stages(model: LoadedModel, batch_sizes, background_sizes, repeat: int = 20,
+               shap_max_batch: int = 100, log=None) -> list:
+    """
+    Stages (params):
+      build_X                 (batch)  ObservationSets -> float matrix
+      transform               (batch)  FeaturePlan.transform (NumPy imputation fast path)
+      pre.transform           (batch)  pipeline[:-1].transform on a DataFrame
+      predict_proba           (batch)  pipeline.predict_proba
+      build_clinical_drivers  (batch)  driver_logic for every row
+      build_clinical_drivers_batch (batch)  the same from the feature matrix in one call
+      explainer_build         (background)
+      shap_values             (background, batch <= shap_max_batch)
+    """
+    log = log or (lambda msg: None)
+    plan, pipeline = model.plan, model.pipeline
+    pre = _get_preprocessor(pipeline)
+    results = []
+
+    def record(stage, params, stats):
+        results.append({"stage": stage, "params": params, **stats})
+        log(f"{stage:<28} {str(params):<34} p50 {stats['p50_ms']:9.3f} ms  "
+            f"p99 {stats['p99_ms']:9.3f} ms  peak {stats['peak_alloc_kb']:9.1f} KiB")
+
+    observations = synthetic_observations(model.bundle, max(batch_sizes), seed=1)
+
+    for n in batch_sizes:
+        obs = observations[:n]
+        _, X = _build_X_batch(obs, plan)
+        frame = plan.model_input(X)
+        params = {"batch": n}
+
+        record("build_X", params, time_stage(lambda: _build_X_batch(obs, plan), repeat, n))
+        record("transform", params, time_stage(lambda: plan.transform(pipeline, X), repeat, n))
+        if pre is not None:
+            record("pre.transform", params, time_stage(lambda: pre.transform(frame), repeat, n))
+        record("predict_proba", params, time_stage(lambda: pipeline.predict_proba(frame), repeat, n))
+        record("build_clinical_drivers", params, time_stage(
+            lambda: [build_clinical_drivers(o) for o in obs], repeat, n
+        ))
+        record("build_clinical_drivers_batch", params, time_stage(
+            lambda: build_clinical_drivers_batch(X, plan.cols), repeat, n
+        ))
+
+    bg = model.bundle["shap_background"]
+    rng = np.random.default_rng(0)
+    for size in background_sizes:
+        # Own LoadedModel per background size (explainer state lives on it)
+        m = LoadedModel(model.version, model.path)
+        m.bundle = dict(m.bundle)
+        m.bundle["shap_background"] = bg.iloc[rng.integers(0, len(bg), size)].reset_index(drop=True)
+
+        def build():
+            m.explainers.clear()
+            m.background = m.background_transformed = None
+            return _get_tree_explainer(m)
+
+        record("explainer_build", {"background": size},
+               time_stage(build, max(3, repeat // 10), warmup=0))
+
+        explainer = build()
+        for n in batch_sizes:
+            if n > shap_max_batch:
+                continue
+            _, X = _build_X_batch(observations[:n], plan)
+            X_t = plan.transform(pipeline, X)
+            record("shap_values", {"background": size, "batch": n},
+                   time_stage(lambda: explainer.shap_values(X_t), repeat, n))
+
+        # End to end through services (background cached, explainer lookup, transform)
+        _, X1 = _build_X_batch(observations[:1], plan)
+        record("shap_matrix", {"background": size, "batch": 1},
+               time_stage(lambda: _shap_matrix(m, X1), repeat, 1))
+
+    return results
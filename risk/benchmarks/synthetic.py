@@ -0,0 +1,94 @@
+# risk/benchmarks/synthetic.py
+"""
+Synthetic model bundle with the same layout as the production artifact:
+    {"pipeline": Pipeline([SimpleImputer(median), XGBClassifier]),
+     "threshold": 0.5, "feature_cols": [...], "shap_background": DataFrame}
+so every stage of the hot path can be benchmarked offline.
+"""
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from observations.feature_ranges import FEATURE_RANGES
+from observations.models import ObservationSet
+
+
+def _synthetic_frame(cols, n, rng, missing_rate=0.15) -> pd.DataFrame:
+    data = {}
+    for c in cols:
+        lo, hi = FEATURE_RANGES.get(c, (0.0, 100.0))
+        # Most mass in the lower part of the allowed range, like real labs
+        data[c] = lo + (hi - lo) * rng.beta(2.0, 6.0, size=n)
+    df = pd.DataFrame(data, columns=cols)
+    df = df.mask(rng.random(df.shape) < missing_rate)
+    return df
+
+
+def make_synthetic_bundle(n_train: int = 2000, n_estimators: int = 200, max_depth: int = 5,
+                          background_rows: int = 200, seed: int = 0) -> dict:
+    from sklearn.impute import SimpleImputer
+    from sklearn.pipeline import Pipeline
+    from xgboost import XGBClassifier
+
+    rng = np.random.default_rng(seed)
+    cols = list(ObservationSet.feature_columns())
+
+    X = _synthetic_frame(cols, n_train, rng)
+    z = (X.fillna(X.median()) - X.mean()) / X.std().replace(0, 1)
+    logits = z.to_numpy() @ rng.normal(scale=0.4, size=len(cols))
+    y = (rng.random(n_train) < 1.0 / (1.0 + np.exp(-logits))).astype(int)
+
+    pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("model", XGBClassifier(
+            n_estimators=n_estimators, max_depth=max_depth, learning_rate=0.05,
+            objective="binary:logistic", n_jobs=1, random_state=seed,
+        )),
+    ])
+    pipeline.fit(X, y)
+
+    return {
+        "pipeline": pipeline,
+        "threshold": 0.5,
+        "feature_cols": cols,
+        "shap_background": X.sample(background_rows, random_state=seed).reset_index(drop=True),
+    }
+
+
+def write_synthetic_bundle(directory: str, **kwargs) -> str:
+    """Dumps make_synthetic_bundle(**kwargs) (uncompressed) and returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, "synthetic_bundle.joblib")
+    joblib.dump(make_synthetic_bundle(**kwargs), path)
+    return path
+
+
+def synthetic_observations(bundle: dict, n: int, seed: int = 0):
+    """
+    Unsaved ObservationSets sampled from the bundle's shap_background,
+    so benchmarks run without any patient data in the DB.
+    """
+    if not isinstance(bundle, dict):
+        bundle = {}
+    cols = bundle.get("features") or bundle.get("feature_cols") or ObservationSet.feature_columns()
+
+    bg = bundle.get("shap_background")
+    rng = np.random.default_rng(seed)
+    if bg is not None:
+        arr = np.asarray(bg, dtype=float)
+        arr = arr[rng.integers(0, len(arr), size=n)]
+    else:
+        arr = rng.normal(size=(n, len(cols)))
+
+    model_cols = set(ObservationSet.feature_columns())
+    out = []
+    for r in arr:
+        kwargs = {
+            c: (None if np.isnan(v) else float(v))
+            for c, v in zip(cols, r)
+            if c in model_cols
+        }
+        out.append(ObservationSet(**kwargs))
+    return out
@@ -0,0 +1,163 @@
+# risk/cache.py
+"""
+Memoization of probability + SHAP vectors keyed by a feature-vector
+fingerprint: hash(model identity, ordered feature values, NaN mask).
+
+settings.ML_PREDICTION_CACHE:
+    MAX_SIZE  bounded LRU size (per process)           0 disables the cache
+    TTL       seconds an entry stays valid              0 = no expiry
+    BACKEND   optional Django cache alias (e.g. "default") to share entries
+              between workers instead of the in-process LRU
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+
+def fingerprint(prefix: bytes, row: np.ndarray) -> str:
+    row = np.asarray(row, dtype=np.float64)
+    mask = np.isnan(row)
+    h = hashlib.blake2b(prefix, digest_size=20)
+    # NaN payloads can differ bit-wise; hash zeros + the mask instead
+    h.update(np.where(mask, 0.0, row).tobytes())
+    h.update(np.packbits(mask).tobytes())
+    return h.hexdigest()
+
+
+class _Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def incr(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def as_dict(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "hit_rate": (self.hits / total) if total else None,
+        }
+
+
+class LocalPredictionCache:
+    """In-process LRU with optional TTL."""
+
+    def __init__(self, max_size: int, ttl: float = 0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.counters = _Counters()
+        self._lock = threading.Lock()
+        self._data = OrderedDict()      # key -> (stored_at, value)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.ttl and time.monotonic() - item[0] > self.ttl:
+                del self._data[key]
+                item = None
+                self.counters.incr("expired")
+            if item is not None:
+                self._data.move_to_end(key)
+
+        self.counters.incr("hits" if item is not None else "misses")
+        return item[1] if item is not None else None
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.counters.incr("evictions")
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {"backend": "local", "size": len(self._data), "max_size": self.max_size,
+                **self.counters.as_dict()}
+
+
+class DjangoPredictionCache:
+    """Shared between workers through a Django cache backend."""
+
+    KEY_PREFIX = "risk-pred:"
+
+    def __init__(self, alias: str, ttl: float = 0):
+        from django.core.cache import caches
+        self.alias = alias
+        self.backend = caches[alias]
+        self.ttl = ttl
+        self.counters = _Counters()
+
+    def get(self, key):
+        value = self.backend.get(self.KEY_PREFIX + key)
+        self.counters.incr("hits" if value is not None else "misses")
+        return value
+
+    def set(self, key, value):
+        # Evictions/expiry are handled (and counted) by the backend itself
+        self.backend.set(self.KEY_PREFIX + key, value, timeout=self.ttl or None)
+
+    def clear(self):
+        # Entries are namespaced by model identity; nothing to do per process
+        pass
+
+    def stats(self) -> dict:
+        # evictions/expiry happen inside the backend and aren't visible here
+        return {"backend": f"django:{self.alias}", **self.counters.as_dict(),
+                "evictions": None, "expired": None}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_prediction_cache():
+    """The configured cache, or None if disabled."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                conf = getattr(settings, "ML_PREDICTION_CACHE", {}) or {}
+                max_size = int(conf.get("MAX_SIZE", 0))
+                ttl = float(conf.get("TTL", 0))
+                if conf.get("BACKEND"):
+                    _cache = DjangoPredictionCache(conf["BACKEND"], ttl=ttl)
+                elif max_size > 0:
+                    _cache = LocalPredictionCache(max_size, ttl=ttl)
+                else:
+                    _cache = False
+    return _cache or None
+
+
+@contextmanager
+def prediction_cache_disabled():
+    """Scores without the cache inside the block (benchmarks: time the model, not hits)."""
+    global _cache
+    with _cache_lock:
+        previous, _cache = _cache, False
+    try:
+        yield
+    finally:
+        with _cache_lock:
+            _cache = previous
+
+
+def prediction_cache_stats() -> dict:
+    cache = get_prediction_cache()
+    return cache.stats() if cache is not None else {"backend": None}
@@ -1,4 +1,6 @@
-from observations.models import ObservationSet
+import numpy as np
+
+from observations.models import FEATURE_COLUMNS, ObservationSet
 from .clinical_ranges import NORMAL_RANGES, DRIVER_FEATURES
 
 
@@ -87,6 +89,125 @@ def _get_too_threshold(feature_name: str) -> float:
     return DEFAULT_TOO_THRESHOLD
 
 
+class _CompiledRanges:
+    """
+    DRIVER_FEATURES that have a NORMAL_RANGES entry, as aligned arrays, so the
+    severity of one observation (or a whole matrix of them) is a handful of
+    NumPy operations instead of a dict lookup + threshold search per feature.
+    """
+
+    def __init__(self):
+        self.cols = [c for c in DRIVER_FEATURES if NORMAL_RANGES.get(c)]
+        self.ranges = [NORMAL_RANGES[c] for c in self.cols]
+        self.low = np.array([r[0] for r in self.ranges], dtype=float)
+        self.high = np.array([r[1] for r in self.ranges], dtype=float)
+        width = self.high - self.low
+        self.width = np.where(width != 0, width, 1.0)
+        self.thresholds = [float(_get_too_threshold(c)) for c in self.cols]
+        self.threshold = np.array(self.thresholds, dtype=float)
+
+        # "<label>: " + value + " <unit> (normal low–high) <arrow>", split
+        # around the value; suffix[True] is the below-normal one
+        self.prefix = [f"{label}: " for _, _, _, label in self.ranges]
+        self.suffix = []
+        for low, high, unit, _ in self.ranges:
+            unit_str = f" {unit}" if unit else ""
+            self.suffix.append({
+                False: f"{unit_str} (normal {low}–{high}) ↑",
+                True: f"{unit_str} (normal {low}–{high}) ↓",
+            })
+
+        # position in FEATURE_COLUMNS (matrix input); -1 = not a stored feature
+        index = {c: i for i, c in enumerate(FEATURE_COLUMNS)}
+        self.feature_index = np.array([index.get(c, -1) for c in self.cols], dtype=int)
+
+    def column_index(self, columns) -> np.ndarray:
+        if columns is None:
+            return self.feature_index
+        index = {c: i for i, c in enumerate(columns)}
+        return np.array([index.get(c, -1) for c in self.cols], dtype=int)
+
+    def select(self, X: np.ndarray, columns=None) -> np.ndarray:
+        """(n, len(columns)) matrix -> (n, len(self.cols)), unknown columns NaN."""
+        idx = self.column_index(columns)
+        V = X[:, np.maximum(idx, 0)].astype(float, copy=True)
+        V[:, idx < 0] = np.nan
+        return V
+
+    def arrays(self, V: np.ndarray):
+        """-> (abnormal, below, score, too) boolean/float arrays shaped like V."""
+        below = V < self.low
+        above = V > self.high
+        abnormal = below | above            # NaN (missing) compares False
+        score = np.where(below, (self.low - V) / self.width, (V - self.high) / self.width)
+        too = abnormal & (score >= self.threshold)
+        return abnormal, below, score, too
+
+    def scores(self, V: np.ndarray):
+        """
+        V: (n, k) values in self.cols order ->
+        (order, below, score, too): order[i] lists row i's abnormal columns,
+        most abnormal first (stable, so ties keep DRIVER_FEATURES order);
+        the rest are (n, k) as nested lists.
+        """
+        abnormal, below, score, too = self.arrays(V)
+        ranked = np.argsort(np.where(abnormal, -score, np.inf), axis=1, kind="stable")
+        counts = abnormal.sum(axis=1).tolist()
+        order = [r[:c] for r, c in zip(ranked.tolist(), counts)]
+        return order, below.tolist(), score.tolist(), too.tolist()
+
+
+_COMPILED = _CompiledRanges()
+
+
+def _observation_values(obs) -> np.ndarray:
+    values = [getattr(obs, col, None) for col in _COMPILED.cols]
+    try:
+        # None -> NaN
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        out = np.full(len(values), np.nan)
+        for j, val in enumerate(values):
+            try:
+                out[j] = float(val)
+            except (TypeError, ValueError):
+                pass
+        return out
+
+
+def _drivers_for_row(order, below, score, too, values, show_all: bool):
+    items = []
+    high_count = 0
+    for j in order:
+        if below[j]:
+            severity = "TOO LOW" if too[j] else "LOW"
+        else:
+            severity = "TOO HIGH" if too[j] else "HIGH"
+        high_count += too[j]
+
+        v_str = f"{values[j]:.2f}".rstrip("0").rstrip(".")
+        items.append(
+            {
+                "col": _COMPILED.cols[j],
+                "text": f"{_COMPILED.prefix[j]}{v_str}{_COMPILED.suffix[j][below[j]]}",
+                "severity": severity,
+                "icon": _severity_icon(severity),
+                "score": score[j],
+                "threshold": _COMPILED.thresholds[j],  # optional debugging
+            }
+        )
+
+    total_abnormal = len(items)
+
+    if show_all:
+        shown = items
+    else:
+        max_items = 5 if high_count > 3 else 3
+        shown = items[:max_items]
+
+    return shown, len(shown), high_count, total_abnormal
+
+
 def build_clinical_drivers(obs: ObservationSet, show_all: bool = False):
     """
     Severity rules:
@@ -104,69 +225,52 @@ def build_clinical_drivers(obs: ObservationSet, show_all: bool = False):
 
     Returns: (drivers, shown_count, high_count, total_abnormal)
     """
-    items = []
+    values = _observation_values(obs)
+    order, below, score, too = _COMPILED.scores(values.reshape(1, -1))
+    return _drivers_for_row(order[0], below[0], score[0], too[0], values.tolist(), show_all)
 
-    for col in DRIVER_FEATURES:
-        rng = NORMAL_RANGES.get(col)
-        if not rng:
-            continue
 
-        low, high, unit, label = rng
-
-        # IMPORTANT: use hasattr/getattr safely
-        val = getattr(obs, col, None)
-        if val is None:
-            continue
-
-        try:
-            v = float(val)
-        except (TypeError, ValueError):
-            continue
-
-        # Only abnormal values
-        if low <= v <= high:
-            continue
-
-        width = (high - low) if (high - low) != 0 else 1.0
-        too_thr = _get_too_threshold(col)
-
-        if v < low:
-            score = (low - v) / width
-            arrow = "↓"
-            severity = "TOO LOW" if score >= too_thr else "LOW"
-        else:
-            score = (v - high) / width
-            arrow = "↑"
-            severity = "TOO HIGH" if score >= too_thr else "HIGH"
-
-        icon = _severity_icon(severity)
+def build_clinical_drivers_batch(X: np.ndarray, columns=None, show_all: bool = False) -> list:
+    """
+    build_clinical_drivers() for every row of an (n, len(columns)) matrix
+    (NaN = missing; columns default to FEATURE_COLUMNS, e.g. from
+    observations.packed.load_feature_matrix). One result tuple per row.
+    """
+    V = _COMPILED.select(np.atleast_2d(np.asarray(X, dtype=float)), columns)
+    order, below, score, too = _COMPILED.scores(V)
+    return [
+        _drivers_for_row(*row, show_all)
+        for row in zip(order, below, score, too, V.tolist())
+    ]
 
-        v_str = f"{v:.2f}".rstrip("0").rstrip(".")
-        unit_str = f" {unit}" if unit else ""
-        text = f"{label}: {v_str}{unit_str} (normal {low}–{high}) {arrow}"
 
-        items.append(
-            {
-                "col": col,
-                "text": text,
-                "severity": severity,
-                "icon": icon,
-                "score": float(score),
-                "threshold": float(too_thr),  # optional debugging
-            }
+def abnormality_summaries(X: np.ndarray, columns=None) -> list:
+    """
+    Per row of an (n, len(columns)) matrix: the numbers stored on
+    ObservationSet (abnormal_count, extreme_count, max_severity, top_driver),
+    consistent with build_clinical_drivers(show_all=True).
+    """
+    V = _COMPILED.select(np.atleast_2d(np.asarray(X, dtype=float)), columns)
+    abnormal, _, score, too = _COMPILED.arrays(V)
+    masked = np.where(abnormal, score, -np.inf)
+    top = masked.argmax(axis=1)             # first max = same tie-break as the sort
+    has_any = abnormal.any(axis=1)
+    return [
+        {
+            "abnormal_count": n_abn,
+            "extreme_count": n_too,
+            "max_severity": best if any_ else None,
+            "top_driver": _COMPILED.cols[j] if any_ else "",
+        }
+        for n_abn, n_too, best, j, any_ in zip(
+            abnormal.sum(axis=1).tolist(),
+            too.sum(axis=1).tolist(),
+            masked[np.arange(len(top)), top].tolist(),
+            top.tolist(),
+            has_any.tolist(),
         )
+    ]
 
-    # Sort most abnormal first
-    items.sort(key=lambda x: x["score"], reverse=True)
-
-    # Count only extreme ones
-    high_count = sum(1 for x in items if x["severity"] in ("TOO HIGH", "TOO LOW"))
-    total_abnormal = len(items)
-
-    if show_all:
-        shown = items
-    else:
-        max_items = 5 if high_count > 3 else 3
-        shown = items[:max_items]
 
-    return shown, len(shown), high_count, total_abnormal
+def abnormality_summary(obs: ObservationSet) -> dict:
+    return abnormality_summaries(_observation_values(obs).reshape(1, -1), _COMPILED.cols)[0]
@@ -17,6 +17,9 @@ class GenerateRiskForm(forms.Form):
         help_text="I confirm that the vitals/labs snapshot is correct for prediction."
     )
 
+    # One token per rendered form: re-submitting it returns the same RiskJob
+    request_token = forms.CharField(required=False, max_length=64, widget=forms.HiddenInput)
+
 
 # Form used AFTER prediction (doctor comment)
 class RiskCommentForm(forms.Form):
@@ -0,0 +1,307 @@
+# risk/jobs.py
+"""
+Asynchronous "generate risk" (settings.RISK_JOBS_ASYNC).
+
+The POST stores a RiskJob and returns; the job is scored either
+  - by an in-process thread pool (RISK_JOBS_RUNNER = "thread"), or
+  - by `python manage.py risk_worker` (RISK_JOBS_RUNNER = "command").
+
+Jobs are claimed with a conditional UPDATE (status QUEUED -> RUNNING), so
+several threads/processes never score the same job at once. The result is
+stored the same way (still RUNNING, still claimed by us, no assessment yet),
+so a job that was requeued as stale while its first worker was still
+scoring gets exactly one RiskAssessment.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from hospital_ai import metrics
+from . import shadow
+from .models import RiskAssessment, RiskJob
+from .services import predict_180d_mortality_with_contributions, risk_band_for_probability
+
+logger = logging.getLogger(__name__)
+
+_JOBS = metrics.counter(
+    "risk_jobs_total", "Risk job runs by outcome (done, retry, failed, discarded).", ["outcome"]
+)
+_JOB_SECONDS = metrics.histogram("risk_job_seconds", "Risk job scoring + store time.")
+metrics.gauge("risk_jobs_queued", "Risk jobs waiting in the queue.").set_function(
+    lambda: RiskJob.objects.filter(status=RiskJob.QUEUED).count()
+)
+metrics.gauge("risk_jobs_running", "Risk jobs claimed by a worker.").set_function(
+    lambda: RiskJob.objects.filter(status=RiskJob.RUNNING).count()
+)
+
+
+class QueueFull(Exception):
+    pass
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"[:64]
+
+
+# -------------------------------------------------------------------
+# Scoring (shared with the synchronous view)
+# -------------------------------------------------------------------
+
+def create_risk_assessment(encounter, observation_set, user, doctor_name) -> RiskAssessment:
+    # Predict risk + full SHAP vector (stored, shown on detail page)
+    prob, contributions = predict_180d_mortality_with_contributions(observation_set)
+    return _store_assessment(encounter, observation_set, user, doctor_name, prob, contributions)
+
+
+def _store_assessment(encounter, observation_set, user, doctor_name, prob, contributions):
+    band = risk_band_for_probability(prob)
+
+    ra = RiskAssessment.objects.create(
+        encounter=encounter,
+        observation_set=observation_set,
+        risk_180d=prob * 100,
+        risk_band=band,
+        model_version=settings.ML_MODEL_VERSION,
+        created_by=user,
+        doctor_name=doctor_name,
+        doctor_comment="",
+        shap_contributions=contributions,
+    )
+    # Shadow model scores the same snapshot on its own thread, after commit
+    shadow.submit(ra, observation_set)
+    return ra
+
+
+# -------------------------------------------------------------------
+# Queue
+# -------------------------------------------------------------------
+
+def enqueue_risk_job(idempotency_key, encounter, observation_set, user, doctor_name) -> RiskJob:
+    """
+    Returns the job for this key, creating it if needed (a retried POST gets
+    the existing job back). Raises QueueFull when RISK_JOBS_MAX_QUEUED jobs
+    are already waiting.
+    """
+    existing = RiskJob.objects.filter(idempotency_key=idempotency_key).first()
+    if existing is not None:
+        return existing
+
+    max_queued = settings.RISK_JOBS_MAX_QUEUED
+    if max_queued and RiskJob.objects.filter(status=RiskJob.QUEUED).count() >= max_queued:
+        raise QueueFull()
+
+    try:
+        job = RiskJob.objects.create(
+            idempotency_key=idempotency_key,
+            encounter=encounter,
+            observation_set=observation_set,
+            requested_by=user,
+            doctor_name=doctor_name,
+        )
+    except IntegrityError:
+        # Same key submitted concurrently
+        return RiskJob.objects.get(idempotency_key=idempotency_key)
+
+    if settings.RISK_JOBS_RUNNER == "thread":
+        transaction.on_commit(lambda: _submit(job.id))
+
+    return job
+
+
+def claim_job(job_id, worker: str) -> bool:
+    return RiskJob.objects.filter(id=job_id, status=RiskJob.QUEUED).update(
+        status=RiskJob.RUNNING,
+        claimed_by=worker,
+        claimed_at=timezone.now(),
+    ) == 1
+
+
+def _load_job(job_id) -> RiskJob:
+    return RiskJob.objects.select_related("encounter", "observation_set", "requested_by").get(id=job_id)
+
+
+def claim_next_job(worker: str):
+    """Oldest QUEUED job, claimed for `worker`, or None."""
+    for job_id in RiskJob.objects.filter(status=RiskJob.QUEUED).order_by("id").values_list("id", flat=True)[:10]:
+        if claim_job(job_id, worker):
+            return _load_job(job_id)
+    return None
+
+
+def requeue_stale_jobs() -> int:
+    """
+    RUNNING jobs whose worker died (claimed longer than
+    RISK_JOBS_STALE_SECONDS ago) go back to the queue.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.RISK_JOBS_STALE_SECONDS)
+    return RiskJob.objects.filter(
+        status=RiskJob.RUNNING, claimed_at__lt=cutoff, assessment__isnull=True
+    ).update(status=RiskJob.QUEUED, claimed_by="")
+
+
+class _ClaimLost(Exception):
+    """The job was requeued / finished by another worker while we scored it."""
+
+
+def _mine(job: RiskJob):
+    # Only the worker that holds the claim may finish the job: a stale job can
+    # be requeued and claimed again while the first worker is still scoring
+    return RiskJob.objects.filter(
+        id=job.id, status=RiskJob.RUNNING, claimed_by=job.claimed_by, assessment__isnull=True
+    )
+
+
+def run_job(job: RiskJob) -> RiskJob:
+    """Scores a claimed job. Safe to call again for the same job."""
+    if job.assessment_id:
+        RiskJob.objects.filter(id=job.id).update(status=RiskJob.DONE)
+        job.status = RiskJob.DONE
+        return job
+
+    job.attempts += 1
+    t0 = time.perf_counter()
+    try:
+        # Read + score OUTSIDE the write transaction: it stays short, and
+        # SQLite can't deadlock upgrading a read lock held across the model call
+        encounter, obs, user = job.encounter, job.observation_set, job.requested_by
+        prob, contributions = predict_180d_mortality_with_contributions(obs)
+
+        with transaction.atomic():
+            assessment = _store_assessment(
+                encounter, obs, user, job.doctor_name, prob, contributions
+            )
+            finished_at = timezone.now()
+            if not _mine(job).update(
+                assessment=assessment, status=RiskJob.DONE, error="",
+                finished_at=finished_at, attempts=job.attempts,
+            ):
+                # rolls back our RiskAssessment (and its shadow submit)
+                raise _ClaimLost()
+        job.assessment, job.status, job.error, job.finished_at = assessment, RiskJob.DONE, "", finished_at
+        _JOBS.labels(outcome="done").inc()
+    except _ClaimLost:
+        logger.warning("Risk job %s was taken over by another worker; result discarded", job.id)
+        job = _load_job(job.id)
+        _JOBS.labels(outcome="discarded").inc()
+    except Exception as e:
+        logger.exception("Risk job %s failed", job.id)
+        retry = job.attempts < settings.RISK_JOBS_MAX_ATTEMPTS
+        job.status = RiskJob.QUEUED if retry else RiskJob.FAILED
+        job.error = f"{type(e).__name__}: {e}"
+        job.finished_at = None if retry else timezone.now()
+        if _mine(job).update(
+            status=job.status, error=job.error, finished_at=job.finished_at, attempts=job.attempts
+        ):
+            _JOBS.labels(outcome="retry" if retry else "failed").inc()
+        else:
+            job = _load_job(job.id)
+            _JOBS.labels(outcome="discarded").inc()
+    finally:
+        _JOB_SECONDS.observe(time.perf_counter() - t0)
+
+    return job
+
+
+def fail_job(job: RiskJob, error: Exception) -> RiskJob:
+    """Marks a claimed job FAILED after an error outside run_job's own handling."""
+    job.status = RiskJob.FAILED
+    job.error = f"{type(error).__name__}: {error}"
+    job.finished_at = timezone.now()
+    RiskJob.objects.filter(id=job.id, status=RiskJob.RUNNING, claimed_by=job.claimed_by).update(
+        status=job.status, error=job.error, finished_at=job.finished_at
+    )
+    _JOBS.labels(outcome="failed").inc()
+    return job
+
+
+# -------------------------------------------------------------------
+# In-process runner (RISK_JOBS_RUNNER = "thread")
+# -------------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.RISK_JOBS_WORKERS, thread_name_prefix="risk-job"
+                )
+    return _executor
+
+
+def _submit(job_id):
+    _submitted.add(job_id)
+    _get_executor().submit(_run_in_thread, job_id)
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        claimed = claim_job(job_id, worker_id())
+        _submitted.discard(job_id)   # RUNNING (or someone else's) from here on
+        if claimed:
+            job = run_job(_load_job(job_id))
+            if job.status == RiskJob.QUEUED:
+                # failed, attempts left
+                _submit(job_id)
+    finally:
+        # each pool thread has its own DB connection
+        connection.close()
+
+
+# Nothing else picks up a job whose worker was restarted mid-run (left
+# RUNNING) or whose submit was lost with the process (left QUEUED): a
+# sweeper thread per web worker requeues / resubmits them.
+_submitted = set()   # job ids waiting in this process's executor
+_sweeper = None
+
+
+def sweep_jobs() -> int:
+    """Requeues stale RUNNING jobs, submits QUEUED ones no executor holds. Returns # submitted."""
+    requeue_stale_jobs()
+    # Younger jobs are still on their way via on_commit in some worker
+    cutoff = timezone.now() - timedelta(seconds=settings.RISK_JOBS_SWEEP_SECONDS)
+    submitted = 0
+    for job_id in RiskJob.objects.filter(status=RiskJob.QUEUED, created_at__lt=cutoff).order_by("id").values_list(
+        "id", flat=True
+    )[:100]:
+        if job_id not in _submitted:
+            _submit(job_id)
+            submitted += 1
+    return submitted
+
+
+def _sweep_forever():
+    while True:
+        try:
+            close_old_connections()
+            submitted = sweep_jobs()
+            if submitted:
+                logger.info("Risk job sweep resubmitted %d job(s)", submitted)
+        except Exception:
+            logger.exception("Risk job sweep failed")
+        finally:
+            connection.close()
+        time.sleep(settings.RISK_JOBS_SWEEP_SECONDS)
+
+
+def start_sweeper():
+    """Starts the sweeper thread of this process (RISK_JOBS_RUNNER = "thread")."""
+    global _sweeper
+    with _executor_lock:
+        if _sweeper is None or not _sweeper.is_alive():
+            _sweeper = threading.Thread(target=_sweep_forever, name="risk-job-sweeper", daemon=True)
+            _sweeper.start()
+    return _sweeper
@@ -0,0 +1,65 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from observations import packed
+from observations.models import ObservationSet
+from risk.driver_logic import abnormality_summaries
+
+_FIELDS = ["abnormal_count", "extreme_count", "max_severity", "top_driver"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute the clinical driver summary columns of ObservationSet "
+        "(abnormal_count, extreme_count, max_severity, top_driver) in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Recompute every row (e.g. after changing NORMAL_RANGES / TOO_THRESHOLDS).",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows read/written per chunk.")
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        qs = ObservationSet.objects.all()
+        if not options["all"]:
+            qs = qs.filter(abnormal_count__isnull=True)
+
+        t0 = time.perf_counter()
+        done = 0
+        last_pk = 0
+        while True:
+            # keyset pagination: never iterate a cursor over the table being written
+            rows = list(
+                qs.filter(pk__gt=last_pk).order_by("pk")
+                .values_list("pk", "features_schema", "features_packed")[:chunk_size]
+            )
+            if not rows:
+                break
+            summaries = abnormality_summaries(packed.feature_matrix(rows))
+            with transaction.atomic():
+                self._update(rows, summaries)
+            done += len(rows)
+            last_pk = rows[-1][0]
+            self.stdout.write(f"  {done} rows")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated {done} observation sets in {time.perf_counter() - t0:.2f}s"
+        ))
+
+    def _update(self, rows, summaries):
+        # Plain executemany; bulk_update's CASE per field/row is much slower
+        meta = ObservationSet._meta
+        qn = connection.ops.quote_name
+        sql = "UPDATE {} SET {} WHERE {} = %s".format(
+            qn(meta.db_table),
+            ", ".join(f"{qn(meta.get_field(f).column)} = %s" for f in _FIELDS),
+            qn(meta.pk.column),
+        )
+        params = [[s[f] for f in _FIELDS] + [r[0]] for r, s in zip(rows, summaries)]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, params)
@@ -0,0 +1,27 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from risk.benchmarks.engineering import run_engineering
+from risk.benchmarks.stages import environment, max_rss_mb
+
+
+class Command(BaseCommand):
+    help = (
+        "Time engineer_features() (columnar vs per-parameter extraction) on synthetic "
+        "raw ICU JSON with 1k / 10k / 100k measurements; checks both give the same result."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", default=None, help="Write results JSON here.")
+
+    def handle(self, *args, **options):
+        results = run_engineering(options["sizes"], max(1, options["repeat"]), log=self.stdout.write)
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({"environment": environment(), "max_rss_mb": max_rss_mb(), "results": results},
+                          fh, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
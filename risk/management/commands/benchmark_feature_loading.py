@@ -0,0 +1,28 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from risk.benchmarks.loading import run_loading
+from risk.benchmarks.stages import environment, max_rss_mb
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare loading ObservationSet features into NumPy via values_list with "
+        "the packed blobs (synthetic rows, rolled back afterwards)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--output", default=None, help="Write results JSON here.")
+
+    def handle(self, *args, **options):
+        results = run_loading(max(1, options["rows"]), max(1, options["repeat"]), log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(f"packed is {results['speedup_p50']:.1f}x faster (p50)"))
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({"rows": options["rows"], "environment": environment(),
+                           "max_rss_mb": max_rss_mb(), "results": results}, fh, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
@@ -0,0 +1,95 @@
+import json
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from risk.benchmarks.compare import compare, load
+from risk.benchmarks.stages import environment, max_rss_mb, run_stages
+from risk.benchmarks.synthetic import write_synthetic_bundle
+from risk.registry import LoadedModel, get_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-stage benchmark of the scoring/SHAP hot path on a synthetic (or the "
+        "real) model bundle; writes JSON and optionally compares with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+        parser.add_argument("--background-sizes", type=int, nargs="+", default=[50, 200])
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--shap-max-batch", type=int, default=100,
+            help="Skip shap_values for larger batches (interventional SHAP is slow).",
+        )
+        parser.add_argument(
+            "--real-model", action="store_true",
+            help="Benchmark settings.ML_MODEL_PATH instead of a synthetic bundle.",
+        )
+        parser.add_argument("--n-estimators", type=int, default=200, help="Trees in the synthetic model.")
+        parser.add_argument("--output", default=None, help="Write results JSON here.")
+        parser.add_argument("--baseline", default=None, help="Results JSON from an earlier run to compare with.")
+        parser.add_argument("--threshold", type=float, default=1.2, help="p50 ratio counted as a regression.")
+        parser.add_argument("--fail-on-regression", action="store_true", help="Exit non-zero on regressions.")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            if options["real_model"]:
+                model = get_model()
+                source = {"kind": "real", "path": model.path, "version": model.version}
+            else:
+                t0 = time.perf_counter()
+                path = write_synthetic_bundle(tmp, n_estimators=options["n_estimators"],
+                                              background_rows=max(options["background_sizes"]))
+                model = LoadedModel("synthetic", path)
+                source = {"kind": "synthetic", "n_estimators": options["n_estimators"],
+                          "built_in_s": round(time.perf_counter() - t0, 2)}
+            source.update(sha256=model.sha256, n_features=len(model.plan.cols))
+
+            self.stdout.write(f"Benchmarking {source['kind']} model ({len(model.plan.cols)} features)")
+            results = run_stages(
+                model,
+                batch_sizes=options["batch_sizes"],
+                background_sizes=options["background_sizes"],
+                repeat=max(1, options["repeat"]),
+                shap_max_batch=options["shap_max_batch"],
+                log=self.stdout.write,
+            )
+
+        run = {
+            "meta": {
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "model": source,
+                "environment": environment(),
+                "max_rss_mb": max_rss_mb(),
+            },
+            "results": results,
+        }
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        self.stdout.write(f"Max RSS: {run['meta']['max_rss_mb']:.1f} MiB")
+
+        if options["baseline"]:
+            self._report(compare(run, load(options["baseline"]), options["threshold"]), options)
+
+    def _report(self, rows, options):
+        self.stdout.write(f"\nvs baseline {options['baseline']} (p50, threshold {options['threshold']}x)")
+        for r in rows:
+            line = (f"  {r['stage']:<24} {str(r['params']):<34} "
+                    f"{r['baseline']:9.3f} -> {r['current']:9.3f} ms  x{r['ratio']:.2f}")
+            if r["status"] == "regression":
+                self.stdout.write(self.style.ERROR(line + "  REGRESSION"))
+            elif r["status"] == "improvement":
+                self.stdout.write(self.style.SUCCESS(line + "  faster"))
+            else:
+                self.stdout.write(line)
+
+        regressions = [r for r in rows if r["status"] == "regression"]
+        if regressions and options["fail_on_regression"]:
+            raise CommandError(f"{len(regressions)} stage(s) regressed more than {options['threshold']}x")
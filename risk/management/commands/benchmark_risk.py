@@ -0,0 +1,283 @@
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from observations.models import ObservationSet
+from risk.benchmarks.synthetic import synthetic_observations
+from risk.cache import get_prediction_cache, prediction_cache_disabled
+from risk.registry import LoadedModel, get_model
+from risk.tree_engine import CompiledTreeModel
+from risk.services import (
+    SHAP_ALGORITHMS,
+    _build_X_batch,
+    _get_tree_explainer,
+    _shap_matrix,
+    _bundle_to_pipeline_and_features,
+    _safe_get,
+    get_feature_plan,
+    get_model_bundle,
+    predict_180d_mortality,
+    predict_180d_mortality_batch,
+    predict_180d_mortality_with_shap,
+)
+
+
+def _synthetic_observations(n: int, seed: int = 0):
+    """Unsaved ObservationSets sampled from the current bundle's shap_background."""
+    return synthetic_observations(get_model_bundle(), n, seed)
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-patient risk scoring latency vs batch size."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000],
+        )
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument(
+            "--shap", action="store_true", help="Also compute SHAP rows."
+        )
+        parser.add_argument(
+            "--engines", action="store_true",
+            help="Compare pipeline.predict_proba vs the compiled NumPy engine.",
+        )
+        parser.add_argument(
+            "--features", action="store_true",
+            help="Microbenchmark single-row feature construction.",
+        )
+        parser.add_argument(
+            "--background-sizes", type=int, nargs="+", default=None,
+            help="SHAP latency (after warmup) for these SHAP background sizes.",
+        )
+        parser.add_argument(
+            "--shap-algorithms", action="store_true",
+            help="Latency + agreement with interventional SHAP for every SHAP algorithm.",
+        )
+        parser.add_argument("--corpus-size", type=int, default=200)
+        parser.add_argument(
+            "--with-cache", action="store_true",
+            help="Also run the batch-size table with the prediction cache on (repeats are cache hits).",
+        )
+
+    def handle(self, *args, **options):
+        sizes = options["batch_sizes"]
+        repeat = max(1, options["repeat"])
+        with_shap = options["shap"]
+
+        if options["engines"]:
+            return self._benchmark_engines(sizes, repeat)
+        if options["features"]:
+            return self._benchmark_features(repeat)
+        if options["background_sizes"]:
+            return self._benchmark_background(options["background_sizes"], repeat)
+        if options["shap_algorithms"]:
+            return self._benchmark_shap_algorithms(options["corpus_size"], repeat)
+
+        # The default table is without the prediction cache: with it, every
+        # repeat (and the batch run after the loop) would just be cache hits
+        with prediction_cache_disabled():
+            self._benchmark_batch_sizes(sizes, repeat, with_shap)
+        if options["with_cache"]:
+            cache = get_prediction_cache()
+            if cache is None:
+                self.stdout.write("Prediction cache is disabled in settings (ML_PREDICTION_CACHE_SIZE=0).")
+            else:
+                self.stdout.write("\nWith the prediction cache (cleared per batch size; mostly hits):")
+                self._benchmark_batch_sizes(sizes, repeat, with_shap, cache=cache)
+
+    def _benchmark_batch_sizes(self, sizes, repeat, with_shap, cache=None):
+        # Warm up (model load + explainer build are not part of the timing)
+        warm = _synthetic_observations(2)
+        predict_180d_mortality(warm[0])
+        predict_180d_mortality_batch(warm, with_shap=with_shap)
+        if with_shap:
+            predict_180d_mortality_with_shap(warm[0], top_n=0)
+
+        single = predict_180d_mortality_with_shap if with_shap else predict_180d_mortality
+
+        self.stdout.write(
+            f"{'batch':>7} {'loop ms/patient':>16} {'batch ms/patient':>17} {'speedup':>8}"
+        )
+        for n in sizes:
+            obs = _synthetic_observations(n, seed=n)
+            if cache is not None:
+                cache.clear()
+
+            loop_best = batch_best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                for o in obs:
+                    single(o)
+                loop_best = min(loop_best, time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                predict_180d_mortality_batch(obs, with_shap=with_shap)
+                batch_best = min(batch_best, time.perf_counter() - t0)
+
+            loop_ms = loop_best * 1000 / n
+            batch_ms = batch_best * 1000 / n
+            self.stdout.write(
+                f"{n:>7} {loop_ms:>16.3f} {batch_ms:>17.3f} {loop_ms / batch_ms:>7.1f}x"
+            )
+
+    def _benchmark_engines(self, sizes, repeat):
+        bundle = get_model_bundle()
+        pipeline, trained_features = _bundle_to_pipeline_and_features(bundle)
+        cols = trained_features or ObservationSet.feature_columns()
+        compiled = CompiledTreeModel.from_pipeline(pipeline)
+
+        # Agreement on a corpus: background rows, jittered rows, ~20% missing
+        rng = np.random.default_rng(0)
+        _, X_corpus = _build_X_batch(_synthetic_observations(2000), get_feature_plan())
+        arr = X_corpus * rng.uniform(0.7, 1.3, X_corpus.shape)
+        arr[rng.random(arr.shape) < 0.2] = np.nan
+        arr = np.vstack([X_corpus, arr])
+
+        ref = pipeline.predict_proba(pd.DataFrame(arr, columns=cols))[:, 1]
+        max_diff = float(np.abs(compiled.predict_proba(arr)[:, 1] - ref).max())
+        status = "OK" if max_diff <= 1e-6 else "MISMATCH"
+        self.stdout.write(f"max |compiled - pipeline| over {len(arr)} rows: {max_diff:.2e} ({status})")
+
+        self.stdout.write(
+            f"{'rows':>7} {'pipeline ms':>12} {'compiled ms':>12} {'speedup':>8}"
+        )
+        for n in sizes:
+            X = pd.DataFrame(arr[:n] if n <= len(arr) else arr[rng.integers(0, len(arr), n)], columns=cols)
+            X_np = X.to_numpy()
+
+            pipe_best = comp_best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                pipeline.predict_proba(X)
+                pipe_best = min(pipe_best, time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                compiled.predict_proba(X_np)
+                comp_best = min(comp_best, time.perf_counter() - t0)
+
+            self.stdout.write(
+                f"{n:>7} {pipe_best * 1000:>12.3f} {comp_best * 1000:>12.3f} "
+                f"{pipe_best / comp_best:>7.1f}x"
+            )
+
+    def _benchmark_features(self, repeat, n=2000):
+        """
+        Per-request feature construction: the previous dict + _safe_get +
+        DataFrame path vs FeaturePlan.row() (and its DataFrame fallback).
+        """
+        plan = get_feature_plan()
+        cols = plan.cols
+        obs = _synthetic_observations(n)
+
+        def legacy(o):
+            row = {c: _safe_get(o, c) for c in cols}
+            return pd.DataFrame([row], columns=cols), row
+
+        def plan_row(o):
+            return plan.row(o).reshape(1, -1)
+
+        def plan_frame(o):
+            return plan.model_input(plan.row(o).reshape(1, -1))
+
+        self.stdout.write(f"{'path':<28} {'us/request':>11}")
+        for name, fn in (
+            ("dict + DataFrame (before)", legacy),
+            ("FeaturePlan.row", plan_row),
+            ("FeaturePlan.row + frame", plan_frame),
+        ):
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                for o in obs:
+                    fn(o)
+                best = min(best, time.perf_counter() - t0)
+            self.stdout.write(f"{name:<28} {best * 1e6 / n:>11.2f}")
+
+    def _benchmark_background(self, sizes, repeat, n=20):
+        """
+        Single-row SHAP after warmup, per background size. "overhead" is
+        everything except explainer.shap_values() (background handling,
+        transform, explainer lookup) and should not grow with the background.
+        """
+        base = get_model()
+        bg = base.bundle["shap_background"]
+        rng = np.random.default_rng(0)
+        X = _build_X_batch(_synthetic_observations(n), base.plan)[1]
+
+        self.stdout.write(
+            f"{'bg rows':>8} {'total ms/row':>13} {'shap_values ms/row':>19} {'overhead ms/row':>16}"
+        )
+        for size in sizes:
+            model = LoadedModel(base.version, base.path)
+            model.bundle = dict(model.bundle)
+            model.bundle["shap_background"] = bg.iloc[rng.integers(0, len(bg), size)].reset_index(drop=True)
+
+            _shap_matrix(model, X[:1])      # warmup: background + explainer
+            explainer = _get_tree_explainer(model)
+            X_t = model.plan.transform(model.pipeline, X)
+
+            total = core = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                for i in range(n):
+                    _shap_matrix(model, X[i:i + 1])
+                total = min(total, time.perf_counter() - t0)
+
+                t0 = time.perf_counter()
+                for i in range(n):
+                    explainer.shap_values(X_t[i:i + 1])
+                core = min(core, time.perf_counter() - t0)
+
+            self.stdout.write(
+                f"{size:>8} {total * 1000 / n:>13.3f} {core * 1000 / n:>19.3f} "
+                f"{max(total - core, 0) * 1000 / n:>16.3f}"
+            )
+
+    def _benchmark_shap_algorithms(self, n, repeat, top_k=5):
+        """
+        Fixed corpus (seed 0): single-row and batch latency per algorithm,
+        and agreement with interventional SHAP (the default):
+          max/mean |diff|  in log-odds
+          top-k            share of the top-k features (by |shap|) in common
+          sign             share of features with the same direction
+        """
+        model = get_model()
+        X = _build_X_batch(_synthetic_observations(n, seed=0), model.plan)[1]
+
+        results = {}
+        for algorithm in SHAP_ALGORITHMS:
+            _shap_matrix(model, X[:1], algorithm)       # warmup: explainer build
+
+            single = batch = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                for i in range(min(n, 50)):
+                    _shap_matrix(model, X[i:i + 1], algorithm)
+                single = min(single, (time.perf_counter() - t0) / min(n, 50))
+
+                t0 = time.perf_counter()
+                values = _shap_matrix(model, X, algorithm)
+                batch = min(batch, (time.perf_counter() - t0) / n)
+
+            results[algorithm] = (single, batch, values)
+
+        ref = results["interventional"][2]
+        ref_top = np.argsort(-np.abs(ref), axis=1)[:, :top_k]
+
+        self.stdout.write(
+            f"{'algorithm':<20} {'ms/row (1)':>11} {'ms/row (batch)':>15} "
+            f"{'max|diff|':>10} {'mean|diff|':>11} {f'top-{top_k}':>7} {'sign':>6}"
+        )
+        for algorithm, (single, batch, values) in results.items():
+            diff = np.abs(values - ref)
+            top = np.argsort(-np.abs(values), axis=1)[:, :top_k]
+            overlap = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(top, ref_top)])
+            nonzero = (ref != 0) | (values != 0)
+            sign = float(np.mean(np.sign(values[nonzero]) == np.sign(ref[nonzero])))
+            self.stdout.write(
+                f"{algorithm:<20} {single * 1000:>11.3f} {batch * 1000:>15.3f} "
+                f"{diff.max():>10.4f} {diff.mean():>11.4f} {overlap:>7.2f} {sign:>6.2f}"
+            )
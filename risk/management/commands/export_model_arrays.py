@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from risk.registry import arrays_dir_for, get_registry
+from risk.tree_engine import CompiledTreeModel, UnsupportedModelError
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the compiled tree arrays of a model next to its artifact "
+        "(<artifact>.arrays/) so workers can memory-map them (ML_MODEL_MMAP=1)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-version", default=None, help="Model version (default: current).")
+
+    def handle(self, *args, **options):
+        model = get_registry().get(options["model_version"])
+
+        try:
+            compiled = CompiledTreeModel.from_pipeline(model.pipeline)
+        except UnsupportedModelError as e:
+            raise CommandError(f"Model {model.version} can't be compiled: {e}")
+
+        out_dir = arrays_dir_for(model.path)
+        compiled.save_arrays(out_dir, sha256=model.sha256, version=model.version)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {out_dir} ({len(compiled.roots)} trees)"))
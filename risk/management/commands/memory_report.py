@@ -0,0 +1,81 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+SMAPS_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def _read_smaps_rollup(pid: int) -> dict:
+    out = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in SMAPS_FIELDS:
+                out[key] = int(rest.split()[0])     # kB
+    return out
+
+
+def _children(pid: int):
+    kids = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        try:
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                kids.extend(int(p) for p in f.read().split())
+        except OSError:
+            continue
+    return kids
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+    except OSError:
+        return ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Print unique (USS) vs shared memory for a gunicorn master and its "
+        "workers (Linux /proc/<pid>/smaps_rollup)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("pid", type=int, help="gunicorn master PID (or any process PID).")
+        parser.add_argument(
+            "--no-children", action="store_true", help="Only report the given PID."
+        )
+
+    def handle(self, *args, **options):
+        pid = options["pid"]
+        if not os.path.exists(f"/proc/{pid}/smaps_rollup"):
+            raise CommandError(f"No /proc/{pid}/smaps_rollup (Linux only, process must exist)")
+
+        pids = [pid] + ([] if options["no_children"] else _children(pid))
+
+        self.stdout.write(
+            f"{'pid':>8} {'role':<7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8} {'shared MB':>10}"
+        )
+        total_uss = total_pss = 0.0
+        for n, p in enumerate(pids):
+            try:
+                m = _read_smaps_rollup(p)
+            except OSError:
+                continue
+            uss = (m.get("Private_Clean", 0) + m.get("Private_Dirty", 0)) / 1024
+            shared = (m.get("Shared_Clean", 0) + m.get("Shared_Dirty", 0)) / 1024
+            rss = m.get("Rss", 0) / 1024
+            pss = m.get("Pss", 0) / 1024
+            total_uss += uss
+            total_pss += pss
+            role = "master" if n == 0 and len(pids) > 1 else "worker" if n else "process"
+            self.stdout.write(
+                f"{p:>8} {role:<7} {rss:>8.1f} {pss:>8.1f} {uss:>8.1f} {shared:>10.1f}"
+            )
+            if options["verbosity"] > 1:
+                self.stdout.write(f"         {_cmdline(p)[:100]}")
+
+        self.stdout.write(
+            f"Total PSS {total_pss:.1f} MB (sum of USS {total_uss:.1f} MB); "
+            "PSS counts shared pages once across processes."
+        )
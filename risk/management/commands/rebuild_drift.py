@@ -0,0 +1,70 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+from observations import packed
+from observations.models import ObservationSet
+from risk.drift import apply_batches
+from risk.models import FeatureDrift
+from risk.registry import UnknownModelVersion, get_model
+from risk.services import _X_from_value_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the drift monitor (FeatureDrift) for a model version from all "
+        "existing ObservationSets, e.g. after deploying a new model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-version", default=None, help="Model version (default: ML_MODEL_VERSION).")
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Rows read/applied per chunk.")
+
+    def handle(self, *args, **options):
+        try:
+            model = get_model(options["model_version"])
+        except UnknownModelVersion as e:
+            raise CommandError(f"Unknown model version {e}")
+
+        plan = model.plan
+        chunk_size = max(1, options["chunk_size"])
+        deleted, _ = FeatureDrift.objects.filter(model_version=model.version).delete()
+        self.stdout.write(f"Rebuilding drift for {model.version} (removed {deleted} rows)")
+
+        t0 = time.perf_counter()
+        seen = 0
+        use_packed = packed.covers(plan.db_columns)
+        columns = ("pk", "features_schema", "features_packed") if use_packed else plan.db_columns
+        rows = (
+            ObservationSet.objects.order_by("id")
+            .values_list("encounter__unit", *columns)
+            .iterator(chunk_size=chunk_size)
+        )
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                seen += self._apply(model, chunk, use_packed)
+                chunk = []
+        if chunk:
+            seen += self._apply(model, chunk, use_packed)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Added {seen} observation sets in {time.perf_counter() - t0:.2f}s"
+        ))
+
+    def _apply(self, model, chunk, use_packed):
+        if use_packed:
+            X = packed.feature_matrix([r[1:] for r in chunk], model.plan.cols)
+        else:
+            X = _X_from_value_rows(chunk, model.plan, skip=1)
+        by_unit = defaultdict(list)
+        for i, r in enumerate(chunk):
+            if r[0]:
+                by_unit[r[0]].append(i)
+
+        batches = {FeatureDrift.ALL_UNITS: X}
+        batches.update({unit: X[idx] for unit, idx in by_unit.items()})
+        apply_batches(model, batches)
+        return len(chunk)
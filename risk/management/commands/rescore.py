@@ -0,0 +1,226 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Exists, Max, OuterRef
+
+from observations import packed
+from observations.models import ObservationSet
+from risk.models import RiskAssessment
+from risk.registry import get_registry
+from risk.scoring_pool import init_worker, score_batch, threads_per_worker
+from risk.services import _X_from_value_rows, get_feature_plan, risk_band_for_probability
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-score the latest ObservationSet of every ACTIVE encounter with the "
+        "current (or given) model version and store new RiskAssessments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--unit", action="append", help="Only encounters in this unit (repeatable).")
+        parser.add_argument("--model-version", default=None, help="Model version (default: ML_MODEL_VERSION).")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Rows read from the DB per chunk.")
+        parser.add_argument("--batch-size", type=int, default=200, help="Rows per scoring task.")
+        parser.add_argument("--workers", type=int, default=1, help="Scoring processes (1 = in-process).")
+        parser.add_argument("--no-shap", action="store_true", help="Don't store SHAP contributions.")
+        parser.add_argument("--dry-run", action="store_true", help="Score and report band changes, save nothing.")
+        parser.add_argument(
+            "--checkpoint", default=None,
+            help="JSON file with the last committed ObservationSet id; resumes from it if present.",
+        )
+        parser.add_argument("--doctor-name", default="Automatic rescore")
+
+    def handle(self, *args, **options):
+        version = options["model_version"] or settings.ML_MODEL_VERSION
+        if not get_registry().has(version):
+            raise CommandError(f"Unknown model version {version!r}")
+
+        plan = get_feature_plan(version)
+        with_shap = not options["no_shap"]
+        dry_run = options["dry_run"]
+        chunk_size = max(1, options["chunk_size"])
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+
+        checkpoint = options["checkpoint"]
+        state = self._load_checkpoint(checkpoint, version, options["unit"]) if checkpoint else {}
+        last_id = state.get("last_obs_id", 0)
+        if last_id:
+            self.stdout.write(f"Resuming after ObservationSet #{last_id} ({state.get('scored', 0)} already scored)")
+
+        qs = self._latest_observations(version, options["unit"]).filter(id__gt=last_id).order_by("id")
+        total = qs.count()
+        self.stdout.write(
+            f"Rescoring {total} encounters with {version} "
+            f"(workers={workers}, chunk={chunk_size}, batch={batch_size}, shap={with_shap}"
+            f"{', DRY RUN' if dry_run else ''})"
+        )
+
+        pool = None
+        if workers > 1:
+            # Fresh interpreters: forking a process that already ran XGBoost
+            # (OpenMP) can deadlock; also no DB connections are shared
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(threads_per_worker(workers), version),
+            )
+
+        def score(X):
+            batches = [X[i:i + batch_size] for i in range(0, len(X), batch_size)]
+            if pool is None:
+                results = [score_batch(b, version, with_shap) for b in batches]
+            else:
+                results = list(pool.map(score_batch, batches, [version] * len(batches),
+                                        [with_shap] * len(batches)))
+            probas = np.concatenate([r[0] for r in results])
+            shap_vals = np.vstack([r[1] for r in results]) if with_shap else None
+            return probas, shap_vals
+
+        transitions = Counter()
+        scored = 0
+        t0 = time.perf_counter()
+
+        use_packed = packed.covers(plan.db_columns)
+        if use_packed:
+            rows_iter = qs.values_list("id", "encounter_id", "features_schema", "features_packed")
+        else:
+            rows_iter = qs.values_list("id", "encounter_id", *plan.db_columns)
+        rows_iter = rows_iter.iterator(chunk_size=chunk_size)
+        try:
+            for chunk in _chunks(rows_iter, chunk_size):
+                obs_ids = [r[0] for r in chunk]
+                enc_ids = [r[1] for r in chunk]
+                if use_packed:
+                    X = packed.feature_matrix([(r[0], r[2], r[3]) for r in chunk], plan.cols)
+                else:
+                    X = _X_from_value_rows(chunk, plan, skip=2)
+
+                probas, shap_vals = score(X)
+                bands = [risk_band_for_probability(p) for p in probas]
+
+                if dry_run:
+                    previous = self._previous_bands(enc_ids)
+                    for enc_id, band in zip(enc_ids, bands):
+                        transitions[(previous.get(enc_id, "none"), band)] += 1
+                else:
+                    assessments = [
+                        RiskAssessment(
+                            encounter_id=enc_id,
+                            observation_set_id=obs_id,
+                            risk_180d=float(p) * 100,
+                            risk_band=band,
+                            model_version=version,
+                            doctor_name=options["doctor_name"],
+                            doctor_comment="",
+                            shap_contributions=(
+                                {c: float(v) for c, v in zip(plan.cols, shap_vals[i])}
+                                if with_shap else None
+                            ),
+                        )
+                        for i, (obs_id, enc_id, p, band) in enumerate(zip(obs_ids, enc_ids, probas, bands))
+                    ]
+                    with transaction.atomic():
+                        RiskAssessment.objects.bulk_create(assessments, batch_size=500)
+
+                scored += len(chunk)
+                if checkpoint and not dry_run:
+                    self._save_checkpoint(checkpoint, version, options["unit"], obs_ids[-1],
+                                          state.get("scored", 0) + scored)
+
+                elapsed = time.perf_counter() - t0
+                self.stdout.write(f"  {scored}/{total} ({scored / elapsed:.1f} patients/s)")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        elapsed = time.perf_counter() - t0
+        rate = scored / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Would rescore' if dry_run else 'Rescored'} {scored} encounters "
+            f"in {elapsed:.2f}s ({rate:.1f} patients/s)"
+        ))
+
+        if dry_run:
+            self._print_transitions(transitions)
+        elif checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)       # finished; next run starts fresh
+
+    # ------------------------------------------------------------------
+
+    def _latest_observations(self, version, units):
+        """
+        Newest ObservationSet (by id, like "Generate risk") of every ACTIVE
+        encounter, skipping ones already scored with `version`.
+        """
+        latest = ObservationSet.objects.filter(encounter__status="ACTIVE")
+        if units:
+            latest = latest.filter(encounter__unit__in=units)
+        latest_ids = latest.values("encounter_id").annotate(latest_id=Max("id")).values("latest_id")
+
+        already = RiskAssessment.objects.filter(observation_set=OuterRef("pk"), model_version=version)
+        return ObservationSet.objects.filter(id__in=latest_ids).exclude(Exists(already))
+
+    def _previous_bands(self, enc_ids):
+        """Band of the latest existing assessment per encounter."""
+        latest_ids = (
+            RiskAssessment.objects.filter(encounter_id__in=enc_ids)
+            .values("encounter_id").annotate(latest_id=Max("id")).values("latest_id")
+        )
+        return dict(RiskAssessment.objects.filter(id__in=latest_ids).values_list("encounter_id", "risk_band"))
+
+    def _print_transitions(self, transitions):
+        bands = ["LOW", "MEDIUM", "HIGH"]
+        previous = ["none"] + bands
+        self.stdout.write("\nBand changes (rows: current band, columns: new band)")
+        self.stdout.write(f"{'':>8}" + "".join(f"{b:>8}" for b in bands))
+        for old in previous:
+            self.stdout.write(f"{old:>8}" + "".join(f"{transitions.get((old, new), 0):>8}" for new in bands))
+        changed = sum(n for (old, new), n in transitions.items() if old != "none" and old != new)
+        self.stdout.write(f"Changed band: {changed}, first assessment: "
+                          f"{sum(n for (old, _), n in transitions.items() if old == 'none')}")
+
+    def _load_checkpoint(self, path, version, units):
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("model_version") != version or state.get("units") != (units or None):
+            raise CommandError(
+                f"Checkpoint {path} is for {state.get('model_version')} / units {state.get('units')}; "
+                "delete it or pass the same options."
+            )
+        return state
+
+    def _save_checkpoint(self, path, version, units, last_obs_id, scored):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "model_version": version,
+                "units": units or None,
+                "last_obs_id": last_obs_id,
+                "scored": scored,
+            }, f)
+        os.replace(tmp, path)
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
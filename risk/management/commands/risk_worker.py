@@ -0,0 +1,88 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from risk.jobs import claim_next_job, fail_job, requeue_stale_jobs, run_job, worker_id
+from risk.models import RiskJob
+
+
+logger = logging.getLogger(__name__)
+
+
+def _claim_and_run():
+    try:
+        job = claim_next_job(worker_id())
+        if job is None:
+            return None
+        try:
+            return run_job(job)
+        except Exception as e:
+            # run_job handles scoring errors itself; this is e.g. the DB
+            # failing while it records the outcome
+            logger.exception("Risk job %s crashed", job.id)
+            return fail_job(job, e)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Process queued risk generation jobs (settings.RISK_JOBS_ASYNC with "
+        "RISK_JOBS_RUNNER='command')."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=None,
+            help="Jobs scored in parallel (default: settings.RISK_JOBS_WORKERS).",
+        )
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between polls when idle.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue, then exit.")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"] or settings.RISK_JOBS_WORKERS
+        poll = options["poll_interval"]
+
+        self.stdout.write(f"risk_worker: concurrency={concurrency}")
+        done = failed = 0
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="risk-worker") as pool:
+            running = set()
+            while True:
+                requeue_stale_jobs()
+
+                # Keep up to `concurrency` claims in flight
+                free = concurrency - len(running)
+                if free > 0:
+                    queued = RiskJob.objects.filter(status=RiskJob.QUEUED).count()
+                    for _ in range(min(free, queued)):
+                        running.add(pool.submit(_claim_and_run))
+
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(poll)
+                    continue
+
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for f in finished:
+                    try:
+                        job = f.result()
+                    except Exception as e:
+                        # claiming failed (DB unavailable, ...): keep the worker alive
+                        logger.exception("risk_worker: claiming a job failed")
+                        self.stderr.write(f"Claiming a job failed: {type(e).__name__}: {e}")
+                        continue
+                    if job is None:
+                        continue
+                    if job.status == RiskJob.DONE:
+                        done += 1
+                    elif job.status == RiskJob.FAILED:
+                        failed += 1
+                        self.stderr.write(f"Job #{job.id} failed: {job.error}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed jobs: {done} done, {failed} failed"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('risk', '0005_alter_riskassessment_doctor_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskassessment',
+            name='shap_contributions',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('observations', '0008_rename_ag_max_observationset_ag_max'),
+        ('patients', '0001_initial'),
+        ('risk', '0006_riskassessment_shap_contributions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, unique=True)),
+                ('doctor_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], db_index=True, default='QUEUED', max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('claimed_by', models.CharField(blank=True, default='', max_length=64)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('assessment', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job', to='risk.riskassessment')),
+                ('encounter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_jobs', to='patients.encounter')),
+                ('observation_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_jobs', to='observations.observationset')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='risk_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('risk', '0007_riskjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeatureDrift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_version', models.CharField(max_length=64)),
+                ('reference', models.CharField(max_length=16)),
+                ('unit', models.CharField(max_length=64)),
+                ('feature', models.CharField(max_length=64)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('missing', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0.0)),
+                ('m2', models.FloatField(default=0.0)),
+                ('bins', models.JSONField(default=list)),
+                ('psi', models.FloatField(blank=True, null=True)),
+                ('ks', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['model_version', 'unit', '-psi'], name='risk_featur_model_v_48f404_idx')],
+                'constraints': [models.UniqueConstraint(fields=('model_version', 'unit', 'feature'), name='uniq_feature_drift')],
+            },
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('risk', '0008_featuredrift'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowAgreement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('production_version', models.CharField(max_length=64)),
+                ('shadow_version', models.CharField(max_length=64)),
+                ('shadow_sha256', models.CharField(max_length=64)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('band_flips', models.PositiveIntegerField(default=0)),
+                ('flips_up', models.PositiveIntegerField(default=0)),
+                ('flips_down', models.PositiveIntegerField(default=0)),
+                ('sum_delta', models.FloatField(default=0.0)),
+                ('sum_sq_delta', models.FloatField(default=0.0)),
+                ('sum_abs_delta', models.FloatField(default=0.0)),
+                ('max_abs_delta', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('production_version', 'shadow_version', 'shadow_sha256'), name='uniq_shadow_agreement')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ShadowResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('production_version', models.CharField(max_length=64)),
+                ('shadow_version', models.CharField(max_length=64)),
+                ('shadow_sha256', models.CharField(max_length=64)),
+                ('production_proba', models.FloatField()),
+                ('shadow_proba', models.FloatField()),
+                ('production_band', models.CharField(max_length=16)),
+                ('shadow_band', models.CharField(max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('assessment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='shadow_result', to='risk.riskassessment')),
+            ],
+        ),
+    ]
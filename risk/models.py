@@ -36,5 +36,144 @@ class RiskAssessment(models.Model):
 
     doctor_comment = models.TextField(blank=True, default="")
 
+    # Full SHAP vector {feature: contribution} computed at generation time
+    # with `model_version`, so the detail page doesn't re-run the explainer.
+    shap_contributions = models.JSONField(null=True, blank=True)
+
     def __str__(self):
         return f"Risk #{self.id} {self.risk_band} {self.risk_180d:.2f}%"
+
+
+class RiskJob(models.Model):
+    """
+    Queued "generate risk" request (settings.RISK_JOBS_ASYNC).
+    Processed by risk.jobs (in-process thread pool or `manage.py risk_worker`).
+    """
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUS_CHOICES = [(s, s.title()) for s in (QUEUED, RUNNING, DONE, FAILED)]
+
+    # One job per submitted form (hidden token), so a retried POST or a
+    # double click doesn't score twice
+    idempotency_key = models.CharField(max_length=64, unique=True)
+
+    encounter = models.ForeignKey(
+        "patients.Encounter", on_delete=models.CASCADE, related_name="risk_jobs"
+    )
+    observation_set = models.ForeignKey(
+        "observations.ObservationSet", on_delete=models.CASCADE, related_name="risk_jobs"
+    )
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="risk_jobs",
+    )
+    doctor_name = models.CharField(max_length=100, blank=True, null=True)
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    claimed_by = models.CharField(max_length=64, blank=True, default="")
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    assessment = models.OneToOneField(
+        RiskAssessment, on_delete=models.SET_NULL, null=True, blank=True, related_name="job"
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"RiskJob #{self.id} {self.status}"
+
+
+class FeatureDrift(models.Model):
+    """
+    Streaming distribution of one model feature in one unit (risk.drift),
+    updated on every new ObservationSet, plus its drift vs the model's
+    reference (shap_background or stored training quantiles).
+    unit == ALL_UNITS aggregates every unit.
+    """
+    ALL_UNITS = "*"
+
+    model_version = models.CharField(max_length=64)
+    reference = models.CharField(max_length=16)     # sha256 prefix of the artifact
+    unit = models.CharField(max_length=64)
+    feature = models.CharField(max_length=64)
+
+    count = models.PositiveIntegerField(default=0)  # observations seen (incl. missing)
+    missing = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0.0)           # Welford over non-missing values
+    m2 = models.FloatField(default=0.0)
+    bins = models.JSONField(default=list)           # counts per reference quantile bin
+
+    psi = models.FloatField(null=True, blank=True)
+    ks = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["model_version", "unit", "feature"], name="uniq_feature_drift"),
+        ]
+        indexes = [models.Index(fields=["model_version", "unit", "-psi"])]
+
+    def __str__(self):
+        return f"{self.feature} @ {self.unit} ({self.model_version}) PSI={self.psi}"
+
+
+class ShadowResult(models.Model):
+    """Shadow model score (settings.ML_SHADOW_MODEL_PATH) next to the production one."""
+    assessment = models.OneToOneField(
+        RiskAssessment, on_delete=models.CASCADE, related_name="shadow_result"
+    )
+    production_version = models.CharField(max_length=64)
+    shadow_version = models.CharField(max_length=64)
+    shadow_sha256 = models.CharField(max_length=64)
+
+    production_proba = models.FloatField()
+    shadow_proba = models.FloatField()
+    production_band = models.CharField(max_length=16)
+    shadow_band = models.CharField(max_length=16)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def delta(self):
+        return self.shadow_proba - self.production_proba
+
+    def __str__(self):
+        return f"Shadow #{self.assessment_id} {self.production_band}->{self.shadow_band}"
+
+
+class ShadowAgreement(models.Model):
+    """
+    Running agreement between production and one shadow artifact, updated
+    with F() expressions as results come in (risk.shadow), so reading it
+    never scans ShadowResult.
+    """
+    production_version = models.CharField(max_length=64)
+    shadow_version = models.CharField(max_length=64)
+    shadow_sha256 = models.CharField(max_length=64)
+
+    count = models.PositiveIntegerField(default=0)
+    band_flips = models.PositiveIntegerField(default=0)
+    flips_up = models.PositiveIntegerField(default=0)       # shadow band higher
+    flips_down = models.PositiveIntegerField(default=0)
+    sum_delta = models.FloatField(default=0.0)              # shadow - production (0..1)
+    sum_sq_delta = models.FloatField(default=0.0)
+    sum_abs_delta = models.FloatField(default=0.0)
+    max_abs_delta = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["production_version", "shadow_version", "shadow_sha256"], name="uniq_shadow_agreement"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.production_version} vs {self.shadow_version}: {self.count} scored"
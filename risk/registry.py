@@ -0,0 +1,322 @@
+# risk/registry.py
+"""
+Versioned model registry.
+
+settings.ML_MODEL_REGISTRY maps model_version -> artifact path. Each loaded
+version is a LoadedModel (bundle + everything derived from it: feature plan,
+compiled trees, SHAP background/explainer), kept in a bounded LRU.
+
+A version is reloaded when its file changes on disk (mtime/size changed AND
+the sha256 differs). The new LoadedModel is built outside the lock and then
+swapped in, so in-flight requests keep using the object they already hold.
+If the new file doesn't load (half-written, bad bundle), the old model keeps
+serving until the file changes again and loads.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+from hospital_ai import metrics
+from .timing import stage
+
+logger = logging.getLogger(__name__)
+
+_MODEL_LOADS = metrics.counter(
+    "risk_model_loads_total",
+    "Model artifacts loaded (load), reloaded after a change (reload) or not (reload_failed).",
+    ["event"],
+)
+_MODEL_LOAD_SECONDS = metrics.histogram(
+    "risk_model_load_seconds", "Time to load a model artifact.", buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60)
+)
+_MODEL_EVICTIONS = metrics.counter("risk_model_evictions_total", "Models evicted from the registry.")
+
+
+class UnknownModelVersion(KeyError):
+    pass
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _nbytes(obj) -> int:
+    if obj is None:
+        return 0
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if hasattr(obj, "memory_usage"):        # pandas DataFrame
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if hasattr(obj, "__dict__"):
+        return sum(_nbytes(v) for v in vars(obj).values() if isinstance(v, np.ndarray))
+    return 0
+
+
+def arrays_dir_for(path: str) -> str:
+    return f"{path}.arrays"
+
+
+def arrays_manifest_sha256(path: str):
+    try:
+        with open(os.path.join(arrays_dir_for(path), "trees.json")) as f:
+            return json.load(f).get("sha256")
+    except (OSError, ValueError):
+        return None
+
+
+class LoadedModel:
+    """One model artifact, loaded, plus its derived (cached) state."""
+
+    def __init__(self, version: str, path: str):
+        from .services import FeaturePlan, _bundle_to_pipeline_and_features
+
+        st = os.stat(path)
+        self.version = version
+        self.path = path
+        self.mtime = st.st_mtime
+        self.size = st.st_size
+        self.sha256 = _file_sha256(path)
+        self.loaded_at = time.time()
+
+        # mmap_mode="r": numpy arrays inside an uncompressed joblib (e.g. the
+        # SHAP background) are mapped read-only and shared between workers
+        mmap = getattr(settings, "ML_MODEL_MMAP", False)
+        self.bundle = joblib.load(path, mmap_mode="r" if mmap else None)
+        self.pipeline, trained_features = _bundle_to_pipeline_and_features(self.bundle)
+
+        # Compiled tree arrays exported next to the artifact
+        # (manage.py export_model_arrays), only if they match this file
+        self.arrays_dir = None
+        if mmap and arrays_manifest_sha256(path) == self.sha256:
+            self.arrays_dir = arrays_dir_for(path)
+
+        from observations.models import ObservationSet
+        self.plan = FeaturePlan(trained_features or ObservationSet.feature_columns(), self.pipeline)
+
+        # Identity of this model + column order; SHAP state is keyed by it
+        self.explainer_key = (version, self.sha256, tuple(self.plan.cols))
+        # ... and prefixes every prediction-cache fingerprint (risk.cache)
+        self.fingerprint_prefix = hashlib.sha256(repr(self.explainer_key).encode()).digest()[:16]
+
+        # Filled lazily by risk.services
+        self.lock = threading.Lock()
+        self.compiled = None                # CompiledTreeModel, or False if unsupported
+        self.background = None              # SHAP background in RAW feature space
+        self.background_transformed = None  # ... after the pipeline's preprocessing
+        self.explainers = {}                # (explainer_key, algorithm) -> shap.TreeExplainer
+        self.drift_reference = None         # risk.drift.DriftReference
+
+    def approx_bytes(self) -> int:
+        """
+        Rough memory footprint: artifact size (booster + pickled objects)
+        plus the arrays we derived from it.
+        """
+        return (
+            self.size
+            + _nbytes(self.background)
+            + _nbytes(self.background_transformed)
+            + _nbytes(self.compiled or None)
+        )
+
+    def __repr__(self):
+        return f"<LoadedModel {self.version} {self.path}>"
+
+
+class ModelRegistry:
+    def __init__(self, paths: dict, default_version: str, max_loaded: int = 2,
+                 max_bytes: int = 0, check_interval: float = 5.0, pinned=()):
+        self.paths = dict(paths)
+        self.default_version = default_version
+        # Kept loaded on top of max_loaded and never evicted (the shadow
+        # model: it scores every assessment, so an LRU would thrash it)
+        self.pinned = set(pinned) - {default_version}
+        self.max_loaded = max(1, max_loaded)
+        self.max_bytes = max_bytes
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._loaded = OrderedDict()        # version -> LoadedModel (LRU order)
+        self._last_check = {}               # version -> monotonic time
+        self.load_events = 0
+        self.reload_events = 0
+        self.reload_failures = 0
+        self.last_reload_error = None
+        self.evictions = 0
+
+    def has(self, version: str) -> bool:
+        return bool(version) and version in self.paths
+
+    def get(self, version: str = None) -> LoadedModel:
+        version = version or self.default_version
+        if version not in self.paths:
+            raise UnknownModelVersion(version)
+
+        with self._lock:
+            model = self._loaded.get(version)
+            if model is not None:
+                self._loaded.move_to_end(version)
+                if not self._due_for_check(version):
+                    return model
+
+        if model is not None and not self._changed_on_disk(model):
+            return model
+
+        return self._load(version, previous=model)
+
+    def _due_for_check(self, version) -> bool:
+        now = time.monotonic()
+        if now - self._last_check.get(version, 0.0) < self.check_interval:
+            return False
+        self._last_check[version] = now
+        return True
+
+    def _changed_on_disk(self, model: LoadedModel) -> bool:
+        try:
+            st = os.stat(model.path)
+        except OSError:
+            # File being replaced; keep serving the loaded one
+            return False
+        if st.st_mtime == model.mtime and st.st_size == model.size:
+            return False
+        if _file_sha256(model.path) == model.sha256:
+            model.mtime, model.size = st.st_mtime, st.st_size
+            return False
+        return True
+
+    def _load(self, version, previous=None) -> LoadedModel:
+        with self._lock:
+            load_lock = self._load_locks.setdefault(version, threading.Lock())
+
+        with load_lock:
+            # Another thread may have (re)loaded it while we waited
+            with self._lock:
+                current = self._loaded.get(version)
+            if current is not None and current is not previous:
+                return current
+
+            t0 = time.perf_counter()
+            st = None
+            try:
+                st = os.stat(self.paths[version])
+                model = LoadedModel(version, self.paths[version])
+            except Exception as e:
+                if previous is None:
+                    raise
+                return self._reload_failed(previous, e, st)
+            elapsed = time.perf_counter() - t0
+            logger.info("Loaded model %s from %s in %.2fs", version, model.path, elapsed)
+            _MODEL_LOAD_SECONDS.observe(elapsed)
+            _MODEL_LOADS.labels(event="reload" if previous is not None else "load").inc()
+
+            with self._lock:
+                self._loaded[version] = model
+                self._loaded.move_to_end(version)
+                self._last_check[version] = time.monotonic()
+                if previous is not None:
+                    self.reload_events += 1
+                else:
+                    self.load_events += 1
+                self._evict()
+
+            return model
+
+    def _reload_failed(self, previous: LoadedModel, error: Exception, st=None) -> LoadedModel:
+        logger.exception("Reloading model %s from %s failed; keeping the loaded one", previous.version, previous.path)
+        _MODEL_LOADS.labels(event="reload_failed").inc()
+        with self._lock:
+            # Don't retry this same file on every check; a later write
+            # changes mtime/size and is tried again
+            if st is not None:
+                previous.mtime, previous.size = st.st_mtime, st.st_size
+            self.reload_failures += 1
+            self.last_reload_error = f"{previous.version}: {error!r}"
+        return previous
+
+    def _evict(self):
+        # Called with self._lock held. Never evicts the default or a pinned version.
+        def over_budget():
+            if sum(v not in self.pinned for v in self._loaded) > self.max_loaded:
+                return True
+            if self.max_bytes and len(self._loaded) > 1:
+                return sum(m.approx_bytes() for m in self._loaded.values()) > self.max_bytes
+            return False
+
+        while over_budget():
+            victim = next(
+                (v for v in self._loaded if v != self.default_version and v not in self.pinned), None
+            )
+            if victim is None:
+                break
+            self._loaded.pop(victim)
+            self.evictions += 1
+            _MODEL_EVICTIONS.inc()
+            logger.info("Evicted model %s from registry", victim)
+
+    def stats(self) -> dict:
+        with self._lock:
+            loaded = [
+                {
+                    "version": m.version,
+                    "path": m.path,
+                    "sha256": m.sha256,
+                    "loaded_at": m.loaded_at,
+                    "approx_bytes": m.approx_bytes(),
+                }
+                for m in self._loaded.values()
+            ]
+        return {
+            "default_version": self.default_version,
+            "pinned_versions": sorted(self.pinned),
+            "known_versions": list(self.paths),
+            "loaded": loaded,
+            "total_approx_bytes": sum(m["approx_bytes"] for m in loaded),
+            "load_events": self.load_events,
+            "reload_events": self.reload_events,
+            "reload_failures": self.reload_failures,
+            "last_reload_error": self.last_reload_error,
+            "evictions": self.evictions,
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                paths = dict(getattr(settings, "ML_MODEL_REGISTRY", None) or {})
+                paths.setdefault(settings.ML_MODEL_VERSION, settings.ML_MODEL_PATH)
+                pinned = []
+                if getattr(settings, "ML_SHADOW_MODEL_PATH", None):
+                    paths.setdefault(settings.ML_SHADOW_MODEL_VERSION, settings.ML_SHADOW_MODEL_PATH)
+                    pinned.append(settings.ML_SHADOW_MODEL_VERSION)
+                _registry = ModelRegistry(
+                    paths,
+                    default_version=settings.ML_MODEL_VERSION,
+                    max_loaded=getattr(settings, "ML_MODEL_CACHE_SIZE", 2),
+                    max_bytes=getattr(settings, "ML_MODEL_CACHE_MAX_MB", 0) * 1024 * 1024,
+                    check_interval=getattr(settings, "ML_MODEL_RELOAD_CHECK_SECONDS", 5.0),
+                    pinned=pinned,
+                )
+    return _registry
+
+
+def get_model(version: str = None) -> LoadedModel:
+    with stage("model"):
+        return get_registry().get(version)
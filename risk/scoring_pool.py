@@ -0,0 +1,39 @@
+# risk/scoring_pool.py
+"""
+Process-pool side of batch scoring (manage.py rescore).
+
+Workers are started with the "spawn" method, so this module must be
+importable BEFORE Django is set up: no model imports at module level.
+"""
+import os
+
+import numpy as np
+
+
+def init_worker(n_threads: int, model_version=None):
+    import django
+    django.setup()
+
+    from .registry import get_model
+    from .services import _get_xgb_model
+
+    # One process per core already; don't let every XGBoost spin up all cores.
+    # Same version as score_batch will use (rescore --model-version).
+    xgb_model = _get_xgb_model(get_model(model_version).pipeline)
+    if hasattr(xgb_model, "set_params"):
+        xgb_model.set_params(n_jobs=n_threads)
+
+
+def threads_per_worker(workers: int) -> int:
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def score_batch(X, model_version, with_shap):
+    """(probas, shap matrix or None) for the rows of X (model column order)."""
+    from .registry import get_model
+    from .services import _predict_proba, _shap_algorithm, _shap_matrix
+
+    model = get_model(model_version)
+    probas = np.asarray(_predict_proba(model, X), dtype=float)
+    shap_vals = _shap_matrix(model, X, _shap_algorithm()) if with_shap else None
+    return probas, shap_vals
@@ -1,23 +1,42 @@
-import joblib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
 import numpy as np
 import pandas as pd
 import shap
 from django.conf import settings
+from django.db import close_old_connections, connection
+from django.db.models import QuerySet
 
+from hospital_ai import metrics
+from observations import packed
 from observations.models import ObservationSet
+from .cache import fingerprint, get_prediction_cache
+from .registry import LoadedModel, get_model
+from .timing import stage
+from .tree_engine import CompiledTreeModel, UnsupportedModelError, imputer_statistics
+
+logger = logging.getLogger(__name__)
 
-_model_bundle = None
+_PREDICT_SECONDS = metrics.histogram(
+    "risk_predict_seconds", "Model predict_proba latency per call.", ["engine"]
+)
+_SHAP_SECONDS = metrics.histogram("risk_shap_seconds", "SHAP latency per call.", ["algorithm"])
+_CACHE_LOOKUPS = metrics.counter(
+    "risk_prediction_cache_lookups_total", "Prediction cache lookups per row.", ["result"]
+)
+_EXPLANATIONS = metrics.counter(
+    "risk_explanations_total", "Budgeted explanation events (see explanation_stats).", ["event"]
+)
 
-_tree_explainer = None          # cached TreeExplainer
-_tree_explainer_bg_sig = None   # signature of background used for explainer
-_cached_bg = None               # cached background in RAW feature space
 
+def get_model_bundle(model_version: str = None):
+    return get_model(model_version).bundle
 
-def get_model_bundle():
-    global _model_bundle
-    if _model_bundle is None:
-        _model_bundle = joblib.load(settings.ML_MODEL_PATH)
-    return _model_bundle
+
+def get_feature_plan(model_version: str = None) -> "FeaturePlan":
+    return get_model(model_version).plan
 
 
 def _bundle_to_pipeline_and_features(bundle):
@@ -35,19 +54,105 @@ def _safe_get(obs: ObservationSet, col: str):
     return np.nan
 
 
-def _build_X(obs: ObservationSet, cols):
-    row = {c: _safe_get(obs, c) for c in cols}
-    X = pd.DataFrame([row], columns=cols)
-    return X, row
+class FeaturePlan:
+    """
+    Column-accessor plan for the bundle's feature columns, built ONCE when
+    the model loads. Turns an ObservationSet into a float64 NumPy row
+    (NaN = missing) that is reused for both predict and explain.
+    """
+
+    def __init__(self, cols, pipeline):
+        self.cols = list(cols)
+
+        # (row index, attribute) for columns that exist on ObservationSet;
+        # anything else simply stays NaN
+        fields = {f.attname for f in ObservationSet._meta.concrete_fields}
+        self.accessors = [(i, c) for i, c in enumerate(self.cols) if c in fields]
+        self.db_columns = [c for _, c in self.accessors]
+
+        # sklearn validates column names if it was fitted on a DataFrame,
+        # so only those pipelines get a DataFrame
+        self.needs_frame = hasattr(pipeline, "feature_names_in_")
+
+        # SimpleImputer-only preprocessing can be applied with NumPy directly
+        try:
+            self.impute_values = imputer_statistics(pipeline)
+            self.fast_transform = True
+        except UnsupportedModelError:
+            self.impute_values = None
+            self.fast_transform = False
+
+    def row(self, obs: ObservationSet) -> np.ndarray:
+        row = np.full(len(self.cols), np.nan)
+        for i, attr in self.accessors:
+            v = getattr(obs, attr)
+            if v is not None:
+                row[i] = v
+        return row
+
+    def model_input(self, X: np.ndarray):
+        """(n, n_cols) ndarray -> what pipeline.predict_proba/transform expects."""
+        if self.needs_frame:
+            return pd.DataFrame(X, columns=self.cols)
+        return X
+
+    def transform(self, pipeline, X: np.ndarray) -> np.ndarray:
+        """Applies the pipeline's preprocessing only (model input for SHAP)."""
+        if self.fast_transform:
+            if self.impute_values is None:
+                return X
+            return np.where(np.isnan(X), self.impute_values, X)
+
+        pre = _get_preprocessor(pipeline)
+        return pre.transform(self.model_input(X)) if pre is not None else X
+
+
+def _build_X_batch(observations, plan: FeaturePlan):
+    """
+    Builds ONE (n, len(cols)) float matrix for many ObservationSets.
+
+    - QuerySet: the packed feature blobs (observations.packed), or
+      values_list(...) if the model uses columns outside FEATURE_COLUMNS
+    - list/iterable of ObservationSet: attribute reads
+
+    Missing values (NULL / unknown column) become NaN.
+    Returns (obs_ids, X ndarray).
+    """
+    if isinstance(observations, QuerySet) and packed.covers(plan.db_columns):
+        obs_ids, X = packed.load_feature_matrix(observations, plan.cols)
+    elif isinstance(observations, QuerySet):
+        rows = list(observations.values_list("id", *plan.db_columns))
+        obs_ids = [r[0] for r in rows]
+        X = _X_from_value_rows(rows, plan, skip=1)
+    else:
+        observations = list(observations)
+        obs_ids = [getattr(o, "id", None) for o in observations]
+        X = np.full((len(observations), len(plan.cols)), np.nan, dtype=float)
+        for n, o in enumerate(observations):
+            X[n] = plan.row(o)
+
+    return obs_ids, X
+
+
+def _X_from_value_rows(rows, plan: FeaturePlan, skip: int = 0) -> np.ndarray:
+    """
+    values_list(<skip leading columns>, *plan.db_columns) tuples -> (n, len(cols))
+    float matrix; NULL -> NaN.
+    """
+    X = np.full((len(rows), len(plan.cols)), np.nan, dtype=float)
+    if rows:
+        # None -> NaN when converting to float
+        X[:, [i for i, _ in plan.accessors]] = np.array([r[skip:] for r in rows], dtype=float)
+    return X
 
 
 # -------------------------------------------------------------------
 # ✅ BACKGROUND LOADED FROM THE SAME MODEL FILE (single joblib)
 # -------------------------------------------------------------------
 
-def _get_background_from_bundle(cols) -> pd.DataFrame:
+def _get_background_from_bundle(model: LoadedModel) -> pd.DataFrame:
     """
-    Loads SHAP background from the model bundle (settings.ML_MODEL_PATH),
+    Loads SHAP background from the model bundle (the registry artifact),
     so you only deploy ONE file: XGBoost_mortality_180days.joblib
 
     The model joblib must contain:
@@ -57,12 +162,13 @@ def _get_background_from_bundle(cols) -> pd.DataFrame:
           "shap_background": <DataFrame or ndarray>
         }
     """
-    global _cached_bg
+    cols = model.plan.cols
 
-    if _cached_bg is not None:
-        return _cached_bg.reindex(columns=cols)
+    # Cached already aligned to model.plan.cols -> no per-call reindex copy
+    if model.background is not None:
+        return model.background
 
-    bundle = get_model_bundle()
+    bundle = model.bundle
     bg_loaded = None
 
     if isinstance(bundle, dict):
@@ -74,6 +180,16 @@ def _get_background_from_bundle(cols) -> pd.DataFrame:
             "Retrain/export the model with shap_background embedded into the same joblib."
         )
 
+    # Already aligned + numeric: use it as-is (no private copy, so a
+    # memory-mapped / pre-fork background stays shared between workers)
+    if (
+        isinstance(bg_loaded, pd.DataFrame)
+        and list(bg_loaded.columns) == list(cols)
+        and all(pd.api.types.is_numeric_dtype(t) for t in bg_loaded.dtypes)
+    ):
+        model.background = bg_loaded
+        return bg_loaded
+
     # Convert to DataFrame
     if isinstance(bg_loaded, pd.DataFrame):
         bg = bg_loaded.copy()
@@ -95,7 +211,7 @@ def _get_background_from_bundle(cols) -> pd.DataFrame:
     for c in cols:
         bg[c] = pd.to_numeric(bg[c], errors="coerce")
 
-    _cached_bg = bg
+    model.background = bg
     return bg
 
 
@@ -111,80 +227,332 @@ def _get_preprocessor(pipeline):
     return None
 
 
-def _background_signature(X_bg_t) -> str:
+# -------------------------------------------------------------------
+# SHAP algorithm (settings.ML_SHAP_ALGORITHM or per-call `algorithm=`)
+#   interventional      TreeExplainer over the bundle's background (default)
+#   tree_path_dependent TreeExplainer without background (tree cover stats)
+#   pred_contribs       XGBoost's native Booster.predict(pred_contribs=True)
+# -------------------------------------------------------------------
+
+SHAP_ALGORITHMS = ("interventional", "tree_path_dependent", "pred_contribs")
+
+
+def _shap_algorithm(algorithm: str = None) -> str:
+    algorithm = algorithm or getattr(settings, "ML_SHAP_ALGORITHM", "interventional")
+    if algorithm not in SHAP_ALGORITHMS:
+        raise ValueError(f"Unknown SHAP algorithm {algorithm!r}, expected one of {SHAP_ALGORITHMS}")
+    return algorithm
+
+
+def _get_tree_explainer(model: LoadedModel, algorithm: str = "interventional"):
+    """
+    TreeExplainer built ONCE per (model.explainer_key, algorithm), where
+    explainer_key = (model version, artifact sha256, column order) is fixed
+    when the model loads -- nothing is recomputed per call.
+    """
+    key = (model.explainer_key, algorithm)
+    explainer = model.explainers.get(key)
+    if explainer is not None:
+        return explainer
+
+    with model.lock:
+        explainer = model.explainers.get(key)
+        if explainer is None:
+            if algorithm == "tree_path_dependent":
+                with stage("explainer_build"):
+                    explainer = shap.TreeExplainer(
+                        _get_xgb_model(model.pipeline), feature_perturbation="tree_path_dependent"
+                    )
+            else:
+                # ✅ Background from same model joblib
+                with stage("shap_background"):
+                    X_bg = _get_background_from_bundle(model)
+                    model.background_transformed = model.plan.transform(
+                        model.pipeline, X_bg.to_numpy(dtype=float)
+                    )
+                with stage("explainer_build"):
+                    explainer = shap.TreeExplainer(
+                        _get_xgb_model(model.pipeline), data=model.background_transformed
+                    )
+            model.explainers[key] = explainer
+
+    return explainer
+
+
+def _native_contributions(model: LoadedModel, X_t: np.ndarray) -> np.ndarray:
+    """XGBoost's own TreeSHAP (path dependent), without the bias column."""
+    import xgboost as xgb
+
+    xgb_model = _get_xgb_model(model.pipeline)
+    booster = xgb_model.get_booster()
+
+    # Same iteration range the sklearn wrapper uses for predict_proba
     try:
-        arr = np.asarray(X_bg_t)
-        return f"{arr.shape}-{float(np.nanmean(arr)):.8f}-{float(np.nanstd(arr)):.8f}"
-    except Exception:
-        return "unknown"
+        iteration_range = (0, xgb_model.best_iteration + 1)
+    except AttributeError:
+        iteration_range = (0, 0)
+
+    dm = xgb.DMatrix(np.asarray(X_t, dtype=float), feature_names=booster.feature_names)
+    contribs = booster.predict(dm, pred_contribs=True, iteration_range=iteration_range)
+    return contribs[:, :-1]
+
+
+def _get_compiled_model(model: LoadedModel):
+    if model.compiled is None:
+        try:
+            model.compiled = (
+                CompiledTreeModel.load_arrays(model.arrays_dir, mmap_mode="r")
+                if model.arrays_dir
+                else CompiledTreeModel.from_pipeline(model.pipeline)
+            )
+        except UnsupportedModelError as e:
+            logger.warning("Compiled inference engine unavailable, using pipeline: %s", e)
+            model.compiled = False
+    return model.compiled or None
+
+
+def _predict_proba(model: LoadedModel, X: np.ndarray) -> np.ndarray:
+    """
+    P(class 1) for every row of X (columns in model order).
+    Uses the compiled NumPy engine if settings.ML_INFERENCE_ENGINE == "compiled"
+    and the batch is small; large batches are faster in XGBoost itself.
+    """
+    if (
+        getattr(settings, "ML_INFERENCE_ENGINE", "pipeline") == "compiled"
+        and len(X) <= getattr(settings, "ML_COMPILED_MAX_ROWS", 64)
+    ):
+        compiled = _get_compiled_model(model)
+        if compiled is not None:
+            with stage("predict"), _PREDICT_SECONDS.labels(engine="compiled").time():
+                return compiled.predict_proba(X)[:, 1]
+    with stage("predict"), _PREDICT_SECONDS.labels(engine="pipeline").time():
+        return model.pipeline.predict_proba(model.plan.model_input(X))[:, 1]
 
 
-def _get_tree_explainer(pipeline, X_bg_transformed):
-    global _tree_explainer, _tree_explainer_bg_sig
+def predict_180d_mortality(obs: ObservationSet, model_version: str = None) -> float:
+    model = get_model(model_version)
 
-    sig = _background_signature(X_bg_transformed)
-    if _tree_explainer is not None and _tree_explainer_bg_sig == sig:
-        return _tree_explainer
+    X = model.plan.row(obs).reshape(1, -1)
+    proba, _ = _predict_rows_memoized(model, X, with_shap=False)
+    return float(proba[0])
 
-    model = _get_xgb_model(pipeline)
-    _tree_explainer = shap.TreeExplainer(model, data=X_bg_transformed)
-    _tree_explainer_bg_sig = sig
-    return _tree_explainer
 
+def _shap_matrix(model: LoadedModel, X: np.ndarray, algorithm: str = "interventional") -> np.ndarray:
+    """
+    SHAP values (positive class, log-odds) for every row of X -> (n, n_features).
+    """
+    with stage("transform"):
+        X_t = model.plan.transform(model.pipeline, X)
+
+    if algorithm == "pred_contribs":
+        with stage("shap"), _SHAP_SECONDS.labels(algorithm=algorithm).time():
+            return np.asarray(_native_contributions(model, X_t), dtype=float).reshape(len(X), -1)
+
+    explainer = _get_tree_explainer(model, algorithm)
 
-def predict_180d_mortality(obs: ObservationSet) -> float:
-    bundle = get_model_bundle()
-    pipeline, trained_features = _bundle_to_pipeline_and_features(bundle)
-    cols = trained_features or ObservationSet.feature_columns()
+    with stage("shap"), _SHAP_SECONDS.labels(algorithm=algorithm).time():
+        shap_vals = explainer.shap_values(X_t)
 
-    X, _ = _build_X(obs, cols)
-    proba = pipeline.predict_proba(X)[0][1]
-    return float(proba)
+    # binary classifier sometimes returns list [class0, class1]
+    if isinstance(shap_vals, list):
+        shap_vals = shap_vals[1]
 
+    return np.asarray(shap_vals).reshape(len(X), -1)
 
-def predict_180d_mortality_with_shap(obs: ObservationSet, top_n: int = 10):
+
+def _predict_rows_memoized(model: LoadedModel, X: np.ndarray, with_shap: bool,
+                           algorithm: str = "interventional"):
     """
-    Returns:
-      proba: float (0..1)
-      shap_items: list[dict] sorted by |shap_value| desc
+    _predict_proba (+ _shap_matrix) through the prediction cache (risk.cache).
 
-    Note: Your pipeline is (SimpleImputer + XGBoost), so transformed features
-    match raw features (no one-hot expansion).
+    Each row is looked up by fingerprint(model identity, values, NaN mask);
+    only the misses go to the model, in ONE call. Entries are
+    {"proba": float, "shap:<algorithm>": ndarray}, so a probability-only
+    entry is upgraded in place the first time its explanation is needed.
+
+    Returns (probas ndarray, shap matrix or None).
     """
-    bundle = get_model_bundle()
-    pipeline, trained_features = _bundle_to_pipeline_and_features(bundle)
-    cols = trained_features or ObservationSet.feature_columns()
+    cache = get_prediction_cache()
+    if cache is None:
+        probas = np.asarray(_predict_proba(model, X), dtype=float)
+        return probas, (_shap_matrix(model, X, algorithm) if with_shap else None)
+
+    shap_key = f"shap:{algorithm}"
+    with stage("cache"):
+        keys = [fingerprint(model.fingerprint_prefix, r) for r in X]
+        entries = [cache.get(k) or {} for k in keys]
+
+    need_proba = [i for i, e in enumerate(entries) if "proba" not in e]
+    need_shap = [i for i, e in enumerate(entries) if with_shap and e.get(shap_key) is None]
+
+    misses = len(set(need_proba) | set(need_shap))
+    if misses:
+        _CACHE_LOOKUPS.labels(result="miss").inc(misses)
+    if misses < len(X):
+        _CACHE_LOOKUPS.labels(result="hit").inc(len(X) - misses)
+
+    if need_proba:
+        for i, p in zip(need_proba, _predict_proba(model, X[need_proba])):
+            entries[i] = {**entries[i], "proba": float(p)}
+    if need_shap:
+        for i, sv in zip(need_shap, _shap_matrix(model, X[need_shap], algorithm)):
+            # own copy, so a cached row doesn't pin the whole batch matrix
+            entries[i] = {**entries[i], shap_key: np.array(sv, dtype=float)}
+
+    with stage("cache"):
+        for i in sorted(set(need_proba) | set(need_shap)):
+            cache.set(keys[i], entries[i])
+
+    probas = np.array([e["proba"] for e in entries], dtype=float)
+    shap_vals = np.vstack([e[shap_key] for e in entries]) if with_shap else None
+    return probas, shap_vals
 
-    X, row = _build_X(obs, cols)
 
-    # probability (pipeline handles preprocessing)
-    proba = float(pipeline.predict_proba(X)[0][1])
+# -------------------------------------------------------------------
+# Deadline-aware explanations (budget_ms)
+#
+# The exact explanation runs on a small background pool; if it isn't done
+# within the budget the caller gets the stored/cached vector it passed in
+# ("cached") or XGBoost's path-dependent contributions ("approximate"),
+# and the exact one still finishes -> prediction cache / on_exact callback.
+# -------------------------------------------------------------------
 
-    pre = _get_preprocessor(pipeline)
+class ShapItems(list):
+    """shap_items + where they came from: "exact", "cached" or "approximate"."""
+
+    def __init__(self, items=(), source="exact"):
+        super().__init__(items)
+        self.source = source
+
+
+_explain_executor = None
+_explain_executor_lock = threading.Lock()
+_explain_lock = threading.Lock()
+_explain_inflight = {}      # fingerprint -> Future (one exact run per row)
+_explain_counters = {
+    "budgeted": 0,          # calls with a budget
+    "timeouts": 0,          # exact result not ready within the budget
+    "degraded_cached": 0,
+    "degraded_approximate": 0,
+    "shed": 0,              # background pool full, exact run not started
+    "background_completed": 0,
+    "background_failed": 0,
+}
+
+
+def _count(name: str):
+    with _explain_lock:
+        _explain_counters[name] += 1
+    _EXPLANATIONS.labels(event=name).inc()
+
+
+def explanation_stats() -> dict:
+    with _explain_lock:
+        return {**_explain_counters, "in_flight": len(_explain_inflight)}
+
+
+def _get_explain_executor() -> ThreadPoolExecutor:
+    global _explain_executor
+    if _explain_executor is None:
+        with _explain_executor_lock:
+            if _explain_executor is None:
+                _explain_executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "ML_EXPLAIN_BACKGROUND_WORKERS", 1),
+                    thread_name_prefix="shap-exact",
+                )
+    return _explain_executor
+
+
+def _submit_exact(model: LoadedModel, X: np.ndarray, algorithm: str):
+    """Future of the exact SHAP row for X (1 row), shared by concurrent callers."""
+    key = (algorithm, fingerprint(model.fingerprint_prefix, X[0]))
+
+    with _explain_lock:
+        future = _explain_inflight.get(key)
+        if future is not None:
+            return future
+        if len(_explain_inflight) >= getattr(settings, "ML_EXPLAIN_MAX_PENDING", 32):
+            return None
+        future = _get_explain_executor().submit(
+            lambda: _predict_rows_memoized(model, X, with_shap=True, algorithm=algorithm)[1][0]
+        )
+        _explain_inflight[key] = future
 
-    # ✅ Background from same model joblib
-    X_bg = _get_background_from_bundle(cols)
+    def done(f):
+        with _explain_lock:
+            _explain_inflight.pop(key, None)
+        _count("background_failed" if f.exception() is not None else "background_completed")
 
-    if pre is not None:
-        X_t = pre.transform(X)
-        X_bg_t = pre.transform(X_bg)
-    else:
-        X_t = X.values
-        X_bg_t = X_bg.values
+    future.add_done_callback(done)
+    return future
 
-    explainer = _get_tree_explainer(pipeline, X_bg_transformed=X_bg_t)
 
-    shap_vals = explainer.shap_values(X_t)
+def _run_on_exact(on_exact, shap_row):
+    # Always on an explain thread (a done callback may run inline in the
+    # request thread): it gets its own DB connection, closed afterwards
+    close_old_connections()
+    try:
+        on_exact(shap_row)
+    except Exception:
+        logger.exception("Saving the exact SHAP explanation failed")
+    finally:
+        connection.close()
 
-    # binary classifier sometimes returns list [class0, class1]
-    if isinstance(shap_vals, list):
-        shap_row = shap_vals[1][0]
+
+def _explain_row_within_budget(model: LoadedModel, X: np.ndarray, algorithm: str,
+                               budget_ms: float, fallback=None, on_exact=None):
+    """
+    Returns (proba, shap_row, source) for ONE row.
+
+    fallback: previously stored SHAP row for this input (returned as "cached")
+    on_exact: called with the exact SHAP row if it finishes after the budget
+    """
+    _count("budgeted")
+    proba = float(_predict_rows_memoized(model, X, with_shap=False)[0][0])
+
+    if algorithm == "pred_contribs":
+        # already the cheap one, nothing to degrade to
+        return proba, _predict_rows_memoized(model, X, True, algorithm)[1][0], "exact"
+
+    future = _submit_exact(model, X.copy(), algorithm)
+    if future is None:
+        _count("shed")
     else:
-        shap_row = shap_vals[0]
+        try:
+            with stage("shap_wait"):
+                return proba, future.result(timeout=max(budget_ms, 0) / 1000.0), "exact"
+        except FutureTimeout:
+            _count("timeouts")
+            if on_exact is not None:
+                future.add_done_callback(
+                    lambda f: f.exception() is None
+                    and _get_explain_executor().submit(_run_on_exact, on_exact, f.result())
+                )
+        except Exception:
+            # counted as background_failed; degrade like a timeout
+            logger.exception("Exact SHAP failed, using the fallback explanation")
+            future = None
+
+    if fallback is not None:
+        _count("degraded_cached")
+        return proba, np.asarray(fallback, dtype=float), "cached"
+
+    try:
+        approx = _shap_matrix(model, X, "pred_contribs")[0]
+    except Exception:
+        logger.exception("Approximate SHAP failed, waiting for the exact explanation")
+        if future is None:
+            raise
+        return proba, future.result(), "exact"
 
+    _count("degraded_approximate")
+    return proba, approx, "approximate"
+
+
+def _shap_items(cols, row: np.ndarray, shap_row, top_n):
     shap_items = []
     for i, feat in enumerate(cols):
-        value = row.get(feat)
+        value = float(row[i])
         sv = float(shap_row[i])
         shap_items.append({
             "feature": feat,
@@ -194,13 +562,190 @@ def predict_180d_mortality_with_shap(obs: ObservationSet, top_n: int = 10):
         })
 
     # Hide missing user inputs (NaN)
-    shap_items = [d for d in shap_items if not pd.isna(d["value"])]
+    shap_items = [d for d in shap_items if not np.isnan(d["value"])]
 
     shap_items.sort(key=lambda d: abs(d["shap_value"]), reverse=True)
     if top_n is not None:
         shap_items = shap_items[:top_n]
 
-    return proba, shap_items
+    return shap_items
+
+
+def predict_180d_mortality_with_shap(obs: ObservationSet, top_n: int = 10,
+                                     model_version: str = None, algorithm: str = None,
+                                     budget_ms: float = None):
+    """
+    Returns:
+      proba: float (0..1)
+      shap_items: ShapItems (list[dict]) sorted by |shap_value| desc;
+                  shap_items.source is "exact" or, if budget_ms ran out,
+                  "approximate" (the exact one finishes in the background)
+
+    algorithm: one of SHAP_ALGORITHMS (default settings.ML_SHAP_ALGORITHM)
+    budget_ms: latency budget for the explanation (None = wait for it)
+
+    Note: Your pipeline is (SimpleImputer + XGBoost), so transformed features
+    match raw features (no one-hot expansion).
+    """
+    model = get_model(model_version)
+
+    X = model.plan.row(obs).reshape(1, -1)
+
+    algorithm = _shap_algorithm(algorithm)
+    if budget_ms is not None:
+        proba, shap_row, source = _explain_row_within_budget(model, X, algorithm, budget_ms)
+        return proba, ShapItems(_shap_items(model.plan.cols, X[0], shap_row, top_n), source)
+
+    # probability (pipeline handles preprocessing) + SHAP, memoized
+    probas, shap_vals = _predict_rows_memoized(model, X, with_shap=True, algorithm=algorithm)
+
+    return float(probas[0]), ShapItems(_shap_items(model.plan.cols, X[0], shap_vals[0], top_n))
+
+
+def predict_180d_mortality_with_contributions(obs: ObservationSet, model_version: str = None,
+                                              algorithm: str = None):
+    """
+    Returns:
+      proba: float (0..1)
+      contributions: dict {feature: shap_value} for EVERY model feature
+                     (in model column order), suitable for storing on
+                     RiskAssessment.shap_contributions
+    """
+    model = get_model(model_version)
+
+    X = model.plan.row(obs).reshape(1, -1)
+
+    probas, shap_vals = _predict_rows_memoized(
+        model, X, with_shap=True, algorithm=_shap_algorithm(algorithm)
+    )
+    proba, shap_row = float(probas[0]), shap_vals[0]
+
+    contributions = {feat: float(sv) for feat, sv in zip(model.plan.cols, shap_row)}
+    return proba, contributions
+
+
+def explain_contributions_within_budget(obs: ObservationSet, budget_ms: float,
+                                       model_version: str = None, algorithm: str = None,
+                                       fallback: dict = None, on_exact=None):
+    """
+    predict_180d_mortality_with_contributions() with a latency budget.
+
+    Returns (proba, contributions, source), source being "exact",
+    "cached" (= `fallback`, e.g. the stored vector) or "approximate".
+    on_exact(contributions) is called from a background thread if the
+    exact explanation finishes after the budget.
+    """
+    model = get_model(model_version)
+    cols = model.plan.cols
+    X = model.plan.row(obs).reshape(1, -1)
+
+    fallback_row = None
+    if fallback:
+        fallback_row = [fallback.get(c, 0.0) for c in cols]
+
+    proba, shap_row, source = _explain_row_within_budget(
+        model, X, _shap_algorithm(algorithm), budget_ms,
+        fallback=fallback_row,
+        on_exact=(lambda row: on_exact({c: float(v) for c, v in zip(cols, row)})) if on_exact else None,
+    )
+    contributions = {feat: float(sv) for feat, sv in zip(cols, shap_row)}
+    return proba, contributions, source
+
+
+def shap_items_from_contributions(obs: ObservationSet, contributions: dict, top_n: int = 10):
+    """
+    Same output as predict_180d_mortality_with_shap()[1], but built from a
+    stored contribution vector (no model / explainer call).
+    """
+    cols = list(contributions.keys())
+    row = np.array([_safe_get(obs, c) for c in cols], dtype=float)
+    return _shap_items(cols, row, [contributions[c] for c in cols], top_n)
+
+
+def predict_180d_mortality_batch(observations, with_shap: bool = False, top_n: int = 10,
+                                 model_version: str = None, algorithm: str = None):
+    """
+    Scores many ObservationSets with ONE predict_proba call.
+
+    observations: QuerySet (read via values_list, no model instances)
+                  or a list of ObservationSet objects.
+
+    Returns:
+      obs_ids: list[int | None] (same order as the rows)
+      probas: np.ndarray of float (0..1)
+      shap_rows: list[list[dict]] (one shap_items list per row) if with_shap,
+                 else None
+    """
+    model = get_model(model_version)
+
+    obs_ids, X = _build_X_batch(observations, model.plan)
+    if len(X) == 0:
+        return obs_ids, np.empty(0, dtype=float), ([] if with_shap else None)
+
+    probas, shap_vals = _predict_rows_memoized(
+        model, X, with_shap, algorithm=_shap_algorithm(algorithm) if with_shap else "interventional"
+    )
+
+    shap_rows = None
+    if with_shap:
+        shap_rows = [
+            _shap_items(model.plan.cols, X[i], shap_vals[i], top_n)
+            for i in range(len(X))
+        ]
+
+    return obs_ids, probas, shap_rows
+
+
+# -------------------------------------------------------------------
+# What-if / partial dependence (nothing is stored)
+# -------------------------------------------------------------------
+
+def what_if_curves(obs: ObservationSet, grids: dict, model_version: str = None) -> dict:
+    """
+    Risk as ONE feature at a time is moved along its grid, everything else
+    kept as in `obs`.
+
+    grids: {feature: 1-D array of values}, features must be model columns.
+    All perturbed rows are stacked into one matrix and scored with a single
+    predict call (the prediction cache is bypassed on purpose).
+
+    Returns {
+      "baseline": proba of obs as-is,
+      "curves": {feature: {"current": value or None, "values": [...], "proba": [...]}},
+    }
+    """
+    model = get_model(model_version)
+    cols = model.plan.cols
+    base = model.plan.row(obs)
+
+    col_index = {c: i for i, c in enumerate(cols)}
+    unknown = [f for f in grids if f not in col_index]
+    if unknown:
+        raise ValueError(f"Not model features: {', '.join(unknown)}")
+
+    grids = {f: np.asarray(v, dtype=float).ravel() for f, v in grids.items()}
+    sizes = [len(v) for v in grids.values()]
+
+    # row 0 = baseline, then one block of rows per feature
+    X = np.repeat(base.reshape(1, -1), 1 + sum(sizes), axis=0)
+    start = 1
+    for (feat, values), n in zip(grids.items(), sizes):
+        X[start:start + n, col_index[feat]] = values
+        start += n
+
+    probas = np.asarray(_predict_proba(model, X), dtype=float)
+
+    curves, start = {}, 1
+    for (feat, values), n in zip(grids.items(), sizes):
+        current = base[col_index[feat]]
+        curves[feat] = {
+            "current": None if np.isnan(current) else float(current),
+            "values": values.tolist(),
+            "proba": probas[start:start + n].tolist(),
+        }
+        start += n
+
+    return {"baseline": float(probas[0]), "curves": curves}
 
 
 def risk_band_for_probability(p: float) -> str:
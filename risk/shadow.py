@@ -0,0 +1,236 @@
+# risk/shadow.py
+"""
+Shadow model evaluation (settings.ML_SHADOW_MODEL_PATH).
+
+When "generate risk" stores an assessment, its ObservationSet is handed to
+a bounded in-process queue (after commit, put_nowait -- never blocks the
+request; full queue = dropped and counted). One daemon thread per process
+drains the queue in small batches, scores them with the shadow model and
+stores a ShadowResult per assessment plus the running ShadowAgreement
+(band flips, probability deltas) for the (production, shadow) pair.
+
+CPU budget (ML_SHADOW_CPU_BUDGET = share of ONE core, e.g. 0.25):
+  - the shadow booster predicts with n_jobs=1,
+  - the thread lowers its own OS priority (Linux, best effort),
+  - after every batch it sleeps long enough that its CPU time stays within
+    the budget over wall time (duty cycle).
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from hospital_ai import metrics
+from .models import ShadowAgreement, ShadowResult
+from .registry import get_model
+
+logger = logging.getLogger(__name__)
+
+_BANDS = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+_MAX_BATCH = 32
+
+_SHADOW = metrics.counter(
+    "risk_shadow_total", "Shadow model events (submitted, dropped, scored, failed).", ["event"]
+)
+
+_lock = threading.Lock()
+_state = {"pid": None, "queue": None, "thread": None}
+_counters = {
+    "submitted": 0,
+    "dropped": 0,           # queue full
+    "scored": 0,
+    "failed": 0,
+    "cpu_seconds": 0.0,
+    "throttled_seconds": 0.0,
+}
+
+
+def shadow_enabled() -> bool:
+    return bool(getattr(settings, "ML_SHADOW_MODEL_PATH", None))
+
+
+def _count(name: str, amount=1):
+    with _lock:
+        _counters[name] += amount
+    if name in ("submitted", "dropped", "scored", "failed"):
+        _SHADOW.labels(event=name).inc(amount)
+
+
+def shadow_stats() -> dict:
+    with _lock:
+        q = _state["queue"]
+        return {
+            "enabled": shadow_enabled(),
+            "version": getattr(settings, "ML_SHADOW_MODEL_VERSION", None) if shadow_enabled() else None,
+            "queued": q.qsize() if q is not None and _state["pid"] == os.getpid() else 0,
+            **_counters,
+        }
+
+
+def _get_queue() -> queue.Queue:
+    # (Re)started per process: a forked gunicorn worker doesn't inherit the thread
+    if _state["pid"] != os.getpid():
+        with _lock:
+            if _state["pid"] != os.getpid():
+                _state["queue"] = queue.Queue(maxsize=getattr(settings, "ML_SHADOW_QUEUE_SIZE", 100))
+                _state["thread"] = threading.Thread(
+                    target=_worker, args=(_state["queue"],), name="risk-shadow", daemon=True
+                )
+                _state["thread"].start()
+                _state["pid"] = os.getpid()
+    return _state["queue"]
+
+
+def submit(assessment, observation_set):
+    """Queue a shadow score for this assessment (no-op if no shadow model)."""
+    if not shadow_enabled():
+        return
+
+    def put():
+        try:
+            _get_queue().put_nowait((assessment, observation_set))
+            _count("submitted")
+        except queue.Full:
+            _count("dropped")
+
+    transaction.on_commit(put)
+
+
+# -------------------------------------------------------------------
+# Worker thread
+# -------------------------------------------------------------------
+
+def _lower_priority():
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+def _worker(q: queue.Queue):
+    _lower_priority()
+    while True:
+        batch = [q.get()]
+        while len(batch) < _MAX_BATCH:
+            try:
+                batch.append(q.get_nowait())
+            except queue.Empty:
+                break
+
+        cpu0, wall0 = time.thread_time(), time.perf_counter()
+        try:
+            close_old_connections()
+            _score_batch(batch)
+            _count("scored", len(batch))
+        except Exception:
+            logger.exception("Shadow scoring failed for %d assessments", len(batch))
+            _count("failed", len(batch))
+
+        cpu = time.thread_time() - cpu0
+        _count("cpu_seconds", cpu)
+
+        # Duty cycle: CPU / (wall + sleep) <= budget
+        budget = getattr(settings, "ML_SHADOW_CPU_BUDGET", 0.25)
+        if budget > 0:
+            pause = cpu / budget - (time.perf_counter() - wall0)
+            if pause > 0:
+                _count("throttled_seconds", pause)
+                time.sleep(pause)
+
+
+def _shadow_model():
+    model = get_model(settings.ML_SHADOW_MODEL_VERSION)
+    from .services import _get_xgb_model
+
+    est = _get_xgb_model(model.pipeline)
+    if getattr(est, "n_jobs", 1) != 1 and hasattr(est, "set_params"):
+        est.set_params(n_jobs=1)
+    return model
+
+
+def _score_batch(batch):
+    from .services import _predict_proba, risk_band_for_probability
+
+    model = _shadow_model()
+    X = np.vstack([model.plan.row(obs) for _, obs in batch])
+    probas = _predict_proba(model, X)
+
+    results = []
+    for (ra, _), p in zip(batch, probas):
+        p = float(p)
+        results.append(ShadowResult(
+            assessment_id=ra.id,
+            production_version=ra.model_version,
+            shadow_version=model.version,
+            shadow_sha256=model.sha256,
+            production_proba=ra.risk_180d / 100.0,
+            shadow_proba=p,
+            production_band=ra.risk_band,
+            shadow_band=risk_band_for_probability(p),
+        ))
+
+    with transaction.atomic():
+        ShadowResult.objects.bulk_create(results, ignore_conflicts=True)
+        for key, rows in _group_by_pair(results).items():
+            _add_to_agreement(key, rows)
+
+
+def _group_by_pair(results):
+    pairs = {}
+    for r in results:
+        pairs.setdefault((r.production_version, r.shadow_version, r.shadow_sha256), []).append(r)
+    return pairs
+
+
+def _add_to_agreement(key, rows):
+    production_version, shadow_version, sha = key
+    deltas = np.array([r.shadow_proba - r.production_proba for r in rows])
+    moves = [_BANDS.get(r.shadow_band, 0) - _BANDS.get(r.production_band, 0) for r in rows]
+
+    ShadowAgreement.objects.get_or_create(
+        production_version=production_version, shadow_version=shadow_version, shadow_sha256=sha
+    )
+    ShadowAgreement.objects.filter(
+        production_version=production_version, shadow_version=shadow_version, shadow_sha256=sha
+    ).update(
+        count=F("count") + len(rows),
+        band_flips=F("band_flips") + sum(m != 0 for m in moves),
+        flips_up=F("flips_up") + sum(m > 0 for m in moves),
+        flips_down=F("flips_down") + sum(m < 0 for m in moves),
+        sum_delta=F("sum_delta") + float(deltas.sum()),
+        sum_sq_delta=F("sum_sq_delta") + float((deltas ** 2).sum()),
+        sum_abs_delta=F("sum_abs_delta") + float(np.abs(deltas).sum()),
+        max_abs_delta=Greatest(F("max_abs_delta"), float(np.abs(deltas).max())),
+        updated_at=timezone.now(),
+    )
+
+
+def agreement_summary() -> list:
+    """ShadowAgreement rows with rates/means ready to display."""
+    out = []
+    for a in ShadowAgreement.objects.order_by("-updated_at"):
+        n = a.count or 1
+        mean = a.sum_delta / n
+        out.append({
+            "production_version": a.production_version,
+            "shadow_version": a.shadow_version,
+            "shadow_sha256": a.shadow_sha256,
+            "count": a.count,
+            "band_flip_rate": a.band_flips / n,
+            "flips_up": a.flips_up,
+            "flips_down": a.flips_down,
+            "mean_delta": mean,
+            "mean_abs_delta": a.sum_abs_delta / n,
+            "std_delta": max(a.sum_sq_delta / n - mean * mean, 0.0) ** 0.5,
+            "max_abs_delta": a.max_abs_delta,
+            "updated_at": a.updated_at,
+        })
+    return out
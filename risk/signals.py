@@ -0,0 +1,41 @@
+# risk/signals.py
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from observations.models import ObservationSet
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(pre_save, sender=ObservationSet, dispatch_uid="risk_abnormality_summary")
+def set_abnormality_summary(sender, instance, raw=False, **kwargs):
+    # Lives here and not in ObservationSet.save(): driver_logic imports
+    # observations.models, so observations can't import it back
+    if raw:
+        return
+    from .driver_logic import abnormality_summary
+
+    for field, value in abnormality_summary(instance).items():
+        setattr(instance, field, value)
+
+
+@receiver(post_save, sender=ObservationSet, dispatch_uid="risk_drift_monitor")
+def update_drift_monitor(sender, instance, created, raw=False, **kwargs):
+    if not created or raw or not settings.RISK_DRIFT_MONITOR:
+        return
+    # After commit: a rolled back save isn't counted, and a drift failure
+    # never breaks saving vitals/labs
+    transaction.on_commit(lambda: _record(instance))
+
+
+def _record(observation_set):
+    from .drift import record_observation
+
+    try:
+        record_observation(observation_set)
+    except Exception:
+        logger.exception("Drift monitor update failed for ObservationSet %s", observation_set.id)
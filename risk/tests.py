@@ -0,0 +1,38 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .registry import ModelRegistry
+
+
+class ModelRegistryReloadTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.path = os.path.join(self.dir, "model.joblib")
+        shutil.copyfile(settings.ML_MODEL_PATH, self.path)
+        self.registry = ModelRegistry({"v1": self.path}, default_version="v1", check_interval=0)
+
+    def write(self, data: bytes, mtime: float):
+        with open(self.path, "wb") as f:
+            f.write(data)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_corrupt_file_keeps_serving_the_loaded_model(self):
+        model = self.registry.get("v1")
+        good = open(self.path, "rb").read()
+
+        with self.assertLogs("risk.registry", "ERROR"):
+            self.write(good[: len(good) // 2], model.mtime + 10)   # half-written
+            self.assertIs(self.registry.get("v1"), model)
+        self.assertIs(self.registry.get("v1"), model)             # same file: not retried
+        self.assertEqual(self.registry.stats()["reload_failures"], 1)
+
+        # a complete (different) artifact loads on the next check
+        self.write(good + b"\0", model.mtime + 20)
+        reloaded = self.registry.get("v1")
+        self.assertIsNot(reloaded, model)
+        self.assertEqual(self.registry.stats()["reload_events"], 1)
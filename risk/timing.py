@@ -0,0 +1,196 @@
+# risk/timing.py
+"""
+Sampled per-request stage timings for the risk views.
+
+    @timed_view("risk.detail")          # on the view
+    def detail(request, ...): ...
+
+    with stage("shap"):                 # anywhere on the hot path
+        ...
+
+settings.ML_TIMING_SAMPLE_RATE (0..1, 0 = off) picks which requests get a
+Recorder. For the others stage() is one ContextVar lookup returning a shared
+no-op context manager. A sampled request records:
+  - every stage() it passes through (stages can nest, so they may overlap),
+  - "db": total time in SQL queries (connection.execute_wrapper),
+  - "total": the whole view,
+and is then written as one JSON line to the "risk.timing" logger, added to
+the in-process aggregator (timing_stats(), shown on /risk/stats/) and, with
+ML_TIMING_SERVER_TIMING, sent back as a Server-Timing header.
+
+Nothing is propagated into worker threads (async jobs, background SHAP).
+"""
+import contextvars
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("risk.timing")
+
+_current = contextvars.ContextVar("risk_timing", default=None)
+_NOOP = nullcontext()
+
+WINDOW = 1000       # recent samples kept per (view, stage) for percentiles
+
+
+class Recorder:
+    __slots__ = ("view", "stages")
+
+    def __init__(self, view: str):
+        self.view = view
+        self.stages = {}            # stage -> [total ms, calls]
+
+    def add(self, name: str, ms: float):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [ms, 1]
+        else:
+            entry[0] += ms
+            entry[1] += 1
+
+
+class _Stage:
+    __slots__ = ("recorder", "name", "t0")
+
+    def __init__(self, recorder: Recorder, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder.add(self.name, (time.perf_counter() - self.t0) * 1000.0)
+        return False
+
+
+def stage(name: str):
+    """Context manager timing `name` if the current request is sampled."""
+    recorder = _current.get()
+    if recorder is None:
+        return _NOOP
+    return _Stage(recorder, name)
+
+
+def _sampled() -> bool:
+    rate = getattr(settings, "ML_TIMING_SAMPLE_RATE", 0.0)
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+def _db_timer(recorder: Recorder):
+    def wrapper(execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            recorder.add("db", (time.perf_counter() - t0) * 1000.0)
+    return wrapper
+
+
+def timed_view(name: str):
+    """Decorator: record stage timings for a sampled share of requests."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if not _sampled():
+                return view(request, *args, **kwargs)
+
+            recorder = Recorder(name)
+            token = _current.set(recorder)
+            t0 = time.perf_counter()
+            try:
+                with connection.execute_wrapper(_db_timer(recorder)):
+                    response = view(request, *args, **kwargs)
+            finally:
+                _current.reset(token)
+                recorder.add("total", (time.perf_counter() - t0) * 1000.0)
+
+            _finish(recorder, request, response)
+            return response
+        return wrapped
+    return decorator
+
+
+def _finish(recorder: Recorder, request, response):
+    stages = {k: round(ms, 3) for k, (ms, _) in recorder.stages.items()}
+    _aggregator.add(recorder.view, stages)
+
+    logger.info(json.dumps({
+        "event": "risk_timing",
+        "view": recorder.view,
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "stages_ms": stages,
+        "calls": {k: n for k, (_, n) in recorder.stages.items() if n > 1},
+    }))
+
+    if getattr(settings, "ML_TIMING_SERVER_TIMING", False):
+        response["Server-Timing"] = ", ".join(
+            f"{k.replace('.', '-')};dur={ms:.1f}" for k, ms in stages.items()
+        )
+
+
+class _Aggregator:
+    """count / mean / max / p50 / p95 per (view, stage), last WINDOW samples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._count = defaultdict(int)
+        self._sum = defaultdict(float)
+        self._max = defaultdict(float)
+        self._recent = defaultdict(lambda: deque(maxlen=WINDOW))
+
+    def add(self, view: str, stages: dict):
+        with self._lock:
+            for name, ms in stages.items():
+                key = (view, name)
+                self._count[key] += 1
+                self._sum[key] += ms
+                self._max[key] = max(self._max[key], ms)
+                self._recent[key].append(ms)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = defaultdict(dict)
+            for (view, name), n in self._count.items():
+                recent = np.fromiter(self._recent[(view, name)], dtype=float)
+                out[view][name] = {
+                    "count": n,
+                    "mean_ms": self._sum[(view, name)] / n,
+                    "max_ms": self._max[(view, name)],
+                    "p50_ms": float(np.percentile(recent, 50)),
+                    "p95_ms": float(np.percentile(recent, 95)),
+                }
+            return dict(out)
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+
+_aggregator = _Aggregator()
+
+
+def timing_stats() -> dict:
+    return {
+        "sample_rate": getattr(settings, "ML_TIMING_SAMPLE_RATE", 0.0),
+        "views": _aggregator.stats(),
+    }
+
+
+def reset_timing_stats():
+    _aggregator.reset()
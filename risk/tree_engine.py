@@ -0,0 +1,249 @@
+# risk/tree_engine.py
+"""
+Optional pure-NumPy inference engine for (SimpleImputer +) XGBoost bundles.
+
+The booster is compiled ONCE into flat arrays over all trees:
+    feature index, threshold, left/right child, default direction, leaf value
+and the SimpleImputer statistics are folded in, so predicting is just
+vectorized array indexing (no sklearn, pandas or DMatrix per call).
+
+Enable with settings.ML_INFERENCE_ENGINE = "compiled".
+"""
+import json
+import os
+
+import numpy as np
+
+
+class UnsupportedModelError(ValueError):
+    pass
+
+
+def _parse_base_score(raw) -> float:
+    # XGBoost >= 3 writes vectors like "[5E-1]"
+    s = str(raw).strip().strip("[]")
+    return float(s.split(",")[0])
+
+
+def imputer_statistics(pipeline):
+    """
+    Fill values of a pipeline whose ONLY preprocessing is SimpleImputer(NaN):
+    returns an array (one value per column), or None if there is no
+    preprocessing. Raises UnsupportedModelError for anything else.
+    """
+    steps = pipeline.steps if hasattr(pipeline, "steps") else [(None, pipeline)]
+    pre_steps = [s for _, s in steps[:-1] if s is not None and s != "passthrough"]
+    if not pre_steps:
+        return None
+
+    if len(pre_steps) != 1 or pre_steps[0].__class__.__name__ != "SimpleImputer":
+        raise UnsupportedModelError("Only a single SimpleImputer step can be compiled")
+
+    imputer = pre_steps[0]
+    mv = imputer.missing_values
+    if not (isinstance(mv, float) and np.isnan(mv)):
+        raise UnsupportedModelError("SimpleImputer must impute NaN")
+    stats = np.asarray(imputer.statistics_, dtype=float)
+    if np.isnan(stats).any() and not getattr(imputer, "keep_empty_features", False):
+        # Columns dropped by the imputer would shift feature indices
+        raise UnsupportedModelError("SimpleImputer drops empty features")
+    if getattr(imputer, "add_indicator", False):
+        raise UnsupportedModelError("SimpleImputer(add_indicator=True) is not supported")
+    return stats
+
+
+class CompiledTreeModel:
+    def __init__(self, *, feature, threshold, left, right, default_left,
+                 leaf_value, roots, depth, base_margin, impute_values, n_features):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.depth = depth
+        self.base_margin = base_margin
+        self.impute_values = impute_values
+        self.n_features = n_features
+
+        # XGBoost allocates children in pairs (right == left + 1), which
+        # lets traversal do "left + went_right" instead of a select.
+        internal = left != right
+        self.contiguous = bool(np.all(right[internal] == left[internal] + 1))
+
+    # ------------------------------------------------------------------
+    # Build
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "CompiledTreeModel":
+        """
+        Supports Pipeline([SimpleImputer, XGBClassifier]) or a bare
+        XGBClassifier with a binary:logistic gbtree booster.
+        """
+        impute_values = imputer_statistics(pipeline)
+        model = pipeline.steps[-1][1] if hasattr(pipeline, "steps") else pipeline
+
+        if not hasattr(model, "get_booster"):
+            raise UnsupportedModelError(f"Not an XGBoost model: {type(model).__name__}")
+
+        raw = json.loads(model.get_booster().save_raw("json"))
+        learner = raw["learner"]
+
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise UnsupportedModelError(f"Unsupported objective: {objective}")
+
+        gb = learner["gradient_booster"]
+        if gb.get("name") != "gbtree":
+            raise UnsupportedModelError(f"Unsupported booster: {gb.get('name')}")
+
+        trees = gb["model"]["trees"]
+
+        # Same iteration range the sklearn wrapper uses for predict_proba
+        try:
+            best_iteration = model.best_iteration
+        except AttributeError:
+            best_iteration = None
+        if best_iteration is not None:
+            per_iter = int(gb["model"]["gbtree_model_param"].get("num_parallel_tree", "1"))
+            trees = trees[: (best_iteration + 1) * per_iter]
+
+        feature, threshold, left, right, default_left, leaf_value = [], [], [], [], [], []
+        roots, depth = [], 0
+        offset = 0
+
+        for t in trees:
+            if any(t.get("split_type", [])):
+                raise UnsupportedModelError("Categorical splits are not supported")
+
+            lc = np.asarray(t["left_children"], dtype=np.int64)
+            rc = np.asarray(t["right_children"], dtype=np.int64)
+            n_nodes = len(lc)
+            is_leaf = lc == -1
+            idx = np.arange(n_nodes, dtype=np.int64)
+
+            # Leaves point to themselves, so traversal can run a fixed
+            # number of steps without branching on "is leaf".
+            left.append(np.where(is_leaf, idx, lc) + offset)
+            right.append(np.where(is_leaf, idx, rc) + offset)
+            feature.append(np.where(is_leaf, 0, np.asarray(t["split_indices"], dtype=np.int64)))
+
+            # Leaves: "x < +inf" always goes left (= stays put), NaN too
+            cond = np.asarray(t["split_conditions"], dtype=np.float32)
+            threshold.append(np.where(is_leaf, np.float32(np.inf), cond))
+            leaf_value.append(np.where(is_leaf, cond, np.float32(0)))
+            default_left.append(np.asarray(t["default_left"], dtype=bool) | is_leaf)
+
+            depth = max(depth, _tree_depth(lc, rc))
+            roots.append(offset)
+            offset += n_nodes
+
+        base_score = _parse_base_score(learner["learner_model_param"]["base_score"])
+        # binary:logistic stores base_score in probability space
+        base_margin = float(np.log(base_score / (1.0 - base_score)))
+
+        n_features = int(learner["learner_model_param"]["num_feature"])
+
+        return cls(
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            default_left=np.concatenate(default_left),
+            leaf_value=np.concatenate(leaf_value).astype(np.float32),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth,
+            base_margin=base_margin,
+            impute_values=impute_values,
+            n_features=n_features,
+        )
+
+    # ------------------------------------------------------------------
+    # On-disk arrays (np.load(mmap_mode="r") shares pages between workers)
+    # ------------------------------------------------------------------
+    _ARRAYS = ("feature", "threshold", "left", "right", "default_left", "leaf_value", "roots")
+
+    def save_arrays(self, directory, **meta):
+        os.makedirs(directory, exist_ok=True)
+        for name in self._ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        if self.impute_values is not None:
+            np.save(os.path.join(directory, "impute_values.npy"), self.impute_values)
+        meta.update(depth=self.depth, base_margin=self.base_margin, n_features=self.n_features)
+        with open(os.path.join(directory, "trees.json"), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load_arrays(cls, directory, mmap_mode=None) -> "CompiledTreeModel":
+        with open(os.path.join(directory, "trees.json")) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in cls._ARRAYS
+        }
+        impute_path = os.path.join(directory, "impute_values.npy")
+        return cls(
+            **arrays,
+            depth=meta["depth"],
+            base_margin=meta["base_margin"],
+            impute_values=np.load(impute_path) if os.path.exists(impute_path) else None,
+            n_features=meta["n_features"],
+        )
+
+    # ------------------------------------------------------------------
+    # Predict
+    # ------------------------------------------------------------------
+    def predict_margin(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        # The pipeline's imputer rejects +/-inf (NaN is "missing"); the tree
+        # walk below would silently route it instead
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+
+        if self.impute_values is not None:
+            X = np.where(np.isnan(X), self.impute_values, X)
+
+        # XGBoost compares in float32
+        Xf = X.astype(np.float32)
+
+        n, n_cols = Xf.shape
+        flat = Xf.ravel()
+        row_offset = (np.arange(n, dtype=np.intp) * n_cols)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots)))
+
+        for _ in range(self.depth):
+            x = flat[row_offset + self.feature[node]]
+            go_right = ~(x < self.threshold[node])      # NaN -> True for now
+            missing = np.isnan(x)
+            if missing.any():
+                go_right[missing] = ~self.default_left[node[missing]]
+
+            if self.contiguous:
+                node = self.left[node] + go_right
+            else:
+                node = np.where(go_right, self.right[node], self.left[node])
+
+        return self.leaf_value[node].sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Same shape as sklearn: (n, 2) = [P(class 0), P(class 1)]."""
+        p1 = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - p1, p1])
+
+
+def _tree_depth(left_children, right_children) -> int:
+    depth = 0
+    frontier = [(0, 0)]
+    while frontier:
+        node, d = frontier.pop()
+        if left_children[node] == -1:
+            depth = max(depth, d)
+            continue
+        frontier.append((left_children[node], d + 1))
+        frontier.append((right_children[node], d + 1))
+    return depth
@@ -6,4 +6,9 @@ app_name = "risk"
 urlpatterns = [
     path("encounters/<int:encounter_id>/generate/", views.generate, name="generate"),
     path("assessments/<int:assessment_id>/", views.detail, name="detail"),
+    path("assessments/<int:assessment_id>/what-if/", views.what_if, name="what_if"),
+    path("jobs/<int:job_id>/", views.job, name="job"),
+    path("jobs/<int:job_id>/status/", views.job_status, name="job_status"),
+    path("stats/", views.model_stats, name="model_stats"),
+    path("drift/", views.drift, name="drift"),
 ]
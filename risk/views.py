@@ -1,21 +1,44 @@
+import json
+import uuid
+
+import numpy as np
+
 from django.conf import settings
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, permission_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 
+from hospital_ai.metrics import track_request
 from patients.models import Encounter
+from observations.feature_ranges import FEATURE_RANGES
 from observations.models import ObservationSet
-from .models import RiskAssessment
+from .models import FeatureDrift, RiskAssessment, RiskJob
 from .forms import GenerateRiskForm, RiskCommentForm
 from .services import (
-    predict_180d_mortality_with_shap,
-    risk_band_for_probability,
+    explain_contributions_within_budget,
+    explanation_stats,
+    predict_180d_mortality_with_contributions,
+    shap_items_from_contributions,
+    what_if_curves,
 )
+from .cache import prediction_cache_stats
 from .driver_logic import build_clinical_drivers
+from .drift import drift_table
+from .jobs import QueueFull, create_risk_assessment, enqueue_risk_job
+from .registry import get_registry
+from .shadow import agreement_summary, shadow_stats
+from .timing import stage, timed_view, timing_stats
+from .warmup import is_ready, warmup_state
 
 
 @login_required
 @permission_required("risk.add_riskassessment", raise_exception=True)
+@track_request("risk.generate")
+@timed_view("risk.generate")
 def generate(request, encounter_id):
     encounter = get_object_or_404(Encounter, id=encounter_id)
 
@@ -31,33 +54,40 @@ def generate(request, encounter_id):
     if request.method == "POST":
         form = GenerateRiskForm(request.POST)
         if form.is_valid():
-            # Predict risk (we can also compute SHAP here, but we show SHAP on detail page)
-            prob, _ = predict_180d_mortality_with_shap(latest_obs, top_n=0)
-            band = risk_band_for_probability(prob)
-
-            ra = RiskAssessment.objects.create(
-                encounter=encounter,
-                observation_set=latest_obs,
-                risk_180d=prob * 100,
-                risk_band=band,
-                model_version=settings.ML_MODEL_VERSION,
-                created_by=request.user,
-                doctor_name=form.cleaned_data["doctor_name"],
-                doctor_comment=""
+            if settings.RISK_JOBS_ASYNC:
+                # Queue it and return at once; risk/job.html polls the status
+                token = form.cleaned_data["request_token"] or uuid.uuid4().hex
+                try:
+                    job = enqueue_risk_job(
+                        token, encounter, latest_obs, request.user, form.cleaned_data["doctor_name"]
+                    )
+                except QueueFull:
+                    messages.error(request, "Risk scoring is busy right now. Please try again in a moment.")
+                    return render(request, "risk/generate.html", {
+                        "encounter": encounter,
+                        "form": form,
+                    }, status=503)
+                return redirect("risk:job", job.id)
+
+            ra = create_risk_assessment(
+                encounter, latest_obs, request.user, form.cleaned_data["doctor_name"]
             )
 
             messages.success(request, "Risk prediction generated.")
             return redirect("risk:detail", ra.id)
     else:
-        form = GenerateRiskForm()
+        form = GenerateRiskForm(initial={"request_token": uuid.uuid4().hex})
 
-    return render(request, "risk/generate.html", {
-        "encounter": encounter,
-        "form": form,
-    })
+    with stage("render"):
+        return render(request, "risk/generate.html", {
+            "encounter": encounter,
+            "form": form,
+        })
 
 
 @login_required
+@track_request("risk.detail")
+@timed_view("risk.detail")
 def detail(request, assessment_id):
     ra = get_object_or_404(RiskAssessment, id=assessment_id)
 
@@ -73,24 +103,233 @@ def detail(request, assessment_id):
         form = RiskCommentForm(initial={"doctor_comment": ra.doctor_comment})
 
     show_all = request.GET.get("all") == "1"
-    drivers, shown_count, high_count, total_abnormal = build_clinical_drivers(
-        ra.observation_set, show_all=show_all
-    )
+    with stage("drivers"):
+        drivers, shown_count, high_count, total_abnormal = build_clinical_drivers(
+            ra.observation_set, show_all=show_all
+        )
 
     features = [(c, getattr(ra.observation_set, c)) for c in ObservationSet.feature_columns()]
 
     # --- SHAP top contributors (descending by |contribution|) ---
-    # We recompute here so it always matches the stored observation_set.
-    _, top_shap = predict_180d_mortality_with_shap(ra.observation_set, top_n=10)
-
-    return render(request, "risk/detail.html", {
-        "ra": ra,
-        "drivers": drivers,
-        "shown_count": shown_count,
-        "high_count": high_count,
-        "total_abnormal": total_abnormal,
-        "show_all": show_all,
-        "features": features,
-        "comment_form": form,
-        "top_shap": top_shap,
+    # Stored at generation time; only recompute on explicit "re-explain"
+    # or for old assessments without a stored vector. Recomputing uses the
+    # model version that produced the risk score, if it is still registered.
+    reexplain = request.GET.get("reexplain") == "1"
+    shap_stale = False
+    shap_source = "exact"
+
+    if ra.shap_contributions and not reexplain:
+        contributions = ra.shap_contributions
+    else:
+        explain_version = ra.model_version if get_registry().has(ra.model_version) else None
+        shap_stale = explain_version is None
+
+        def persist(c):
+            # Only persist if it was produced by the same model as the risk score
+            if not shap_stale:
+                RiskAssessment.objects.filter(id=ra.id).update(shap_contributions=c)
+
+        if settings.ML_SHAP_BUDGET_MS:
+            # Past the budget: stored/approximate now, exact one saved when done
+            _, contributions, shap_source = explain_contributions_within_budget(
+                ra.observation_set,
+                budget_ms=settings.ML_SHAP_BUDGET_MS,
+                model_version=explain_version,
+                fallback=ra.shap_contributions,
+                on_exact=persist,
+            )
+        else:
+            _, contributions = predict_180d_mortality_with_contributions(
+                ra.observation_set, model_version=explain_version
+            )
+
+        if shap_source == "exact":
+            persist(contributions)
+
+    top_shap = shap_items_from_contributions(ra.observation_set, contributions, top_n=10)
+
+    with stage("render"):
+        return render(request, "risk/detail.html", {
+            "ra": ra,
+            "drivers": drivers,
+            "shown_count": shown_count,
+            "high_count": high_count,
+            "total_abnormal": total_abnormal,
+            "show_all": show_all,
+            "features": features,
+            "comment_form": form,
+            "top_shap": top_shap,
+            "shap_stale": shap_stale,
+            "shap_source": shap_source,
+        })
+
+
+def _what_if_grid(feature, spec, max_points):
+    """
+    spec: [v1, v2, ...] or {"values": [...]} or {"min": a, "max": b, "points": n}
+    (min/max default to FEATURE_RANGES). Every value must lie in FEATURE_RANGES.
+    At most max_points values; checked before anything is allocated.
+    """
+    lo, hi = FEATURE_RANGES[feature]
+
+    if isinstance(spec, dict) and "values" in spec:
+        spec = spec["values"]
+    if isinstance(spec, list):
+        if len(spec) > max_points:
+            raise ValueError(f"{feature}: too many grid points ({len(spec)} > {max_points} left)")
+        values = np.array(spec, dtype=float)
+    elif isinstance(spec, dict) or spec is None:
+        spec = spec or {}
+        points = int(spec.get("points", settings.ML_WHATIF_DEFAULT_POINTS))
+        if points < 1:
+            raise ValueError(f"{feature}: points must be >= 1")
+        if points > max_points:
+            raise ValueError(f"{feature}: too many grid points ({points} > {max_points} left)")
+        values = np.linspace(float(spec.get("min", lo)), float(spec.get("max", hi)), points)
+    else:
+        raise ValueError(f"{feature}: grid must be a list of values or {{min, max, points}}")
+
+    if values.size == 0 or not np.all(np.isfinite(values)):
+        raise ValueError(f"{feature}: grid must contain finite numbers")
+    if values.min() < lo or values.max() > hi:
+        raise ValueError(f"{feature}: grid outside allowed range {lo}..{hi}")
+    return values
+
+
+@login_required
+@require_POST
+@track_request("risk.what_if")
+@timed_view("risk.what_if")
+def what_if(request, assessment_id):
+    """
+    POST {"features": {"Lactate_max": {"min": 0.5, "max": 4, "points": 50}, ...}}
+    -> risk (%) curve per feature, everything else as in the assessment's
+    observation set. Read-only: nothing is saved.
+    """
+    ra = get_object_or_404(RiskAssessment.objects.select_related("observation_set"), id=assessment_id)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+        specs = data["features"]
+        if not isinstance(specs, dict) or not specs:
+            raise ValueError("'features' must be a non-empty object")
+
+        unknown = [f for f in specs if f not in ObservationSet.feature_columns()]
+        if unknown:
+            raise ValueError(f"Unknown features: {', '.join(unknown)}")
+
+        # ML_WHATIF_MAX_POINTS is shared by all features of the request
+        grids = {}
+        left = settings.ML_WHATIF_MAX_POINTS
+        for f, spec in specs.items():
+            grids[f] = _what_if_grid(f, spec, left)
+            left -= len(grids[f])
+    except (KeyError, TypeError, ValueError, OverflowError) as e:
+        return JsonResponse({"status": "error", "message": str(e) or "Invalid JSON payload"}, status=400)
+
+    # Same model as the stored risk score, if still registered
+    model_version = ra.model_version if get_registry().has(ra.model_version) else None
+    try:
+        result = what_if_curves(ra.observation_set, grids, model_version=model_version)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+
+    return JsonResponse({
+        "status": "ok",
+        "assessment_id": ra.id,
+        "model_version": model_version or settings.ML_MODEL_VERSION,
+        "baseline_risk_180d": result["baseline"] * 100,
+        "curves": {
+            feat: {
+                "current": c["current"],
+                "values": c["values"],
+                "risk_180d": [p * 100 for p in c["proba"]],
+            }
+            for feat, c in result["curves"].items()
+        },
+    })
+
+
+def _job_status_payload(job: RiskJob) -> dict:
+    data = {"id": job.id, "status": job.status, "assessment_url": None, "error": job.error or None}
+    if job.status == RiskJob.DONE and job.assessment_id:
+        data["assessment_url"] = reverse("risk:detail", args=[job.assessment_id])
+    elif job.status == RiskJob.QUEUED:
+        data["queued_ahead"] = RiskJob.objects.filter(status=RiskJob.QUEUED, id__lt=job.id).count()
+    return data
+
+
+@login_required
+def job(request, job_id):
+    job = get_object_or_404(RiskJob, id=job_id)
+    if job.status == RiskJob.DONE and job.assessment_id:
+        messages.success(request, "Risk prediction generated.")
+        return redirect("risk:detail", job.assessment_id)
+
+    return render(request, "risk/job.html", {
+        "job": job,
+        "status": _job_status_payload(job),
+    })
+
+
+@login_required
+def job_status(request, job_id):
+    job = get_object_or_404(RiskJob, id=job_id)
+    return JsonResponse(_job_status_payload(job))
+
+
+def readiness(request):
+    """
+    Load balancer readiness probe.
+    200 once the model is warmed up (or warmup is disabled), else 503.
+    """
+    if not (settings.ML_WARMUP_ON_BOOT or settings.ML_PRELOAD_MODEL):
+        return JsonResponse({"status": "ready", "warmup": "disabled"})
+
+    state = warmup_state()
+    return JsonResponse(state, status=200 if is_ready() else 503)
+
+
+@staff_member_required
+def drift(request):
+    """Feature drift vs the current model's reference, per unit (?unit=, ?format=json)."""
+    model_version = settings.ML_MODEL_VERSION
+    unit = request.GET.get("unit") or FeatureDrift.ALL_UNITS
+    rows = drift_table(unit, model_version)
+
+    warn, alert = settings.RISK_DRIFT_PSI_WARN, settings.RISK_DRIFT_PSI_ALERT
+    for r in rows:
+        psi = r["psi"]
+        r["level"] = "none" if psi is None else "major" if psi >= alert else "moderate" if psi >= warn else "ok"
+
+    if request.GET.get("format") == "json":
+        return JsonResponse({"model_version": model_version, "unit": unit, "features": rows})
+
+    units = (
+        FeatureDrift.objects.filter(model_version=model_version)
+        .exclude(unit=FeatureDrift.ALL_UNITS)
+        .values_list("unit", flat=True).distinct().order_by("unit")
+    )
+    return render(request, "risk/drift.html", {
+        "model_version": model_version,
+        "unit": unit,
+        "all_units": FeatureDrift.ALL_UNITS,
+        "units": list(units),
+        "rows": rows,
+        "count": max((r["count"] for r in rows), default=0),
+        "drifted": sum(r["level"] in ("moderate", "major") for r in rows),
+        "warn": warn,
+        "alert": alert,
+    })
+
+
+@staff_member_required
+def model_stats(request):
+    """Registry + prediction cache counters of THIS worker process."""
+    return JsonResponse({
+        "registry": get_registry().stats(),
+        "prediction_cache": prediction_cache_stats(),
+        "explanations": explanation_stats(),
+        "timings": timing_stats(),
+        "shadow": {**shadow_stats(), "agreement": agreement_summary()},
     })
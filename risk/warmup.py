@@ -0,0 +1,93 @@
+# risk/warmup.py
+"""
+Opt-in model warmup at worker boot (settings.ML_WARMUP_ON_BOOT).
+
+Without it, the first "Generate risk" on each gunicorn worker pays for
+joblib.load + background transform + TreeExplainer build.
+
+Started from web workers only (risk.apps.start_web_threads). A failed warmup
+is retried with backoff, so /healthz/ready recovers without a restart once
+the model (or its database) is reachable again.
+"""
+import logging
+import threading
+import time
+
+from observations.models import ObservationSet
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+_lock = threading.Lock()
+_start_lock = threading.Lock()
+_ready = threading.Event()
+_thread = None
+
+_state = {
+    "status": "cold",       # cold | warming | ready | failed
+    "seconds": None,
+    "error": None,
+    "attempts": 0,
+    "retry_in": None,
+}
+
+
+def warmup() -> bool:
+    """
+    Loads the bundle, transforms the SHAP background, builds the explainer
+    and runs one dummy prediction. Safe to call more than once.
+    """
+    from .services import predict_180d_mortality_with_contributions
+
+    with _lock:
+        if _ready.is_set():
+            return True
+
+        _state["status"] = "warming"
+        _state["attempts"] += 1
+        t0 = time.perf_counter()
+        try:
+            # Empty snapshot -> all features NaN -> imputer fills everything.
+            # Runs the whole chain: bundle, background, explainer, predict.
+            predict_180d_mortality_with_contributions(ObservationSet())
+        except Exception as e:
+            _state.update(status="failed", error=repr(e))
+            logger.exception("Risk model warmup failed")
+            return False
+
+        _state.update(status="ready", seconds=time.perf_counter() - t0, error=None, retry_in=None)
+        _ready.set()
+        logger.info("Risk model warmed up in %.2fs", _state["seconds"])
+        return True
+
+
+def _warmup_until_ready():
+    delay = RETRY_SECONDS
+    while not warmup():
+        _state["retry_in"] = delay
+        logger.warning("Retrying risk model warmup in %ss", delay)
+        time.sleep(delay)
+        delay = min(delay * 2, RETRY_MAX_SECONDS)
+
+
+def start_warmup():
+    """
+    Runs warmup() in a background thread (worker keeps booting), retrying
+    with backoff until it succeeds. No-op if already warm or warming.
+    """
+    global _thread
+    with _start_lock:
+        if not _ready.is_set() and (_thread is None or not _thread.is_alive()):
+            _thread = threading.Thread(target=_warmup_until_ready, name="risk-warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+
+def warmup_state() -> dict:
+    return dict(_state)